@@ -0,0 +1,144 @@
+"""
+Deterministic split of an APK batch into shards for cluster array jobs
+
+    python runGatorOnApk.py --shard I/N --task NAME [options]
+    python runGatorOnApk.py --merge-shards NAME
+
+Every array element lists the same APK directory and computes the same
+assignment on its own, so no coordination service is needed. Shards are
+balanced by predicted cost, the dex bytecode size read from each APK's
+zip directory (the file size if there is no dex): APKs are taken from the
+most to the least expensive and each goes to the shard with the least cost
+so far. Ties between equally expensive APKs and between equally loaded
+shards are broken by a hash of the APK's file name and by the shard
+index, never by file system order, so the split depends only on the names
+and sizes of the APKs.
+
+Shard I of N (0 <= I < N) writes its journal and its summary
+(summary.shard-I-of-N.json) into the shared output/<task>; --merge-shards
+combines the summaries into summary.json and prints one batch report.
+"""
+import os
+import re
+import glob
+import json
+import heapq
+import hashlib
+import zipfile
+
+SUMMARY_FILE = "summary.json"
+SHARD_SUMMARY_PATTERN = re.compile(r"summary\.shard-(\d+)-of-(\d+)\.json")
+
+def parseShard(spec):
+    """(index, count) of an "I/N" shard spec; raises ValueError if it is not one"""
+    match = re.fullmatch(r"\s*(\d+)\s*/\s*(\d+)\s*", spec or "")
+    if not match:
+        raise ValueError(f"shard must look like I/N, got: {spec}")
+    index, count = int(match.group(1)), int(match.group(2))
+    if count < 1 or index >= count:
+        raise ValueError(f"shard index must be in 0..{count - 1}, got: {spec}")
+    return index, count
+
+def shardTag(index, count):
+    return f"shard-{index}-of-{count}"
+
+def predictedCost(apkPath):
+    """Bytes of dex code in the APK, or the APK's size if it has none or cannot be read"""
+    try:
+        with zipfile.ZipFile(apkPath) as apk:
+            dexBytes = sum(info.file_size for info in apk.infolist()
+                           if re.fullmatch(r"classes\d*\.dex", info.filename))
+        if dexBytes > 0:
+            return dexBytes
+    except (zipfile.BadZipFile, OSError):
+        pass
+    try:
+        return os.path.getsize(apkPath)
+    except OSError:
+        return 0
+
+def stableKey(apkPath):
+    return hashlib.sha1(os.path.basename(apkPath).encode('utf-8')).hexdigest()
+
+def assignShards(apkFiles, count, costs = None):
+    """Split apkFiles into count lists, each ordered from the most expensive APK down
+
+    costs maps an APK path to its predicted cost; missing ones are computed."""
+    costs = dict(costs or {})
+    for apkPath in apkFiles:
+        if apkPath not in costs:
+            costs[apkPath] = predictedCost(apkPath)
+    shards = [[] for _ in range(count)]
+    loads = [(0, index) for index in range(count)]
+    for apkPath in sorted(apkFiles, key=lambda apkPath: (-costs[apkPath], stableKey(apkPath))):
+        load, index = heapq.heappop(loads)
+        shards[index].append(apkPath)
+        heapq.heappush(loads, (load + costs[apkPath], index))
+    return shards
+
+def shardSummaryPath(taskDir, index, count):
+    return os.path.join(taskDir, f"summary.{shardTag(index, count)}.json")
+
+def writeJson(path, data):
+    partial = f"{path}.{os.getpid()}"
+    with open(partial, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(partial, path)
+
+def writeShardSummary(taskDir, index, count, summary):
+    writeJson(shardSummaryPath(taskDir, index, count), dict(summary, shard=index, shards=count))
+
+def loadShardSummaries(taskDir):
+    """{shard count: {shard index: summary}} of every shard summary in taskDir"""
+    summaries = {}
+    for path in sorted(glob.glob(os.path.join(taskDir, "summary.shard-*-of-*.json"))):
+        match = SHARD_SUMMARY_PATTERN.fullmatch(os.path.basename(path))
+        if not match:
+            continue
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                summary = json.load(f)
+        except (OSError, ValueError):
+            continue
+        summaries.setdefault(int(match.group(2)), {})[int(match.group(1))] = summary
+    return summaries
+
+def mergeShardSummaries(taskDir):
+    """Combine the shard summaries of taskDir into summary.json and return it, or None if there are none
+
+    If the task was sharded more than once with different counts, the count
+    with the most summaries wins."""
+    summaries = loadShardSummaries(taskDir)
+    if not summaries:
+        return None
+    count = max(summaries, key=lambda n: (len(summaries[n]), n))
+    shards = summaries[count]
+    apks = []
+    seen = {}
+    duplicates = []
+    for index in sorted(shards):
+        for entry in shards[index].get("apks", []):
+            if entry["apk"] in seen:
+                duplicates.append(entry["apk"])
+                continue
+            seen[entry["apk"]] = index
+            apks.append(dict(entry, shard=index))
+    apks.sort(key=lambda entry: entry["apk"])
+    merged = {
+        "task": os.path.basename(os.path.normpath(taskDir)),
+        "shards": count,
+        "missing_shards": [index for index in range(count) if index not in shards],
+        "duplicate_apks": sorted(set(duplicates)),
+        "total": len(apks),
+        "success": sum(1 for entry in apks if entry["exit_code"] == 0),
+        "shard_stats": [{
+            "shard": index,
+            "host": shards[index].get("host"),
+            "apks": len(shards[index].get("apks", [])),
+            "predicted_cost": sum(entry.get("cost", 0) for entry in shards[index].get("apks", [])),
+            "wall_seconds": shards[index].get("wall_seconds")
+        } for index in sorted(shards)],
+        "apks": apks
+    }
+    writeJson(os.path.join(taskDir, SUMMARY_FILE), merged)
+    return merged
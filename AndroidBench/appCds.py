@@ -0,0 +1,167 @@
+"""
+Application class-data sharing (AppCDS) archives for the Gator JVM
+
+Every Gator launch loads and verifies thousands of classes from SootAndroid/bin
+and the jars in SootAndroid/lib. The first launch with a given classpath and
+JDK records them into a dynamic CDS archive (-XX:ArchiveClassesAtExit, JDK 13+)
+and later launches map that archive (-XX:SharedArchiveFile) instead.
+
+CDS does not archive classes loaded from directories, so SootAndroid/bin is
+packed into a jar named after its fingerprint. A new build by ant changes the
+fingerprint, which selects a new jar and a new archive; the fingerprint is
+taken again for every launch, so long-running batches and daemons pick up a
+rebuild too. Every launch touches the archive and jar it uses; publishing a
+new archive deletes the older archives of the same JDK and the bin jars that
+no launch used for an hour, and archives of other JDKs once they went unused
+for a month, so several JDKs can share one cache directory. Archives are always used with -Xshare:auto,
+so a stale or damaged archive is silently ignored by the JVM rather than
+failing the analysis.
+"""
+import os
+import glob
+import time
+import hashlib
+import zipfile
+import threading
+
+MIN_JAVA_VERSION = 13  # first JDK with -XX:ArchiveClassesAtExit
+STALE_LOCK_SECONDS = 3600
+# Archives and jars unused this long are deleted when a new archive is published
+UNUSED_BUILD_SECONDS = 3600
+UNUSED_JDK_SECONDS = 30 * 24 * 3600
+
+def treeFingerprint(paths):
+    """Fingerprint of files and directory trees by name, size and modification time"""
+    digest = hashlib.sha256()
+    for path in paths:
+        files = [path]
+        if os.path.isdir(path):
+            files = sorted(os.path.join(dirPath, fileName)
+                           for dirPath, _, fileNames in os.walk(path) for fileName in fileNames)
+        for filePath in files:
+            try:
+                stat = os.stat(filePath)
+            except OSError:
+                continue
+            digest.update(f"{filePath}|{stat.st_size}|{stat.st_mtime_ns}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+class AppCDSArchive:
+    """The CDS archive for one Gator build and one JDK (a gatorLauncher.JavaToolchain)"""
+    def __init__(self, sootAndroid, libJars, cacheDir, toolchain, binFingerprint, libFingerprint):
+        self.binDir = os.path.join(sootAndroid, "bin")
+        self.libJars = sorted(libJars)
+        self.cacheDir = cacheDir
+        self.lock = threading.Lock()
+        versionOutput = toolchain.versionOutput
+        self.enabled = toolchain.majorVersion >= MIN_JAVA_VERSION and os.path.isdir(self.binDir)
+        if not self.enabled:
+            return
+        os.makedirs(cacheDir, exist_ok=True)
+        self.binJar = os.path.join(cacheDir, f"gator-bin-{binFingerprint[:16]}.jar")
+        key = hashlib.sha256((binFingerprint + libFingerprint + versionOutput).encode('utf-8'))
+        # Named after the JDK first, so that pruning can tell this JDK's archives from others'
+        self.jdkKey = hashlib.sha256(versionOutput.encode('utf-8')).hexdigest()[:8]
+        self.archive = os.path.join(cacheDir, f"gator-{self.jdkKey}-{key.hexdigest()[:16]}.jsa")
+        self.buildLock = self.archive + ".lock"
+        self.pendingArchive = self.archive + ".pending"
+
+    def classPath(self):
+        """Classpath with SootAndroid/bin replaced by its jar, which CDS can archive"""
+        with self.lock:
+            if not os.path.exists(self.binJar):
+                self.packBin()
+            else:
+                touch(self.binJar)
+        return os.pathsep.join([self.binJar] + self.libJars)
+
+    def packBin(self):
+        partial = f"{self.binJar}.{os.getpid()}.{threading.get_ident()}"
+        with zipfile.ZipFile(partial, 'w', zipfile.ZIP_STORED) as jar:
+            for dirPath, _, fileNames in os.walk(self.binDir):
+                for fileName in sorted(fileNames):
+                    path = os.path.join(dirPath, fileName)
+                    jar.write(path, os.path.relpath(path, self.binDir).replace(os.sep, '/'))
+        os.replace(partial, self.binJar)
+        print(f"[CDS] Packed {self.binDir} into {self.binJar}")
+
+    def acquireBuildLock(self):
+        """Only one launch at a time, across processes, records the archive"""
+        try:
+            if time.time() - os.path.getmtime(self.buildLock) > STALE_LOCK_SECONDS:
+                os.remove(self.buildLock)
+        except OSError:
+            pass
+        try:
+            os.close(os.open(self.buildLock, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except OSError:
+            return False
+
+    def launchOptions(self, build = True):
+        """JVM options for the next launch and whether that launch records the archive"""
+        if os.path.exists(self.archive):
+            touch(self.archive)
+            return ['-Xshare:auto', f'-XX:SharedArchiveFile={self.archive}'], False
+        if build and self.acquireBuildLock():
+            return ['-Xshare:auto', f'-XX:ArchiveClassesAtExit={self.pendingArchive}'], True
+        return [], False
+
+    def finishBuild(self, succeeded):
+        """Publish the archive written by a recording launch; runs that failed load too few classes"""
+        try:
+            if succeeded and os.path.getsize(self.pendingArchive) > 0:
+                os.replace(self.pendingArchive, self.archive)
+                print(f"[CDS] Class-data sharing archive created: {self.archive}")
+                self.removeOlderBuilds()
+            else:
+                os.remove(self.pendingArchive)
+        except OSError:
+            pass
+        try:
+            os.remove(self.buildLock)
+        except OSError:
+            pass
+
+    def removeOlderBuilds(self):
+        """Delete archives and bin jars no launch used lately; JVMs still mapping one keep it open"""
+        now = time.time()
+        for path in glob.glob(os.path.join(self.cacheDir, "gator-*.jsa")) \
+                + glob.glob(os.path.join(self.cacheDir, "gator-bin-*.jar")):
+            if path in (self.archive, self.binJar):
+                continue
+            name = os.path.basename(path)
+            if name.startswith("gator-bin-") or name.startswith(f"gator-{self.jdkKey}-"):
+                # An older build of this JDK, or a jar another JDK's launch may be about to open
+                maxAge = UNUSED_BUILD_SECONDS
+            else:
+                # Another JDK's archive: it may be in daily use by a daemon or another runner
+                maxAge = UNUSED_JDK_SECONDS
+            try:
+                if now - os.path.getmtime(path) > maxAge:
+                    os.remove(path)
+            except OSError:
+                # Removed concurrently, or still in use on Windows
+                pass
+
+def touch(path):
+    """Mark a cache file as used"""
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+_archives = {}
+_archivesLock = threading.Lock()
+
+def archiveFor(sootAndroid, libJars, cacheDir, toolchain):
+    """Shared AppCDSArchive for the current Gator build, or None when the JDK cannot use one"""
+    # Fingerprinted on every call: ant may rebuild SootAndroid/bin while a batch or daemon runs
+    binFingerprint = treeFingerprint([os.path.join(sootAndroid, "bin")])
+    libFingerprint = treeFingerprint(sorted(libJars))
+    key = (cacheDir, binFingerprint, libFingerprint, toolchain.versionOutput)
+    with _archivesLock:
+        if key not in _archives:
+            archive = AppCDSArchive(sootAndroid, libJars, cacheDir, toolchain, binFingerprint, libFingerprint)
+            _archives[key] = archive if archive.enabled else None
+        return _archives[key]
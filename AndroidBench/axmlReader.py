@@ -0,0 +1,150 @@
+"""
+Minimal reader for the compiled (binary XML, "AXML") AndroidManifest.xml inside an APK
+
+Only the handful of facts the runners need before decoding are extracted:
+the package name, minSdkVersion, targetSdkVersion and the number of
+<activity> elements. Usage: python axmlReader.py <app.apk> [...]
+"""
+import sys
+import struct
+import zipfile
+
+RES_STRING_POOL_TYPE = 0x0001
+RES_XML_TYPE = 0x0003
+RES_XML_START_ELEMENT_TYPE = 0x0102
+RES_XML_RESOURCE_MAP_TYPE = 0x0180
+
+UTF8_FLAG = 1 << 8
+NO_INDEX = 0xFFFFFFFF
+
+TYPE_STRING = 0x03
+TYPE_INT_DEC = 0x10
+TYPE_INT_HEX = 0x11
+
+# android.R.attr ids, used when attribute names are stripped by obfuscators
+ATTR_IDS = {
+    0x0101020c: "minSdkVersion",
+    0x01010270: "targetSdkVersion",
+}
+
+class AXMLError(Exception):
+    pass
+
+class ManifestInfo:
+    def __init__(self):
+        self.package = None
+        self.minSdkVersion = None
+        self.targetSdkVersion = None
+        self.activityCount = 0
+
+    def __str__(self):
+        return "Package: {0}\nminSdkVersion: {1}\ntargetSdkVersion: {2}\nActivities: {3}".format(
+            self.package, self.minSdkVersion, self.targetSdkVersion, self.activityCount)
+
+def readStringPool(data, offset, headerSize):
+    stringCount, _, flags, stringsStart = struct.unpack_from("<IIII", data, offset + 8)
+    isUtf8 = (flags & UTF8_FLAG) != 0
+    offsets = struct.unpack_from(f"<{stringCount}I", data, offset + headerSize)
+    base = offset + stringsStart
+    strings = []
+    for stringOffset in offsets:
+        pos = base + stringOffset
+        if isUtf8:
+            # UTF-16 length, then UTF-8 byte length; each one or two bytes
+            pos += 2 if data[pos] & 0x80 else 1
+            length = data[pos]
+            if length & 0x80:
+                length = ((length & 0x7F) << 8) | data[pos + 1]
+                pos += 2
+            else:
+                pos += 1
+            strings.append(data[pos:pos + length].decode('utf-8', errors='replace'))
+        else:
+            length = struct.unpack_from("<H", data, pos)[0]
+            if length & 0x8000:
+                length = ((length & 0x7FFF) << 16) | struct.unpack_from("<H", data, pos + 2)[0]
+                pos += 4
+            else:
+                pos += 2
+            strings.append(data[pos:pos + length * 2].decode('utf-16-le', errors='replace'))
+    return strings
+
+def parseSdkVersion(valueType, valueData, rawValue, strings):
+    if valueType in (TYPE_INT_DEC, TYPE_INT_HEX):
+        return valueData
+    if rawValue != NO_INDEX and rawValue < len(strings):
+        text = strings[rawValue]
+    elif valueType == TYPE_STRING and valueData < len(strings):
+        text = strings[valueData]
+    else:
+        return None
+    try:
+        return int(text)
+    except ValueError:
+        # Preview codenames such as "P" carry no numeric level
+        return None
+
+def parseManifest(data):
+    """Extract a ManifestInfo from the bytes of a binary AndroidManifest.xml"""
+    try:
+        chunkType, headerSize, _ = struct.unpack_from("<HHI", data, 0)
+        if chunkType != RES_XML_TYPE:
+            raise AXMLError("Not a binary XML file")
+        info = ManifestInfo()
+        strings = []
+        resourceIds = []
+        offset = headerSize
+        while offset + 8 <= len(data):
+            chunkType, headerSize, chunkSize = struct.unpack_from("<HHI", data, offset)
+            if chunkSize < 8:
+                raise AXMLError(f"Invalid chunk size at offset {offset}")
+            if chunkType == RES_STRING_POOL_TYPE:
+                strings = readStringPool(data, offset, headerSize)
+            elif chunkType == RES_XML_RESOURCE_MAP_TYPE:
+                count = (chunkSize - headerSize) // 4
+                resourceIds = struct.unpack_from(f"<{count}I", data, offset + headerSize)
+            elif chunkType == RES_XML_START_ELEMENT_TYPE:
+                ext = offset + headerSize
+                _, nameIndex, attrStart, attrSize, attrCount = struct.unpack_from("<IIHHH", data, ext)
+                element = strings[nameIndex]
+                if element == "activity":
+                    info.activityCount += 1
+                elif element in ("manifest", "uses-sdk"):
+                    for i in range(attrCount):
+                        attrNs, attrName, rawValue, _, _, valueType, valueData = struct.unpack_from(
+                            "<IIIHBBI", data, ext + attrStart + i * attrSize)
+                        name = ATTR_IDS.get(resourceIds[attrName]) if attrName < len(resourceIds) else None
+                        if name is None:
+                            name = strings[attrName]
+                        if element == "manifest" and name == "package":
+                            info.package = strings[rawValue] if rawValue != NO_INDEX else None
+                        elif element == "uses-sdk" and name in ("minSdkVersion", "targetSdkVersion"):
+                            setattr(info, name, parseSdkVersion(valueType, valueData, rawValue, strings))
+            offset += chunkSize
+        return info
+    except (struct.error, IndexError, UnicodeDecodeError) as e:
+        raise AXMLError(f"Malformed binary manifest: {e}")
+
+def readManifestFromAPK(apkPath):
+    """Read the binary manifest straight from the APK zip, without decoding anything"""
+    try:
+        with zipfile.ZipFile(apkPath) as apk:
+            data = apk.read("AndroidManifest.xml")
+    except (zipfile.BadZipFile, KeyError, OSError) as e:
+        raise AXMLError(f"Cannot read AndroidManifest.xml from {apkPath}: {e}")
+    return parseManifest(data)
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python axmlReader.py <app.apk> [...]")
+        return 1
+    for apkPath in sys.argv[1:]:
+        print("APK: " + apkPath)
+        try:
+            print(readManifestFromAPK(apkPath))
+        except AXMLError as e:
+            print(f"[ERROR] {e}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,307 @@
+"""
+Benchmark Gator over the apps of a runGator.py config
+
+Every selected app is analyzed N times with runGator.py (always with --force,
+so nothing comes from the result cache). A run succeeds when runGator.py exits
+with 0; it records its wall time, the peak RSS of the analysis and, if the
+client wrote a wtg.json (WTGVisualizationClient), the WTG size. The per-app
+medians go into a JSON report. With a baseline report the medians are compared
+per metric and the command exits non-zero on a regression:
+
+    python benchmark.py -j cc16.json -n 3 --save-baseline bench/cc16.json
+    python benchmark.py -j cc16.json -n 3 --baseline bench/cc16.json -o report.json
+
+Options:
+    -j <config>          runGator.py config (cc16.json, cgo.json, apv/config.json, ...)
+    -p <app>             benchmark only this app (repeatable, exact name)
+    -n <runs>            measured runs per app (default 3)
+    --warmup <runs>      unmeasured runs per app before the measured ones (default 0)
+    -o <report>          report path (default benchmark-<config>.json)
+    --baseline <file>    compare against this report
+    --save-baseline <f>  also write the report as a new baseline
+    --threshold m=x      allowed relative increase of a metric, e.g. wall_seconds=0.15
+
+WTG node and edge counts must match the baseline exactly; the analysis is
+deterministic, so any difference is a change in Gator's output. They are only
+compared when both reports have them, but a metric the baseline has and the
+current report lacks (e.g. every run failed) is a regression.
+"""
+import os, sys
+import json
+import time
+import platform
+import statistics
+import subprocess
+from datetime import datetime
+
+import resourceSampler
+
+# The reserved keys of a runGator.py config; every other key is an app
+RESERVED_KEYS = ("BASE_DIR", "BASE_PARAM", "BASE_CLIENT", "BASE_CLIENT_PARAM")
+
+# Allowed relative increase over the baseline median. WTG counts use 0: any change fails.
+DEFAULT_THRESHOLDS = {
+    "wall_seconds": 0.10,
+    "peak_rss_mb": 0.15,
+    "total_nodes": 0,
+    "total_edges": 0
+}
+# Metrics where any difference, not only an increase, is a regression
+EXACT_METRICS = ("total_nodes", "total_edges")
+
+class BenchmarkOptions:
+    config = ""
+    apps = []
+    runs = 3
+    warmup = 0
+    report = ""
+    baseline = ""
+    saveBaseline = ""
+    thresholds = dict(DEFAULT_THRESHOLDS)
+
+def parseArgs(argv):
+    options = BenchmarkOptions()
+    options.apps = []
+    options.thresholds = dict(DEFAULT_THRESHOLDS)
+    i = 1
+    while i < len(argv):
+        val = argv[i]
+        if val == '-j':
+            i += 1
+            options.config = argv[i]
+        elif val == '-p':
+            i += 1
+            options.apps.append(argv[i])
+        elif val == '-n':
+            i += 1
+            options.runs = max(1, int(argv[i]))
+        elif val == '--warmup':
+            i += 1
+            options.warmup = max(0, int(argv[i]))
+        elif val == '-o':
+            i += 1
+            options.report = argv[i]
+        elif val == '--baseline':
+            i += 1
+            options.baseline = argv[i]
+        elif val == '--save-baseline':
+            i += 1
+            options.saveBaseline = argv[i]
+        elif val == '--threshold':
+            i += 1
+            metric, _, limit = argv[i].partition("=")
+            if metric not in DEFAULT_THRESHOLDS:
+                print(f"[ERROR] Unknown metric for --threshold: {metric}")
+                return None
+            options.thresholds[metric] = float(limit)
+        else:
+            print(f"[ERROR] Unknown option: {val}")
+            return None
+        i += 1
+    if options.config == "":
+        print("[ERROR] No config given (-j)")
+        return None
+    if options.report == "":
+        configName = os.path.splitext(os.path.basename(options.config))[0]
+        options.report = f"benchmark-{configName}.json"
+    return options
+
+def configApps(configPath):
+    with open(configPath, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return [key for key in data if key not in RESERVED_KEYS]
+
+def gatorRevision(gatorRoot):
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd = gatorRoot,
+                                       stderr = subprocess.DEVNULL, universal_newlines = True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def waitWithUsage(process):
+    """Exit code and peak RSS in MB of a child and everything it waited for (None where unsupported)"""
+    if not hasattr(os, 'wait4'):
+        return (process.wait(), None)
+    _, status, usage = os.wait4(process.pid, 0)
+    # Tell Popen the child is gone so it does not wait for it again
+    process.returncode = os.waitstatus_to_exitcode(status) if hasattr(os, 'waitstatus_to_exitcode') else status >> 8
+    # ru_maxrss is in kB on Linux; it covers the Gator JVM once runGator.py has waited for it
+    return (process.returncode, round(usage.ru_maxrss / 1024, 1))
+
+def findOutputFile(searchRoot, app, fileName, since):
+    """Newest output/.../<app>/<fileName> below an ancestor of searchRoot written after since"""
+    found = None
+    directory = os.path.abspath(searchRoot)
+    while True:
+        outputDir = os.path.join(directory, "output")
+        candidates = [os.path.join(outputDir, app, fileName)]
+        if os.path.isdir(outputDir):
+            # APK runs write to output/<task>/<app>
+            candidates += [os.path.join(outputDir, task, app, fileName) for task in os.listdir(outputDir)]
+        for path in candidates:
+            try:
+                mtime = os.path.getmtime(path)
+            except OSError:
+                continue
+            if mtime >= since and (found == None or mtime > found[0]):
+                found = (mtime, path)
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            break
+        directory = parent
+    return found[1] if found else None
+
+def runOnce(app, options, benchDir, logPath):
+    """Analyze one app with runGator.py and measure the run"""
+    callList = [sys.executable, os.path.join(benchDir, "runGator.py"),
+                '-j', os.path.abspath(options.config), '-p', app, '-e', '-s', '--force']
+    start = time.time()
+    with open(logPath, 'w', encoding='utf-8') as log:
+        process = subprocess.Popen(callList, cwd = benchDir, stdout = log, stderr = subprocess.STDOUT)
+        retval, peakRss = waitWithUsage(process)
+    wallSeconds = time.time() - start
+    result = {"retval": retval, "wall_seconds": round(wallSeconds, 2), "peak_rss_mb": peakRss}
+    # An analysis handed to the daemon runs outside our process tree; its sampler knows the peak
+    resourcesPath = findOutputFile(benchDir, app, resourceSampler.SUMMARY_FILE, start)
+    if resourcesPath:
+        with open(resourcesPath, 'r', encoding='utf-8') as f:
+            sampled = json.load(f).get("peak_rss_mb")
+        if sampled != None:
+            result["peak_rss_mb"] = sampled
+    wtgPath = findOutputFile(benchDir, app, "wtg.json", start)
+    if wtgPath:
+        with open(wtgPath, 'r', encoding='utf-8') as f:
+            summary = json.load(f).get("summary", {})
+        result["total_nodes"] = summary.get("total_nodes")
+        result["total_edges"] = summary.get("total_edges")
+    # Only WTGVisualizationClient writes wtg.json; other clients (cc16, cgo) succeed without one
+    result["ok"] = retval == 0
+    return result
+
+def median(runs, metric):
+    values = [run[metric] for run in runs if run.get(metric) != None]
+    if not values:
+        return None
+    if metric in EXACT_METRICS:
+        # Keep counts integral
+        return statistics.median_low(values)
+    return statistics.median(values)
+
+def benchmarkApp(app, options, benchDir, logDir):
+    for i in range(options.warmup):
+        print(f"[INFO] {app}: warmup {i + 1}/{options.warmup}")
+        runOnce(app, options, benchDir, os.path.join(logDir, f"{app}-warmup{i + 1}.log"))
+    runs = []
+    for i in range(options.runs):
+        result = runOnce(app, options, benchDir, os.path.join(logDir, f"{app}-run{i + 1}.log"))
+        runs.append(result)
+        status = "OK" if result["ok"] else "FAILED"
+        print(f"[INFO] {app}: run {i + 1}/{options.runs} {status} in {result['wall_seconds']:.1f}s, "
+              f"peak {result['peak_rss_mb']}MB, WTG {result.get('total_nodes')} nodes / {result.get('total_edges')} edges")
+    good = [run for run in runs if run["ok"]]
+    entry = {"runs": runs, "failed_runs": len(runs) - len(good)}
+    entry["median"] = {metric: median(good, metric) for metric in DEFAULT_THRESHOLDS}
+    # Different WTGs across runs of one app mean the analysis is not deterministic
+    entry["stable_wtg"] = len({(run.get("total_nodes"), run.get("total_edges")) for run in good
+                               if run.get("total_nodes") != None}) <= 1
+    return entry
+
+def compareApp(current, baseline, thresholds):
+    """Regressions of one app against its baseline entry"""
+    regressions = []
+    if current["failed_runs"] and not baseline.get("failed_runs"):
+        regressions.append({"metric": "failed_runs", "baseline": 0, "current": current["failed_runs"]})
+    for metric, limit in thresholds.items():
+        old = baseline.get("median", {}).get(metric)
+        new = current["median"].get(metric)
+        if old == None:
+            continue
+        if new == None:
+            # No successful run measured it, or the client no longer writes it
+            regressions.append({"metric": metric, "baseline": old, "current": None, "threshold": limit})
+            continue
+        if metric in EXACT_METRICS:
+            regressed = new != old
+        else:
+            regressed = new > old * (1 + limit)
+        if regressed:
+            regressions.append({
+                "metric": metric,
+                "baseline": old,
+                "current": new,
+                "change": round(new / old - 1, 4) if old else None,
+                "threshold": limit
+            })
+    return regressions
+
+def compareReports(report, baseline, thresholds):
+    regressions = {}
+    for app, entry in report["apps"].items():
+        if app not in baseline.get("apps", {}):
+            print(f"[WARNING] {app} is not in the baseline")
+            continue
+        appRegressions = compareApp(entry, baseline["apps"][app], thresholds)
+        if appRegressions:
+            regressions[app] = appRegressions
+    return regressions
+
+def writeReport(path, report):
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+def main():
+    options = parseArgs(sys.argv)
+    if options == None:
+        print(__doc__)
+        return 2
+    benchDir = os.path.dirname(os.path.abspath(__file__))
+    apps = configApps(options.config)
+    if options.apps:
+        unknown = [app for app in options.apps if app not in apps]
+        if unknown:
+            print(f"[ERROR] Not in {options.config}: {', '.join(unknown)}")
+            return 2
+        apps = options.apps
+    baseline = None
+    if options.baseline:
+        with open(options.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    logDir = os.path.splitext(os.path.abspath(options.report))[0] + "-logs"
+    os.makedirs(logDir, exist_ok=True)
+    print(f"[INFO] Benchmarking {len(apps)} app(s) from {options.config}, {options.runs} run(s) each")
+    report = {
+        "config": options.config,
+        "created": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "gator_revision": gatorRevision(os.path.dirname(benchDir)),
+        "host": {"platform": platform.platform(), "python": platform.python_version(), "cpus": os.cpu_count()},
+        "runs_per_app": options.runs,
+        "warmup_runs": options.warmup,
+        "thresholds": options.thresholds,
+        "apps": {}
+    }
+    for app in apps:
+        report["apps"][app] = benchmarkApp(app, options, benchDir, logDir)
+
+    failed = False
+    if baseline != None:
+        regressions = compareReports(report, baseline, options.thresholds)
+        report["baseline"] = {"path": options.baseline, "gator_revision": baseline.get("gator_revision")}
+        report["regressions"] = regressions
+        for app, appRegressions in regressions.items():
+            for item in appRegressions:
+                print(f"[REGRESSION] {app}: {item['metric']} {item['baseline']} -> {item['current']}")
+        failed = len(regressions) > 0
+    writeReport(options.report, report)
+    print(f"[INFO] Report written to {options.report}")
+    if options.saveBaseline:
+        writeReport(options.saveBaseline, report)
+        print(f"[INFO] Baseline written to {options.saveBaseline}")
+    if baseline != None and not failed:
+        print("[OK] No regressions against the baseline")
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
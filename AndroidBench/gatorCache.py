@@ -0,0 +1,226 @@
+"""
+Persistent on-disk caches shared by the Gator runner scripts
+
+Entries live in sub-directories named after their key. An entry is built in
+a private staging directory on the same file system and renamed into place,
+so concurrent batch workers (threads or processes) never observe a partially
+written entry. Each entry carries a stamp file whose mtime records when it
+was last used and whose content is the entry size, which drives the
+least-recently-used eviction once the cache grows past its size cap.
+"""
+import os
+import re
+import json
+import time
+import uuid
+import shutil
+import hashlib
+import tempfile
+import threading
+
+HASH_CHUNK_SIZE = 1 << 20
+STAMP_FILE = ".last_used"
+
+def fileSha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+_apktoolVersions = {}
+
+def apktoolVersion(apktoolJar):
+    """Version of an apktool jar, taken from its file name or else from its content"""
+    if apktoolJar not in _apktoolVersions:
+        match = re.search(r"(\d+(?:\.\d+)+)", os.path.basename(apktoolJar))
+        if match:
+            _apktoolVersions[apktoolJar] = match.group(1)
+        elif os.path.exists(apktoolJar):
+            _apktoolVersions[apktoolJar] = "sha256-" + fileSha256(apktoolJar)[:16]
+        else:
+            _apktoolVersions[apktoolJar] = "unknown"
+    return _apktoolVersions[apktoolJar]
+
+_buildFingerprints = {}
+
+def gatorBuildFingerprint(gatorRoot):
+    """Fingerprint of the Gator build: compiled classes, library jars and analysis specs"""
+    sootAndroid = os.path.join(gatorRoot, "SootAndroid")
+    if sootAndroid in _buildFingerprints:
+        return _buildFingerprints[sootAndroid]
+    files = []
+    for dirPath, _, fileNames in os.walk(os.path.join(sootAndroid, "bin")):
+        files.extend(os.path.join(dirPath, fileName) for fileName in fileNames)
+    libDir = os.path.join(sootAndroid, "lib")
+    if os.path.isdir(libDir):
+        files.extend(os.path.join(libDir, name) for name in os.listdir(libDir) if name.endswith(".jar"))
+    files.extend(os.path.join(sootAndroid, name) for name in ("listeners.xml", "wtg.xml"))
+    files.append(os.path.join(sootAndroid, "scripts", "consts", "widgetMap"))
+    digest = hashlib.sha256()
+    for path in sorted(files):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        digest.update(f"{os.path.relpath(path, sootAndroid)}|{stat.st_size}|{stat.st_mtime_ns}\n".encode('utf-8'))
+    _buildFingerprints[sootAndroid] = digest.hexdigest()
+    return _buildFingerprints[sootAndroid]
+
+def directorySize(path):
+    total = 0
+    for dirPath, _, fileNames in os.walk(path):
+        for fileName in fileNames:
+            try:
+                total += os.path.getsize(os.path.join(dirPath, fileName))
+            except OSError:
+                pass
+    return total
+
+class DirectoryCache:
+    """A directory of cache entries with atomic publication and LRU eviction"""
+    def __init__(self, root, maxBytes, graceSeconds = 3600):
+        self.root = root
+        self.maxBytes = maxBytes
+        # Entries used this recently may still be read by a running job and are never evicted
+        self.graceSeconds = graceSeconds
+        self.stagingRoot = os.path.join(root, ".staging")
+        os.makedirs(self.stagingRoot, exist_ok=True)
+        self.lock = threading.Lock()
+        self.keyLocks = {}
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+
+    def keyLock(self, key):
+        """In-process lock that lets one thread build an entry while others wait for it"""
+        with self.lock:
+            if key not in self.keyLocks:
+                self.keyLocks[key] = threading.Lock()
+            return self.keyLocks[key]
+
+    def entryPath(self, key):
+        return os.path.join(self.root, key)
+
+    def lookup(self, key):
+        """Path of a complete entry (marking it as recently used), or None"""
+        path = self.entryPath(key)
+        stamp = os.path.join(path, STAMP_FILE)
+        try:
+            os.utime(stamp)
+        except OSError:
+            with self.lock:
+                self.misses += 1
+            return None
+        with self.lock:
+            self.hits += 1
+        return path
+
+    def newStagingDir(self):
+        return tempfile.mkdtemp(prefix="build-", dir=self.stagingRoot)
+
+    def publish(self, key, stagingDir, replace = False):
+        """Atomically move a fully built staging directory into place and return the entry path"""
+        with open(os.path.join(stagingDir, STAMP_FILE), 'w') as stamp:
+            stamp.write(str(directorySize(stagingDir)))
+        path = self.entryPath(key)
+        if replace:
+            self.remove(key)
+        try:
+            os.rename(stagingDir, path)
+        except OSError:
+            # Another worker published the same key first; its entry is just as good
+            shutil.rmtree(stagingDir, ignore_errors=True)
+            if not os.path.exists(os.path.join(path, STAMP_FILE)):
+                raise
+        with self.lock:
+            self.stored += 1
+        self.evict()
+        return path
+
+    def statistics(self):
+        return f"{self.hits} hit(s) | {self.misses} miss(es) | {self.stored} stored"
+
+    def discard(self, stagingDir):
+        shutil.rmtree(stagingDir, ignore_errors=True)
+
+    def remove(self, key):
+        # Rename first so concurrent lookups never see a half-deleted entry
+        trash = os.path.join(self.stagingRoot, "evicted-" + uuid.uuid4().hex)
+        try:
+            os.rename(self.entryPath(key), trash)
+        except OSError:
+            return False
+        shutil.rmtree(trash, ignore_errors=True)
+        return True
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits into maxBytes"""
+        if self.maxBytes is None:
+            return
+        with self.lock:
+            entries = []
+            total = 0
+            for name in os.listdir(self.root):
+                stamp = os.path.join(self.root, name, STAMP_FILE)
+                try:
+                    lastUsed = os.path.getmtime(stamp)
+                    with open(stamp, 'r') as f:
+                        size = int(f.read().strip() or 0)
+                except (OSError, ValueError):
+                    continue
+                entries.append((lastUsed, size, name))
+                total += size
+            now = time.time()
+            for lastUsed, size, name in sorted(entries):
+                if total <= self.maxBytes:
+                    break
+                if now - lastUsed < self.graceSeconds:
+                    break
+                if self.remove(name):
+                    total -= size
+
+class DecodeCache(DirectoryCache):
+    """apktool output keyed by APK content, apktool version and decode mode"""
+    def key(self, apkHash, apktoolJar, full):
+        mode = "full" if full else "res"
+        return f"{apkHash}-apktool{apktoolVersion(apktoolJar)}-{mode}"
+
+class ResultCache(DirectoryCache):
+    """Gator output directories keyed by APK content, Gator options, API level and Gator build"""
+    LOG_FILE = "log.txt"
+
+    def key(self, apkHash, options, apiLevel, buildFingerprint):
+        digest = hashlib.sha256(json.dumps(
+            [apkHash, list(options), str(apiLevel), buildFingerprint]).encode('utf-8'))
+        return digest.hexdigest()
+
+    def store(self, key, outputDir, logText = None, replace = False):
+        """Snapshot the result files of a finished analysis (and its log) into the cache"""
+        stagingDir = self.newStagingDir()
+        try:
+            for name in os.listdir(outputDir):
+                source = os.path.join(outputDir, name)
+                if name != self.LOG_FILE and os.path.isfile(source):
+                    shutil.copy2(source, os.path.join(stagingDir, name))
+            if logText is not None:
+                with open(os.path.join(stagingDir, self.LOG_FILE), 'w', encoding='utf-8') as f:
+                    f.write(logText)
+        except OSError:
+            self.discard(stagingDir)
+            raise
+        return self.publish(key, stagingDir, replace)
+
+    def restore(self, entry, outputDir):
+        """Copy cached result files into outputDir and return the cached log text, if any"""
+        logText = None
+        for name in os.listdir(entry):
+            source = os.path.join(entry, name)
+            if name == STAMP_FILE or not os.path.isfile(source):
+                continue
+            if name == self.LOG_FILE:
+                with open(source, 'r', encoding='utf-8', errors='replace') as f:
+                    logText = f.read()
+            else:
+                shutil.copy2(source, os.path.join(outputDir, name))
+        return logText
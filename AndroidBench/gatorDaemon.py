@@ -0,0 +1,286 @@
+"""
+Persistent Gator analysis daemon
+
+Starting a JVM and loading Soot for every APK dominates the run time of small
+apps. `python gatorDaemon.py serve` keeps a pool of
+presto.android.GatorServer JVMs alive and accepts analysis requests from the
+runner scripts on a localhost port. Each worker analyzes one APK at a time and
+is recycled after a number of jobs or once the heap left over after a job
+crosses a threshold, which contains leaks in Soot and Gator's static state.
+
+Soot's Scene is reset between jobs, so the Android platform jars are still
+parsed once per APK; the daemon saves JVM start-up, class loading and JIT
+warm-up. Worker JVMs are shared by many jobs, so they write no per-job GC log
+(gc_log) and do not record or rebuild the AppCDS archive; they only map an
+archive that already exists when they start.
+
+The runners call submit() first and start a JVM of their own when no daemon
+is listening, so the daemon is purely an accelerator.
+
+Usage: python gatorDaemon.py serve [--workers K] [--port P] [--max-jobs N] [--heap-recycle F]
+"""
+import os, sys
+import json
+import time
+import queue
+import socket
+import threading
+import subprocess
+import socketserver
+
+DEFAULT_PORT = 47100
+CONNECT_TIMEOUT = 0.5
+TIMEOUT_RETVAL = -50
+
+def submit(args, output, timeout = 0, port = DEFAULT_PORT, onStart = None):
+    """Run presto.android.Main with args on a daemon worker, appending its output to the
+    output file. onStart(pid) is called once a worker picked up the job. Returns the
+    exit code, or None if no daemon can take the job."""
+    if output is None or not hasattr(output, "name"):
+        return None
+    try:
+        sock = socket.create_connection(("127.0.0.1", port), timeout = CONNECT_TIMEOUT)
+    except OSError:
+        return None
+    output.flush()
+    request = {
+        "cwd": os.getcwd(),
+        "log": os.path.abspath(output.name),
+        "args": list(args),
+        "timeout": timeout or 0
+    }
+    try:
+        # The daemon enforces the analysis timeout; wait for it indefinitely
+        sock.settimeout(None)
+        with sock, sock.makefile('rw', encoding='utf-8', newline='\n') as stream:
+            stream.write(json.dumps(request) + "\n")
+            stream.flush()
+            reply = stream.readline()
+            if reply and "pid" in json.loads(reply):
+                if onStart != None:
+                    onStart(json.loads(reply)["pid"])
+                reply = stream.readline()
+    except OSError:
+        reply = ""
+    # The worker appended to the log behind our back
+    output.seek(0, os.SEEK_END)
+    if not reply:
+        output.write("[WARNING] Gator daemon dropped the request, running in a new JVM\n")
+        output.flush()
+        return None
+    response = json.loads(reply)
+    if response.get("error"):
+        output.write(f"[INFO] Gator daemon declined the request ({response['error']}), running in a new JVM\n")
+        output.flush()
+        return None
+    return response["retval"]
+
+class WorkerJVM:
+    """One GatorServer process and the connection to it"""
+    def __init__(self, javaCommand, env, name):
+        self.name = name
+        self.jobs = 0
+        self.process = subprocess.Popen(javaCommand + ['presto.android.GatorServer', '-port', '0'],
+                                        stdout = subprocess.PIPE, stderr = subprocess.STDOUT,
+                                        env = env, universal_newlines = True)
+        port = None
+        for line in self.process.stdout:
+            if line.startswith("READY "):
+                port = int(line.split()[1])
+                break
+            print(f"[{self.name}] {line.rstrip()}")
+        if port is None:
+            self.process.wait()
+            raise RuntimeError(f"{self.name} exited with code {self.process.returncode} before it was ready")
+        # Anything the worker prints outside of jobs goes to the daemon's console
+        threading.Thread(target = self.forwardOutput, daemon = True).start()
+        self.sock = socket.create_connection(("127.0.0.1", port))
+        self.stream = self.sock.makefile('rw', encoding='utf-8', newline='\n')
+        print(f"[INFO] {self.name} ready (pid {self.process.pid}, port {port})")
+
+    def forwardOutput(self):
+        for line in self.process.stdout:
+            print(f"[{self.name}] {line.rstrip()}")
+
+    def run(self, logPath, args, timeout):
+        """Returns (retval, usedHeap, maxHeap); usedHeap is None if the worker is gone"""
+        self.jobs += 1
+        self.sock.settimeout(timeout if timeout else None)
+        try:
+            self.stream.write(f"RUN {logPath}\n")
+            for arg in args:
+                self.stream.write(arg + "\n")
+            self.stream.write("END\n")
+            self.stream.flush()
+            reply = self.stream.readline()
+        except socket.timeout:
+            return self.timedOut(logPath, timeout), None, None
+        except OSError:
+            reply = ""
+        if not reply.startswith("DONE "):
+            # The analysis called System.exit() or crashed the JVM: report its exit code
+            return self.process.wait(), None, None
+        _, retval, usedHeap, maxHeap = reply.split()
+        return int(retval), int(usedHeap), int(maxHeap)
+
+    def timedOut(self, logPath, timeout):
+        # Same escalation as a per-APK JVM: SIGTERM first, then kill
+        with open(logPath, 'a', encoding='utf-8') as log:
+            log.write(f"\n[WARNING] Analysis timeout after {timeout}s, attempting graceful shutdown...\n")
+            self.process.terminate()
+            try:
+                self.process.wait(timeout = 10)
+                log.write(f"[INFO] Process terminated gracefully\n")
+            except subprocess.TimeoutExpired:
+                log.write(f"[ERROR] Graceful termination failed, force killing process\n")
+                self.process.kill()
+                self.process.wait()
+        return TIMEOUT_RETVAL
+
+    def stop(self):
+        try:
+            self.stream.write("QUIT\n")
+            self.stream.flush()
+            self.process.wait(timeout = 10)
+        except (OSError, subprocess.TimeoutExpired):
+            self.process.kill()
+            self.process.wait()
+        self.sock.close()
+
+class GatorDaemon:
+    """Hands requests to idle workers and replaces workers that must be recycled"""
+    def __init__(self, javaCommand, env, workers, maxJobs, heapRecycle):
+        self.javaCommand = javaCommand
+        self.env = env
+        self.maxJobs = maxJobs
+        self.heapRecycle = heapRecycle
+        self.cwd = os.path.realpath(os.getcwd())
+        self.idle = queue.Queue()
+        self.started = 0
+        self.startLock = threading.Lock()
+        for _ in range(workers):
+            self.idle.put(self.newWorker())
+
+    def newWorker(self):
+        with self.startLock:
+            self.started += 1
+            name = f"worker-{self.started}"
+        return WorkerJVM(self.javaCommand, self.env, name)
+
+    def replace(self, worker):
+        worker.stop()
+        while True:
+            try:
+                self.idle.put(self.newWorker())
+                return
+            except (OSError, RuntimeError) as e:
+                print(f"[ERROR] Cannot start a worker: {e}, retrying in 10s")
+                time.sleep(10)
+
+    def handle(self, request, started):
+        # Gator writes its output relative to the working directory
+        if os.path.realpath(request["cwd"]) != self.cwd:
+            return {"error": f"daemon serves {self.cwd}"}
+        worker = self.idle.get()
+        started(worker.process.pid)
+        start = time.time()
+        retval, usedHeap, maxHeap = worker.run(request["log"], request["args"], request.get("timeout", 0))
+        print(f"[INFO] {worker.name} job {worker.jobs}: exit {retval} in {time.time() - start:.1f}s"
+              + (f", {usedHeap // (1 << 20)}MB heap retained" if usedHeap is not None else ""))
+        if usedHeap is None:
+            reason = "worker exited"
+        elif worker.jobs >= self.maxJobs:
+            reason = f"{worker.jobs} jobs served"
+        elif usedHeap > self.heapRecycle * maxHeap:
+            reason = f"heap above {self.heapRecycle:.0%} after GC"
+        else:
+            reason = None
+        if reason is None:
+            self.idle.put(worker)
+        else:
+            print(f"[INFO] Recycling {worker.name}: {reason}")
+            threading.Thread(target = self.replace, args = (worker,), daemon = True).start()
+        return {"retval": retval}
+
+    def shutdown(self):
+        while not self.idle.empty():
+            self.idle.get().stop()
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return
+        response = self.server.daemon.handle(json.loads(line.decode('utf-8')), self.started)
+        self.wfile.write((json.dumps(response) + "\n").encode('utf-8'))
+
+    def started(self, pid):
+        # Lets the client sample the worker process while it runs the job
+        self.wfile.write((json.dumps({"pid": pid}) + "\n").encode('utf-8'))
+        self.wfile.flush()
+
+class DaemonServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+def serve(params):
+    import runGatorOnApk as runApk
+    configs = runApk.GlobalConfigs()
+    runApk.determinGatorRootAndSDKPath(configs)
+    port = runApk.CONFIG.get("daemon_port", DEFAULT_PORT)
+    workers = runApk.CONFIG.get("daemon_workers", 1)
+    maxJobs = runApk.CONFIG.get("daemon_max_jobs", 50)
+    heapRecycle = runApk.CONFIG.get("daemon_heap_recycle", 0.75)
+    i = 0
+    while i < len(params):
+        var = params[i]
+        i += 1
+        try:
+            if var == "--workers":
+                workers = int(params[i])
+            elif var == "--port":
+                port = int(params[i])
+            elif var == "--max-jobs":
+                maxJobs = int(params[i])
+            elif var == "--heap-recycle":
+                heapRecycle = float(params[i])
+            else:
+                runApk.fatalError(f"Unknown option: {var}")
+        except (IndexError, ValueError):
+            runApk.fatalError(f"{var} expects a number")
+        i += 1
+    if workers < 1 or maxJobs < 1:
+        runApk.fatalError("--workers and --max-jobs must be at least 1")
+
+    # Workers only map an existing class-data sharing archive; runs of the runner scripts record it
+    cds = runApk.gatorAppCDS(configs)
+    cdsOptions = cds.launchOptions(build = False)[0] if cds else []
+    classPath = cds.classPath() if cds else runApk.gatorClassPath(configs)
+    toolchain = runApk.javaToolchain(configs)
+    javaCommand = [toolchain.java, f'-Xmx{runApk.CONFIG["java_memory"]}'] + cdsOptions + toolchain.jvmOptions() \
+        + ['-classpath', classPath]
+    env = os.environ.copy()
+    env['GatorRoot'] = configs.GATOR_ROOT
+    print(f"[INFO] Starting {workers} Gator worker(s) for {os.getcwd()}")
+    daemon = GatorDaemon(javaCommand, env, workers, maxJobs, heapRecycle)
+    server = DaemonServer(("127.0.0.1", port), RequestHandler)
+    server.daemon = daemon
+    print(f"[OK] Gator daemon listening on 127.0.0.1:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("[INFO] Shutting down")
+    finally:
+        server.server_close()
+        daemon.shutdown()
+    return 0
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] != "serve":
+        print("Usage: python gatorDaemon.py serve [--workers K] [--port P] [--max-jobs N] [--heap-recycle F]")
+        print("  Run it from the directory the runner scripts are started in (usually AndroidBench)")
+        return 1
+    return serve(sys.argv[2:])
+
+if __name__ == '__main__':
+    sys.exit(main())
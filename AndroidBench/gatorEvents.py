@@ -0,0 +1,150 @@
+"""
+Consumer of the JSON-lines event stream Gator writes with -eventFile
+
+Each line is one event such as
+    {"t": 1734528121000, "event": "phaseEnd", "phase": "fixpoint", "wallMs": 5120, "iterations": 3}
+EventFollower tails the file while the analysis runs, reports progress and
+condenses the stream into the per-APK metrics.json. Usage outside the runners:
+    python gatorEvents.py <events.jsonl> [...]   print the metrics of finished runs
+"""
+import os, sys
+import json
+import threading
+
+EVENT_FILE = "events.jsonl"
+METRICS_FILE = "metrics.json"
+
+class EventMetrics:
+    """Summary of an event stream: phase durations and the counts reported by each step"""
+    def __init__(self):
+        self.benchmark = None
+        self.completed = False
+        self.phases = {}
+        self.counts = {}
+        self.wtgStages = []
+        self.events = 0
+        self.currentPhase = None
+
+    def add(self, event):
+        self.events += 1
+        name = event.get("event")
+        fields = {key: value for key, value in event.items() if key not in ("t", "event")}
+        if name == "start":
+            self.benchmark = event.get("benchmark")
+        elif name == "end":
+            self.completed = True
+        elif name == "phaseStart":
+            self.currentPhase = event.get("phase")
+        elif name == "phaseEnd":
+            phase = fields.pop("phase", None)
+            self.phases[phase] = {"wall_ms": fields.pop("wallMs", None), "cpu_ms": fields.pop("cpuMs", None)}
+            if fields:
+                self.counts[phase] = fields
+            self.currentPhase = None
+        elif name == "wtgStage":
+            self.wtgStages.append(fields)
+        else:
+            self.counts[name] = fields
+
+    def toDict(self):
+        data = {
+            "benchmark": self.benchmark,
+            "completed": self.completed,
+            "phases": self.phases,
+            "counts": self.counts,
+            "events": self.events
+        }
+        if self.wtgStages:
+            data["wtg_stages"] = self.wtgStages
+        return data
+
+def describeEvent(event):
+    """One-line progress message for the events worth showing live, else None"""
+    if event.get("event") != "phaseEnd":
+        return None
+    details = ", ".join(f"{key} {value}" for key, value in event.items()
+                        if key not in ("t", "event", "phase", "wallMs", "cpuMs"))
+    message = f"{event.get('phase')} done in {event.get('wallMs', 0) / 1000:.1f}s"
+    return message + (f" ({details})" if details else "")
+
+class EventFollower:
+    """Follows an event file written by a running Gator JVM"""
+    def __init__(self, path, label = None, showProgress = True, interval = 0.5):
+        self.path = path
+        self.label = label
+        self.showProgress = showProgress
+        self.interval = interval
+        self.metrics = EventMetrics()
+        self.offset = 0
+        self.partial = b""
+        self.stopped = threading.Event()
+        self.thread = None
+        # Never pick up the events of an earlier run in the same output directory
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def start(self):
+        self.thread = threading.Thread(target = self.follow, daemon = True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop following after reading everything the JVM wrote; returns the metrics"""
+        self.stopped.set()
+        if self.thread != None:
+            self.thread.join()
+        self.poll()
+        return self.metrics
+
+    def follow(self):
+        while not self.stopped.wait(self.interval):
+            self.poll()
+
+    def poll(self):
+        try:
+            with open(self.path, 'rb') as f:
+                f.seek(self.offset)
+                data = f.read()
+        except OSError:
+            return
+        self.offset += len(data)
+        lines = (self.partial + data).split(b"\n")
+        # The last piece is incomplete until the JVM writes its newline
+        self.partial = lines.pop()
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                event = json.loads(line.decode('utf-8'))
+            except ValueError:
+                continue
+            self.metrics.add(event)
+            message = describeEvent(event)
+            if message and self.showProgress:
+                print(f"[PROGRESS] {self.label}: {message}" if self.label else f"[PROGRESS] {message}")
+
+def loadMetrics(path):
+    metrics = EventMetrics()
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                metrics.add(json.loads(line))
+            except ValueError:
+                continue
+    return metrics
+
+def writeMetrics(path, metrics):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(metrics.toDict(), f, indent=2)
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python gatorEvents.py <events.jsonl> [...]")
+        return 1
+    for path in sys.argv[1:]:
+        print(json.dumps(loadMetrics(path).toDict(), indent=2))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,233 @@
+"""
+Gator JVM launch settings shared by runGator.py and runGatorOnApk.py
+
+Both runners used to probe the JDK (`java -version`, `which java`), scan
+SootAndroid/lib and assemble the platform classpath for every analysis, each
+in its own way. This module does that once per process:
+
+- the JDK probe is also stored in <GatorRoot>/cache/java_probe.json, keyed by
+  the resolved path and modification time of the `java` binary, so a new
+  process with the same JDK starts no JVM to find out its version;
+- the Gator classpath and the platform classpath of an API level are built
+  and checked once, and missing optional jars are reported once;
+- long command lines go through a JVM @argfile (JDK 9+), which keeps them
+  below the Windows command line limit.
+"""
+import os
+import re
+import json
+import glob
+import shutil
+import tempfile
+import threading
+import subprocess
+
+PROBE_FILE = "java_probe.json"
+MAIN_CLASS = "presto.android.Main"
+SUPPORT_LIBS = [
+    "android-support-annotations.jar",
+    "android-support-v4.jar",
+    "android-support-v7-appcompat.jar",
+    "android-support-v7-cardview.jar",
+    "android-support-v7-gridlayout.jar",
+    "android-support-v7-mediarouter.jar",
+    "android-support-v7-palette.jar",
+    "android-support-v7-preference.jar",
+    "android-support-v7-recyclerview.jar"
+]
+# Packages Soot reflects into on JDK 9+
+OPEN_PACKAGES = ["java.base/java.lang", "java.base/java.util", "java.base/java.io"]
+
+_lock = threading.Lock()
+_toolchains = {}
+_classPaths = {}
+_platformClassPaths = {}
+
+class LauncherError(Exception):
+    """The JDK or the Android platform needed for an analysis is missing"""
+
+class JavaToolchain:
+    """The JDK that runs Gator"""
+    def __init__(self, java, versionOutput, javaHome):
+        self.java = java
+        self.versionOutput = versionOutput
+        self.majorVersion = javaMajorVersion(versionOutput)
+        self.javaHome = javaHome
+        self.rtJar = None
+        if javaHome and 0 < self.majorVersion < 9:
+            # JDK 8 and older keep the class library in rt.jar; Soot needs it on its classpath
+            for candidate in (os.path.join(javaHome, "jre", "lib", "rt.jar"), os.path.join(javaHome, "lib", "rt.jar")):
+                if os.path.exists(candidate):
+                    self.rtJar = candidate
+                    break
+
+    def jvmOptions(self):
+        if self.majorVersion >= 9:
+            options = []
+            for package in OPEN_PACKAGES:
+                options.extend(['--add-opens', package + '=ALL-UNNAMED'])
+            return options
+        if self.rtJar:
+            return ['-Dsun.boot.class.path=' + self.rtJar]
+        return []
+
+    def mainOptions(self):
+        """Gator options that depend on the JDK; part of the mainArgs given to launchCommand"""
+        return ['-jre', self.rtJar] if self.rtJar else []
+
+    def supportsArgFile(self):
+        return self.majorVersion >= 9
+
+def javaMajorVersion(versionOutput):
+    match = re.search(r'version "(\d+)(?:\.(\d+))?', versionOutput or "")
+    if not match:
+        return 0
+    major = int(match.group(1))
+    if major == 1 and match.group(2):
+        # Old format: "1.8.0_381"
+        major = int(match.group(2))
+    return major
+
+def resolveJava():
+    """Absolute path of the `java` the runners start, or None if it is not on PATH"""
+    java = shutil.which("java")
+    return os.path.realpath(java) if java else None
+
+def probeJava(cacheDir = None):
+    """JavaToolchain of the `java` on PATH, probed at most once per JDK"""
+    java = resolveJava()
+    if java == None:
+        return JavaToolchain("java", None, os.environ.get("JAVA_HOME"))
+    try:
+        stat = os.stat(java)
+    except OSError:
+        return JavaToolchain(java, None, os.environ.get("JAVA_HOME"))
+    key = f"{java}|{stat.st_size}|{stat.st_mtime_ns}"
+    with _lock:
+        if key in _toolchains:
+            return _toolchains[key]
+        probePath = os.path.join(cacheDir, PROBE_FILE) if cacheDir else None
+        probes = loadProbes(probePath)
+        probe = probes.get(key)
+        if probe == None:
+            try:
+                versionOutput = subprocess.check_output([java, '-version'], stderr = subprocess.STDOUT,
+                                                        universal_newlines = True)
+            except (OSError, subprocess.CalledProcessError):
+                versionOutput = None
+            # JAVA_HOME wins, as for the JDK tools; otherwise <home>/bin/java
+            javaHome = os.environ.get("JAVA_HOME") or os.path.dirname(os.path.dirname(java))
+            probe = {"java": java, "version_output": versionOutput, "java_home": javaHome}
+            if versionOutput != None and probePath:
+                probes[key] = probe
+                saveProbes(probePath, probes)
+        toolchain = JavaToolchain(probe["java"], probe["version_output"], probe["java_home"])
+        _toolchains[key] = toolchain
+        return toolchain
+
+def loadProbes(probePath):
+    if not probePath:
+        return {}
+    try:
+        with open(probePath, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def saveProbes(probePath, probes):
+    try:
+        os.makedirs(os.path.dirname(probePath), exist_ok=True)
+        partial = f"{probePath}.{os.getpid()}.{threading.get_ident()}"
+        with open(partial, 'w', encoding='utf-8') as f:
+            json.dump(probes, f, indent=2)
+        os.replace(partial, probePath)
+    except OSError:
+        # Only costs a `java -version` in the next process
+        pass
+
+def libJars(gatorRoot):
+    return sorted(glob.glob(os.path.join(gatorRoot, "SootAndroid", "lib", "*.jar")))
+
+def gatorClassPath(gatorRoot):
+    """Classpath entries of the Gator JVM: SootAndroid/bin and every jar in SootAndroid/lib"""
+    libDir = os.path.join(gatorRoot, "SootAndroid", "lib")
+    try:
+        key = (gatorRoot, os.stat(libDir).st_mtime_ns)
+    except OSError:
+        key = (gatorRoot, None)
+    with _lock:
+        if key not in _classPaths:
+            _classPaths[key] = [os.path.join(gatorRoot, "SootAndroid", "bin")] + libJars(gatorRoot)
+        return list(_classPaths[key])
+
+def parseAPILevel(apiLevel):
+    """(Google APIs add-on?, level number) of "android-23" or "google-23" """
+    try:
+        return apiLevel.startswith("google"), int(apiLevel[apiLevel.find('-') + 1:])
+    except ValueError:
+        raise LauncherError(f"API Level not valid: {apiLevel}")
+
+def platformClassPath(sdkLocation, gatorRoot, apiLevel, output = None):
+    """Classpath entries Gator resolves the app against (-android), checked once per API level"""
+    key = (sdkLocation, gatorRoot, apiLevel)
+    with _lock:
+        if key in _platformClassPaths:
+            return list(_platformClassPaths[key])
+    google, level = parseAPILevel(apiLevel)
+    platformDir = os.path.join(sdkLocation, "platforms", f"android-{level}")
+    androidJar = os.path.join(platformDir, "android.jar")
+    if not os.path.exists(androidJar):
+        raise LauncherError(f"Android platform android-{level} is not installed: {androidJar} not found")
+    entries = [androidJar]
+    if google:
+        googleAPIDir = os.path.join(sdkLocation, "add-ons", f"addon-google_apis-google-{level}")
+        if not os.path.isdir(googleAPIDir):
+            raise LauncherError(f"Google API Level: {level} Not installed!")
+        entries.extend(sorted(glob.glob(os.path.join(googleAPIDir, "libs", "*.jar"))))
+    depsDir = os.path.join(gatorRoot, "SootAndroid", "deps")
+    missing = []
+    for lib in SUPPORT_LIBS:
+        path = os.path.join(depsDir, lib)
+        if os.path.exists(path):
+            entries.append(path)
+        else:
+            missing.append(lib)
+    if missing:
+        message = f"[WARN] Support libraries missing from {depsDir}: {', '.join(missing)}"
+        if output == None:
+            print(message)
+        else:
+            output.write(message + "\n")
+    if level >= 23:
+        # Apps targeting 23+ may still use the Apache HTTP client
+        apacheLib = os.path.join(platformDir, "optional", "org.apache.http.legacy.jar")
+        if os.path.exists(apacheLib):
+            entries.append(apacheLib)
+    with _lock:
+        _platformClassPaths[key] = entries
+    return list(entries)
+
+def quoteArg(arg):
+    return '"' + arg.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+def launchCommand(toolchain, jvmOptions, classPath, mainArgs, argDir = None):
+    """(command, argfile) starting Gator with mainArgs
+
+    The classpath, main class and Gator options go into an @argfile when the
+    JDK supports one; the caller removes it with removeArgFile once the JVM
+    has exited. argfile is None otherwise."""
+    command = [toolchain.java] + jvmOptions + toolchain.jvmOptions()
+    launchArgs = ['-classpath', os.pathsep.join(classPath), MAIN_CLASS] + mainArgs
+    if not toolchain.supportsArgFile():
+        return command + launchArgs, None
+    fd, argFile = tempfile.mkstemp(prefix = "gator-", suffix = ".args", dir = argDir)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write("\n".join(quoteArg(arg) for arg in launchArgs) + "\n")
+    return command + ['@' + argFile], argFile
+
+def removeArgFile(argFile):
+    if argFile:
+        try:
+            os.remove(argFile)
+        except OSError:
+            pass
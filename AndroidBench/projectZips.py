@@ -0,0 +1,148 @@
+"""
+Extraction of the zipped benchmark projects listed in runGator.py configs
+
+A zip is extracted next to itself, like `unzip` did. Its contents are first
+written to a staging directory named after the zip's hash and then renamed
+into place; a marker file (.<zip name>.extracted.json) is written last and
+records the hash and the top-level entries. An extraction interrupted at any
+point therefore leaves no marker and is redone on the next run, an unchanged
+zip is never extracted again, and a zip whose hash changed replaces its
+previously extracted tree.
+"""
+import os
+import json
+import time
+import shutil
+import zipfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import gatorCache
+
+MARKER_SUFFIX = ".extracted.json"
+# Entries macOS adds to zips it creates
+IGNORED_ENTRIES = {"__MACOSX"}
+
+_locks = {}
+_locksGuard = threading.Lock()
+
+def writeMessage(output, message):
+    if output == None:
+        print(message)
+    else:
+        output.write(message + "\n")
+
+def markerPath(zipPath, destDir):
+    return os.path.join(destDir, "." + os.path.basename(zipPath) + MARKER_SUFFIX)
+
+def loadMarker(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def writeMarker(path, marker):
+    partial = f"{path}.{os.getpid()}.{threading.get_ident()}"
+    with open(partial, 'w', encoding='utf-8') as f:
+        json.dump(marker, f, indent=2)
+    os.replace(partial, path)
+
+def topLevelEntries(zf):
+    entries = set()
+    for name in zf.namelist():
+        first = name.replace('\\', '/').lstrip('/').split('/')[0]
+        if first and first not in IGNORED_ENTRIES and first != "..":
+            entries.add(first)
+    return sorted(entries)
+
+def matchesTree(zf, destDir):
+    """True if every file of the zip exists below destDir with the same size"""
+    for info in zf.infolist():
+        if info.is_dir() or info.filename.split('/')[0] in IGNORED_ENTRIES:
+            continue
+        try:
+            if os.path.getsize(os.path.join(destDir, info.filename)) != info.file_size:
+                return False
+        except OSError:
+            return False
+    return True
+
+def extractMembers(zf, stagingDir):
+    for info in zf.infolist():
+        if info.filename.split('/')[0] in IGNORED_ENTRIES:
+            continue
+        path = zf.extract(info, stagingDir)
+        # Keep the executable bit of scripts such as gradlew, as unzip does
+        mode = (info.external_attr >> 16) & 0o777
+        if mode and not info.is_dir():
+            os.chmod(path, mode)
+
+def ensureExtracted(zipPath, destDir, output = None):
+    """Extract zipPath into destDir unless the same zip is already extracted there
+
+    Returns True if the zip was extracted by this call."""
+    zipPath = os.path.abspath(zipPath)
+    with _locksGuard:
+        lock = _locks.setdefault(zipPath, threading.Lock())
+    with lock:
+        stat = os.stat(zipPath)
+        marker = loadMarker(markerPath(zipPath, destDir))
+        stamp = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+        def treePresent(entries):
+            return all(os.path.exists(os.path.join(destDir, entry)) for entry in entries)
+
+        if marker != None and marker.get("stamp") == stamp and treePresent(marker.get("entries", [])):
+            return False
+        digest = gatorCache.fileSha256(zipPath)
+        with zipfile.ZipFile(zipPath) as zf:
+            entries = topLevelEntries(zf)
+            if marker != None and marker.get("sha256") == digest and treePresent(marker.get("entries", [])):
+                # Touched or copied, but the same content
+                writeMarker(markerPath(zipPath, destDir), dict(marker, stamp=stamp))
+                return False
+            if marker == None and entries and treePresent(entries) and matchesTree(zf, destDir):
+                # Extracted before markers existed; adopt it instead of extracting again
+                writeMarker(markerPath(zipPath, destDir), {"sha256": digest, "stamp": stamp, "entries": entries})
+                return False
+            writeMessage(output, "Unzipping: " + zipPath)
+            stagingDir = os.path.join(destDir, f".unzip-{digest[:16]}-{os.getpid()}-{threading.get_ident()}")
+            shutil.rmtree(stagingDir, ignore_errors=True)
+            start = time.time()
+            extractMembers(zf, stagingDir)
+        # A changed zip replaces what its previous version extracted
+        oldDir = stagingDir + ".old"
+        os.makedirs(oldDir, exist_ok=True)
+        staleEntries = set(entries) | set(marker.get("entries", []) if marker else [])
+        for entry in sorted(staleEntries):
+            if os.path.lexists(os.path.join(destDir, entry)):
+                os.replace(os.path.join(destDir, entry), os.path.join(oldDir, entry))
+        for entry in entries:
+            os.replace(os.path.join(stagingDir, entry), os.path.join(destDir, entry))
+        writeMarker(markerPath(zipPath, destDir), {"sha256": digest, "stamp": stamp, "entries": entries})
+        shutil.rmtree(oldDir, ignore_errors=True)
+        shutil.rmtree(stagingDir, ignore_errors=True)
+        writeMessage(output, f"Extracted {len(entries)} entr{'y' if len(entries) == 1 else 'ies'} "
+                             f"to {destDir} in {time.time() - start:.1f}s")
+        return True
+
+def extractAll(archives, jobs = None):
+    """Extract (zip, destination) pairs on a thread pool; returns the number of zips extracted"""
+    archives = list(dict.fromkeys(archives))
+    if not archives:
+        return 0
+    jobs = min(len(archives), jobs or os.cpu_count() or 1)
+
+    def extractOne(archive):
+        try:
+            return ensureExtracted(*archive)
+        except (OSError, zipfile.BadZipFile) as e:
+            # The project using it fails with its own error later
+            print(f"[ERROR] Cannot extract {archive[0]}: {e}")
+            return False
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        extracted = sum(1 for result in executor.map(extractOne, archives) if result)
+    print(f"[INFO] Project archives: {extracted} extracted, {len(archives) - extracted} up to date")
+    return extracted
@@ -0,0 +1,188 @@
+"""
+Resource usage of a running Gator JVM
+
+ResourceSampler polls /proc/<pid> at a fixed interval and records RSS, CPU
+time and thread count as a time series (resources.jsonl). When GC logging is
+enabled the JVM also writes gc.log, which is parsed once the job is done. The
+summary of both goes to resources.json, next to the job's log.txt:
+
+    {"peak_rss_mb": 9312.5, "cpu_seconds": 812.4, "cpu_utilization": 1.7,
+     "gc": {"pauses": 212, "pause_total_ms": 10450.2, "gc_time_percent": 2.2, ...}}
+
+Sampling needs /proc (Linux); elsewhere only the GC log is summarized.
+Usage outside the runners: python resourceSampler.py <output dir> [...]
+"""
+import os, sys
+import re
+import json
+import time
+import threading
+
+SAMPLES_FILE = "resources.jsonl"
+SUMMARY_FILE = "resources.json"
+GC_LOG_FILE = "gc.log"
+
+# Unified logging (JDK 9+): "[3.105s][info][gc] GC(12) Pause Young (Normal) (G1 Evacuation Pause) 612M->80M(12288M) 15.934ms"
+UNIFIED_PAUSE = re.compile(r"\[([\d.]+)s\].*\bGC\(\d+\) Pause .* ([\d.]+)ms\s*$")
+# JDK 8 -Xloggc: "3.105: [GC (Allocation Failure)  612M->80M(12288M), 0.0159340 secs]"
+LEGACY_PAUSE = re.compile(r"^([\d.]+): \[(?:Full )?GC.*, ([\d.]+) secs\]\s*$")
+
+def gcLogOptions(javaMajorVersion, path):
+    """JVM options that write a parseable GC log to path"""
+    if javaMajorVersion >= 9:
+        return [f'-Xlog:gc:file={path}:uptime']
+    return [f'-Xloggc:{path}']
+
+def parseGCLog(path):
+    """Pause count and durations from a GC log, or None if there is no log"""
+    try:
+        f = open(path, 'r', encoding='utf-8', errors='replace')
+    except OSError:
+        return None
+    pauses = []
+    fullPauses = 0
+    uptime = 0.0
+    with f:
+        for line in f:
+            match = UNIFIED_PAUSE.search(line)
+            if match:
+                uptime = float(match.group(1))
+                pauses.append(float(match.group(2)))
+                fullPauses += " Pause Full " in line
+                continue
+            match = LEGACY_PAUSE.search(line)
+            if match:
+                uptime = float(match.group(1))
+                pauses.append(float(match.group(2)) * 1000)
+                fullPauses += "[Full GC" in line
+    total = sum(pauses)
+    return {
+        "pauses": len(pauses),
+        "full_pauses": fullPauses,
+        "pause_total_ms": round(total, 1),
+        "max_pause_ms": round(max(pauses), 1) if pauses else 0,
+        # Relative to the JVM uptime at the last logged pause
+        "gc_time_percent": round(100 * total / 1000 / uptime, 2) if uptime > 0 else 0
+    }
+
+def procAvailable():
+    return os.path.isdir("/proc/self")
+
+def readProcSample(pid):
+    """(rssBytes, cpuSeconds, threads) of a process, or None once it is gone"""
+    try:
+        with open(f"/proc/{pid}/stat", 'r') as f:
+            stat = f.read()
+        with open(f"/proc/{pid}/status", 'r') as f:
+            status = f.read()
+    except OSError:
+        return None
+    # The command name may contain spaces; the fields we need follow its closing parenthesis
+    fields = stat[stat.rfind(")") + 2:].split()
+    cpuSeconds = (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+    rss = re.search(r"^VmRSS:\s+(\d+) kB", status, re.M)
+    threads = re.search(r"^Threads:\s+(\d+)", status, re.M)
+    return (int(rss.group(1)) * 1024 if rss else 0, cpuSeconds, int(threads.group(1)) if threads else 0)
+
+class ResourceSampler:
+    """Samples one process until stop() and summarizes it into outputDir"""
+    def __init__(self, outputDir, interval = 1.0, gcLog = None):
+        self.outputDir = outputDir
+        self.interval = interval
+        self.gcLog = gcLog
+        self.pid = None
+        self.startTime = None
+        self.endTime = None
+        self.stopped = threading.Event()
+        self.thread = None
+        self.peakRss = 0
+        self.peakThreads = 0
+        self.firstCpu = None
+        self.lastCpu = None
+        self.samples = 0
+        self.samplesPath = os.path.join(outputDir, SAMPLES_FILE)
+
+    def start(self, pid):
+        self.pid = pid
+        self.startTime = time.time()
+        if procAvailable():
+            self.thread = threading.Thread(target = self.run, daemon = True)
+            self.thread.start()
+
+    def run(self):
+        with open(self.samplesPath, 'w', encoding='utf-8') as out:
+            while True:
+                sample = readProcSample(self.pid)
+                if sample == None:
+                    break
+                self.record(out, *sample)
+                if self.stopped.wait(self.interval):
+                    break
+
+    def record(self, out, rss, cpuSeconds, threads):
+        if self.firstCpu == None:
+            # A daemon worker has used CPU before this job started
+            self.firstCpu = cpuSeconds
+        self.lastCpu = cpuSeconds
+        self.peakRss = max(self.peakRss, rss)
+        self.peakThreads = max(self.peakThreads, threads)
+        self.samples += 1
+        out.write(json.dumps({
+            "t": round(time.time() - self.startTime, 2),
+            "rss_mb": round(rss / (1 << 20), 1),
+            "cpu_s": round(cpuSeconds, 2),
+            "threads": threads
+        }) + "\n")
+        out.flush()
+
+    def stop(self):
+        """Stop sampling and write the summary; returns it
+
+        A sampler that was never started writes nothing and returns None, so
+        a job that never got a process leaves no empty summary behind."""
+        self.stopped.set()
+        if self.pid is None:
+            return None
+        if self.thread != None:
+            self.thread.join()
+        self.endTime = time.time()
+        summary = self.summary()
+        try:
+            with open(os.path.join(self.outputDir, SUMMARY_FILE), 'w', encoding='utf-8') as f:
+                json.dump(summary, f, indent=2)
+        except OSError:
+            pass
+        return summary
+
+    def summary(self):
+        wallSeconds = (self.endTime or time.time()) - (self.startTime or time.time())
+        summary = {"pid": self.pid, "wall_seconds": round(wallSeconds, 2), "samples": self.samples}
+        if self.samples:
+            cpuSeconds = self.lastCpu - self.firstCpu
+            summary.update({
+                "peak_rss_mb": round(self.peakRss / (1 << 20), 1),
+                "cpu_seconds": round(cpuSeconds, 2),
+                "cpu_utilization": round(cpuSeconds / wallSeconds, 2) if wallSeconds > 0 else 0,
+                "peak_threads": self.peakThreads
+            })
+        if self.gcLog != None:
+            summary["gc"] = parseGCLog(self.gcLog)
+        return summary
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python resourceSampler.py <output dir> [...]")
+        return 1
+    for outputDir in sys.argv[1:]:
+        summaryPath = os.path.join(outputDir, SUMMARY_FILE)
+        if os.path.exists(summaryPath):
+            with open(summaryPath, 'r', encoding='utf-8') as f:
+                print(f"{outputDir}: {json.load(f)}")
+        elif os.path.exists(os.path.join(outputDir, GC_LOG_FILE)):
+            print(f"{outputDir}: {{'gc': {parseGCLog(os.path.join(outputDir, GC_LOG_FILE))}}}")
+        else:
+            print(f"{outputDir}: no resource data")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
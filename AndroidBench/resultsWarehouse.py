@@ -0,0 +1,306 @@
+"""
+SQLite warehouse of Gator results
+
+Every analysis runGatorOnApk.py finishes is upserted into one database (by
+default <GatorRoot>/output/results.db), keyed by task and app and indexed by
+APK hash, app name, task and Gator build. A run row holds the exit code, the
+timings, the resource peaks and, when the client wrote a wtg.json, its summary;
+failed runs and runs of other clients get a row with empty WTG columns. activities, dialogs, event type counts and
+phase timings go into child tables. Cross-run questions then become queries:
+
+    python resultsWarehouse.py ingest [output dir]         backfill from existing task directories
+    python resultsWarehouse.py history <app>               all runs of one app
+    python resultsWarehouse.py compare <old task> <new task> [--threshold 0.1]
+                                                          apps whose analysis got slower or now fails
+    python resultsWarehouse.py top <column> [n]            runs with the largest value of a column
+    python resultsWarehouse.py sql "<query>"               anything else
+
+--db <path> selects another database.
+"""
+import os, sys
+import json
+import sqlite3
+import threading
+from datetime import datetime
+
+import gatorEvents
+import resourceSampler
+
+DB_FILE = "results.db"
+# Written by the runner next to wtg.json: when and how long the analysis ran, and with which options
+RUN_FILE = "run.json"
+SCHEMA_VERSION = 1
+
+SUMMARY_COLUMNS = ("total_nodes", "total_edges", "launcher_nodes", "activity_nodes", "dialog_nodes",
+                   "menu_nodes", "total_event_handlers", "total_callbacks")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    task TEXT NOT NULL,
+    app TEXT NOT NULL,
+    apk_sha256 TEXT,
+    gator_build TEXT,
+    options TEXT,
+    api_level TEXT,
+    output_dir TEXT,
+    retval INTEGER,
+    cached INTEGER NOT NULL DEFAULT 0,
+    analysis_time TEXT,
+    duration_seconds REAL,
+    gator_seconds REAL,
+    total_nodes INTEGER,
+    total_edges INTEGER,
+    launcher_nodes INTEGER,
+    activity_nodes INTEGER,
+    dialog_nodes INTEGER,
+    menu_nodes INTEGER,
+    total_event_handlers INTEGER,
+    total_callbacks INTEGER,
+    peak_rss_mb REAL,
+    cpu_seconds REAL,
+    gc_pause_ms REAL,
+    ingested_at TEXT NOT NULL,
+    UNIQUE (task, app)
+);
+CREATE INDEX IF NOT EXISTS runs_apk ON runs (apk_sha256);
+CREATE INDEX IF NOT EXISTS runs_app ON runs (app);
+CREATE INDEX IF NOT EXISTS runs_build ON runs (gator_build);
+CREATE TABLE IF NOT EXISTS phases (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    phase TEXT NOT NULL,
+    wall_ms INTEGER,
+    cpu_ms INTEGER,
+    PRIMARY KEY (run_id, phase)
+);
+CREATE TABLE IF NOT EXISTS activities (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    name TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS activities_run ON activities (run_id);
+CREATE TABLE IF NOT EXISTS dialogs (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    name TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS dialogs_run ON dialogs (run_id);
+CREATE TABLE IF NOT EXISTS event_types (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    event_type TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (run_id, event_type)
+);
+CREATE INDEX IF NOT EXISTS event_types_type ON event_types (event_type);
+"""
+
+def loadJSONFile(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def loadRunInfo(outputDir):
+    return loadJSONFile(os.path.join(outputDir, RUN_FILE))
+
+def writeRunInfo(outputDir, info):
+    path = os.path.join(outputDir, RUN_FILE)
+    with open(path + ".tmp", 'w', encoding='utf-8') as f:
+        json.dump(info, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+class ResultsWarehouse:
+    """One SQLite database shared by all jobs of a process (and, through SQLite's locking, by other processes)"""
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.lock = threading.Lock()
+        # Batch workers of other processes may write at the same time; wait for their transactions
+        self.connection = sqlite3.connect(path, timeout = 60, check_same_thread = False)
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        try:
+            self.connection.execute("PRAGMA journal_mode = WAL")
+        except sqlite3.OperationalError:
+            # WAL needs shared memory, which some network file systems lack
+            pass
+        with self.connection:
+            self.connection.executescript(SCHEMA)
+            self.connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+    def ingest(self, outputDir, task, app, apkSha256 = None, gatorBuild = None, options = None, apiLevel = None,
+               retval = None, cached = False, gatorSeconds = None):
+        """Upsert the results in one output directory; returns the run id
+
+        The WTG columns and tables stay empty without a wtg.json (failed runs,
+        other clients). Returns None for a directory that holds no analysis:
+        no wtg.json, no run.json and no exit code given."""
+        wtg = loadJSONFile(os.path.join(outputDir, "wtg.json"))
+        runInfo = loadRunInfo(outputDir)
+        if wtg == None and runInfo == None and retval == None:
+            return None
+        wtg = wtg or {}
+        summary = wtg.get("summary", {})
+        # Results from before run.json carry the runner's timing inside wtg.json
+        runInfo = runInfo or wtg
+        if gatorSeconds == None:
+            gatorSeconds = runInfo.get("gator_seconds")
+        if retval == None:
+            retval = runInfo.get("retval")
+        if options == None:
+            options = runInfo.get("options")
+        if apiLevel == None:
+            apiLevel = runInfo.get("api_level")
+        cached = cached or runInfo.get("cached", False)
+        resources = loadJSONFile(os.path.join(outputDir, resourceSampler.SUMMARY_FILE)) or {}
+        timings = wtg.get("timings")
+        if not timings:
+            # Older builds only reported phase times through the event stream
+            metrics = loadJSONFile(os.path.join(outputDir, gatorEvents.METRICS_FILE)) or {}
+            timings = metrics.get("phases", {})
+        row = {
+            "task": task,
+            "app": app,
+            "apk_sha256": apkSha256,
+            "gator_build": gatorBuild,
+            "options": " ".join(options) if options != None else None,
+            "api_level": str(apiLevel) if apiLevel != None else None,
+            "output_dir": os.path.abspath(outputDir),
+            "retval": retval,
+            "cached": 1 if cached else 0,
+            "analysis_time": runInfo.get("analysis_time", wtg.get("analysis_time")),
+            "duration_seconds": runInfo.get("analysis_duration_seconds"),
+            "gator_seconds": round(gatorSeconds, 3) if gatorSeconds != None else None,
+            "peak_rss_mb": resources.get("peak_rss_mb"),
+            "cpu_seconds": resources.get("cpu_seconds"),
+            "gc_pause_ms": (resources.get("gc") or {}).get("pause_total_ms"),
+            "ingested_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        }
+        for column in SUMMARY_COLUMNS:
+            row[column] = summary.get(column)
+        columns = ", ".join(row)
+        placeholders = ", ".join("?" for _ in row)
+        with self.lock, self.connection:
+            # Replacing the row deletes the child rows of the previous ingest through the cascade
+            self.connection.execute("DELETE FROM runs WHERE task = ? AND app = ?", (task, app))
+            runId = self.connection.execute(f"INSERT INTO runs ({columns}) VALUES ({placeholders})",
+                                            list(row.values())).lastrowid
+            self.connection.executemany("INSERT INTO phases VALUES (?, ?, ?, ?)",
+                                        [(runId, phase, times.get("wall_ms"), times.get("cpu_ms"))
+                                         for phase, times in timings.items() if isinstance(times, dict)])
+            self.connection.executemany("INSERT INTO activities VALUES (?, ?)",
+                                        [(runId, name) for name in wtg.get("activities", [])])
+            self.connection.executemany("INSERT INTO dialogs VALUES (?, ?)",
+                                        [(runId, name) for name in wtg.get("dialogs", [])])
+            self.connection.executemany("INSERT INTO event_types VALUES (?, ?, ?)",
+                                        [(runId, name, count) for name, count in wtg.get("event_types", {}).items()])
+        return runId
+
+    def ingestTree(self, outputRoot):
+        """Ingest every output/<task>/<app> directory that has a wtg.json or run.json; returns the number ingested"""
+        count = 0
+        for task in sorted(os.listdir(outputRoot)):
+            taskDir = os.path.join(outputRoot, task)
+            if not os.path.isdir(taskDir):
+                continue
+            for app in sorted(os.listdir(taskDir)):
+                if self.ingest(os.path.join(taskDir, app), task, app) != None:
+                    count += 1
+        return count
+
+    def query(self, sql, params = ()):
+        """(column names, rows) of a query"""
+        with self.lock:
+            cursor = self.connection.execute(sql, params)
+            return ([description[0] for description in cursor.description or []], cursor.fetchall())
+
+def defaultPath(gatorRoot):
+    return os.path.join(gatorRoot, "output", DB_FILE)
+
+def printTable(columns, rows):
+    if not columns:
+        return
+    cells = [[("" if value == None else str(value)) for value in row] for row in rows]
+    widths = [max([len(column)] + [len(row[i]) for row in cells]) for i, column in enumerate(columns)]
+    print("  ".join(column.ljust(widths[i]) for i, column in enumerate(columns)))
+    for row in cells:
+        print("  ".join(value.ljust(widths[i]) for i, value in enumerate(row)))
+    print(f"({len(rows)} row(s))")
+
+def compareTasks(warehouse, oldTask, newTask, threshold):
+    """Apps analyzed in both tasks that now fail, or whose analysis time grew by more than threshold"""
+    # Backfilled runs only know the duration recorded in wtg.json
+    return warehouse.query("""
+        SELECT app, old_retval, new_retval, old_seconds, new_seconds,
+               ROUND(new_seconds / old_seconds - 1, 3) AS change,
+               old_nodes, new_nodes, old_edges, new_edges
+        FROM (SELECT new.app, old.retval AS old_retval, new.retval AS new_retval,
+                     COALESCE(old.gator_seconds, old.duration_seconds) AS old_seconds,
+                     COALESCE(new.gator_seconds, new.duration_seconds) AS new_seconds,
+                     old.total_nodes AS old_nodes, new.total_nodes AS new_nodes,
+                     old.total_edges AS old_edges, new.total_edges AS new_edges
+              FROM runs AS new JOIN runs AS old ON old.app = new.app
+              WHERE old.task = ? AND new.task = ? AND new.cached = 0 AND old.cached = 0)
+        WHERE (old_retval = 0 AND new_retval != 0)
+           OR (old_seconds > 0 AND new_seconds > old_seconds * (1 + ?))
+        ORDER BY new_retval != 0 DESC, change DESC""", (oldTask, newTask, threshold))
+
+def main():
+    args = sys.argv[1:]
+    dbPath = None
+    if "--db" in args:
+        i = args.index("--db")
+        dbPath = args[i + 1]
+        del args[i:i + 2]
+    threshold = 0.1
+    if "--threshold" in args:
+        i = args.index("--threshold")
+        threshold = float(args[i + 1])
+        del args[i:i + 2]
+    if not args:
+        print(__doc__)
+        return 1
+    gatorRoot = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if dbPath == None:
+        dbPath = defaultPath(gatorRoot)
+    command = args[0]
+    if command != "ingest" and not os.path.exists(dbPath):
+        print(f"[ERROR] No results database at {dbPath}")
+        return 1
+    warehouse = ResultsWarehouse(dbPath)
+    if command == "ingest":
+        outputRoot = args[1] if len(args) > 1 else os.path.join(gatorRoot, "output")
+        print(f"[OK] Ingested {warehouse.ingestTree(outputRoot)} result(s) from {outputRoot} into {dbPath}")
+    elif command == "history" and len(args) > 1:
+        printTable(*warehouse.query("""
+            SELECT task, analysis_time, retval, gator_seconds, peak_rss_mb, total_nodes, total_edges,
+                   activity_nodes, dialog_nodes, cached, substr(gator_build, 1, 12) AS build
+            FROM runs WHERE app = ? ORDER BY task""", (args[1],)))
+    elif command == "compare" and len(args) > 2:
+        printTable(*compareTasks(warehouse, args[1], args[2], threshold))
+    elif command == "top" and len(args) > 1:
+        column = args[1]
+        if column not in ("gator_seconds", "duration_seconds", "peak_rss_mb", "cpu_seconds", "gc_pause_ms")\
+                + SUMMARY_COLUMNS:
+            print(f"[ERROR] Unknown column: {column}")
+            return 1
+        limit = int(args[2]) if len(args) > 2 else 20
+        printTable(*warehouse.query(f"SELECT task, app, {column} FROM runs WHERE {column} IS NOT NULL "
+                                    f"ORDER BY {column} DESC LIMIT ?", (limit,)))
+    elif command == "sql" and len(args) > 1:
+        try:
+            printTable(*warehouse.query(args[1]))
+        except sqlite3.Error as e:
+            print(f"[ERROR] {e}")
+            return 1
+    else:
+        print(__doc__)
+        return 1
+    warehouse.close()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,14 +3,22 @@ import sys
 sys.dont_write_bytecode = True
 
 import os
-import json, subprocess, glob
+import json, subprocess
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
 import runGatorOnApk as runApk
+import gatorLauncher
+import projectZips
 
 PROJ_TYPE_APK=0
 PROJ_TYPE_ECLIPSE=1
 PROJ_TYPE_STUDIO=2
 PROJ_TYPE_UNKNOWN=3
 
+# Heap of the Gator JVM started for Eclipse and Studio projects
+PROJECT_HEAP="12G"
+
 class SootGlobalConfig:
     GatorRoot=""
     ADKLocation=""
@@ -26,6 +34,7 @@ class SootGlobalConfig:
     bSilent = False
     bDebug = False
     bExact = False
+    bForce = False
     pList = []
     jsonBASE_DIR=""
     jsonBASE_PARAM=""
@@ -38,6 +47,40 @@ class SootGlobalConfig:
     projList = []
     AppPath=""
     AppAPILevel=""
+    jobs = 1
+
+class RunSettings:
+    """What a project run needs from the command line, fixed before any project starts
+
+    Projects get their paths from here rather than from the current directory
+    or SootGlobalConfig, so several of them can run at the same time."""
+    def __init__(self, gatorRoot, adkLocation, outputDir, force = False, debug = False):
+        self.gatorRoot = gatorRoot
+        self.adkLocation = adkLocation
+        self.outputDir = outputDir
+        self.force = force
+        self.debug = debug
+
+    @staticmethod
+    def fromGlobalConfig():
+        configFile = SootGlobalConfig.ConfigFile
+        if configFile != "":
+            # Extract only the filename without path (e.g., "apv/config.json" -> "config")
+            baseName = os.path.basename(configFile)
+            dirName = baseName[:baseName.find('.')]
+        else:
+            dirName = "output"
+        return RunSettings(gatorRoot = SootGlobalConfig.GatorRoot,
+                           adkLocation = SootGlobalConfig.ADKLocation,
+                           outputDir = os.path.join(SootGlobalConfig.CurrentWorkingDir, dirName),
+                           force = SootGlobalConfig.bForce,
+                           debug = SootGlobalConfig.bDebug)
+
+def writeMessage(output, message):
+    if output == None:
+        print(message)
+    else:
+        output.write(message + "\n")
 
 class ProjectS:
     def __init__(
@@ -66,41 +109,33 @@ class ProjectS:
         return curLine
         pass
 
-    def doUnzip(self):
-        print("Unzipping: " + self.zip)
-        subprocess.call("unzip " + self.zip, shell=True)
+    def zipDirectory(self):
+        """Directory the project zip is extracted into: the one containing it"""
+        lastSlash = len(self.zip) - 1
+        while lastSlash >= 0 and self.zip[lastSlash] == '/':
+            lastSlash -= 1;
+        while lastSlash >= 0 and self.zip[lastSlash] != '/':
+            lastSlash -= 1;
+        if lastSlash <= 0:
+            print("Path information Error in " + self.__str__())
+            sys.exit(-1)
+        return self.zip[:lastSlash]
+
+    def doUnzip(self, output = None):
+        try:
+            projectZips.ensureExtracted(self.zip, self.zipDirectory(), output)
+        except (OSError, zipfile.BadZipFile) as e:
+            fatalError(f"Cannot extract {self.zip}: {e}")
         pass
 
-    def execute(self):
-        configFile = SootGlobalConfig.ConfigFile
-        if configFile != "":
-            # Extract only the filename without path (e.g., "apv/config.json" -> "config")
-            baseName = os.path.basename(configFile)
-            dirName = baseName[:baseName.find('.')]
-        else:
-            dirName = "output"
-        pathName = SootGlobalConfig.CurrentWorkingDir + "/" + dirName
-        if not os.path.exists(pathName):
-            os.mkdir(pathName)
+    def execute(self, settings, output = None):
+        """Run Gator on this project; returns the exit code of the analysis"""
+        pathName = settings.outputDir
+        os.makedirs(pathName, exist_ok=True)
         if self.zip != "":
-            #May Need to firstly unzip
-            pcwd = os.getcwd()
-            lastSlash = len(self.zip) - 1
-            while lastSlash >= 0 and self.zip[lastSlash] == '/':
-                lastSlash -= 1;
-            while lastSlash >= 0 and self.zip[lastSlash] != '/':
-                lastSlash -= 1;
-            if lastSlash <= 0:
-                print("Path information Error in " + self.__str__())
-                sys.exit(-1)
-            parPath = self.zip[:lastSlash]
-            os.chdir(parPath)
-            if not os.path.exists(self.path):
-                self.doUnzip()
-            os.chdir(pcwd)
+            # Extracts only when the zip changed since it was last extracted
+            self.doUnzip(output)
             pass
-        pcwd = os.getcwd();
-        os.chdir(pathName);
         GatorOptions=""
         if self.client != '':
             GatorOptions = '{0} -client {1} {2}'.format(\
@@ -113,37 +148,56 @@ class ProjectS:
             # It is an eclipse project
             manifestPath = self.path + "/AndroidManifest.xml"
             (classPath, resPath, depLibs) = parseEclipseProject(self.path)
-            invokeGatorOnProject(projPath = self.path,\
+            retval = invokeGatorOnProject(projPath = self.path,\
                                 resPath = resPath,\
                                 manifestPath = manifestPath,\
                                 classPath = classPath,\
                                 apiLevel = self.API,\
                                 extraLib = depLibs,\
                                 benchmarkName = self.name,\
-                                options = GatorOptions)
+                                options = GatorOptions,\
+                                settings = settings,\
+                                output = output)
             pass
         elif appType == PROJ_TYPE_STUDIO:
             # It is an Android Studio project
             manifestPath = self.path + "/app/src/main/AndroidManifest.xml"
             resPath = self.path + "/app/build/intermediates/res/merged/debug"
             classPath = self.path + "/app/build/intermediates/classes/debug"
-            invokeGatorOnProject(projPath = self.path,\
+            retval = invokeGatorOnProject(projPath = self.path,\
                                 resPath = resPath,\
                                 manifestPath = manifestPath,\
                                 classPath = classPath,\
                                 apiLevel = self.API,\
                                 extraLib = self.extraLib,\
                                 benchmarkName = self.name,\
-                                options = GatorOptions)
+                                options = GatorOptions,\
+                                settings = settings,\
+                                output = output)
             pass
         elif appType == PROJ_TYPE_APK:
             # It is an apk
-            runApk.runGatorOnAPKDirect(self.path, GatorOptions.split(), False)
+            retval = runApk.runGatorOnAPKDirect(self.path, GatorOptions.split(), False, output = output,
+                                                configs = apkRunConfigs(settings))
             pass
         else:
             fatalError("Unknown project type, abort!")
-        os.chdir(pcwd)
-        print(self.name + " FINISHED")
+        writeMessage(output, self.name + " FINISHED")
+        return retval
+
+    def heapBytes(self):
+        """JVM heap the analysis of this project reserves"""
+        if self.path[-4:] == ".apk":
+            return runApk.parseMemorySize(runApk.CONFIG["java_memory"])
+        return runApk.parseMemorySize(PROJECT_HEAP)
+
+def apkRunConfigs(settings):
+    """runGatorOnApk configs carrying the options runGator.py forwards to APK analyses"""
+    configs = runApk.GlobalConfigs()
+    configs.GATOR_ROOT = settings.gatorRoot
+    configs.ADK_ROOT = settings.adkLocation
+    configs.FORCE = settings.force
+    return configs
 
 def parseEclipseProject(eclipseProjDir):
     depLibs = ""
@@ -176,18 +230,6 @@ def pathExists(pathName):
         return True
     return False;
 
-def extractLibsFromPath(pathName):
-    if not pathExists(pathName):
-        return ""
-        pass
-    fileList = glob.glob(pathName+"/*.jar")
-    if len(fileList) == 0:
-        return ""
-    ret = ""
-    for item in fileList:
-        ret += os.pathsep + item
-    return ret;
-
 def invokeGatorOnProject(\
                 projPath,
                 resPath,
@@ -196,170 +238,60 @@ def invokeGatorOnProject(\
                 apiLevel,
                 extraLib,
                 benchmarkName,
-                options):
-    ''''''
-    SootAndroidLocation = os.path.normpath(os.path.join(SootGlobalConfig.GatorRoot, "SootAndroid"))
-    sdkLocation = os.path.normpath(SootGlobalConfig.ADKLocation)
-    bGoogleAPI = False
-    if len(apiLevel) > 6:
-        if apiLevel[:6] == "google":
-            bGoogleAPI = True
-    sLevelNum = apiLevel[apiLevel.find('-') + 1:]
+                options,
+                settings,
+                output = None):
+    '''Run the Gator JVM on a source project inside settings.outputDir; returns its exit code'''
+    SootAndroidLocation = os.path.normpath(os.path.join(settings.gatorRoot, "SootAndroid"))
+    sdkLocation = os.path.normpath(settings.adkLocation)
     try:
-        iLevelNum = int(sLevelNum)
-    except:
-        fatalError("FATALERROR: API Level not valid")
-    if (bGoogleAPI):
-        GoogleAPIDir = os.path.normpath(os.path.join(sdkLocation, 
-            "add-ons", "addon-google_apis-google-" + sLevelNum))
-        if not pathExists(GoogleAPIDir) :
-            print("Google API Level:" + sLevelNum + "Not installed!")
-            sys.exit(-1);
-        GoogleAPI = extractLibsFromPath(os.path.join(GoogleAPIDir, "libs"))
-    PlatformAPIDir = os.path.normpath(os.path.join(sdkLocation,
-            "platforms", "android-" + str(iLevelNum)))
-    # 强制包含 sootclasses.jar
-    sootJarPath = os.path.normpath(os.path.join(SootAndroidLocation, "lib", "sootclasses.jar"))
-    ClassPathJar = extractLibsFromPath(os.path.join(SootAndroidLocation, "lib"))
-    ClassPathJar = os.path.normpath(os.path.join(SootAndroidLocation, "bin")) + os.pathsep + sootJarPath + ClassPathJar
-    # 修正 classPath，确保不为空且路径存在
-    if not classPath or not os.path.exists(classPath):
-        classPath = os.path.normpath(os.path.join(SootAndroidLocation, "bin"))
-    PlatformJar = os.path.normpath(os.path.join(sdkLocation, "platforms", "android-" + sLevelNum, "android.jar"))
-    if bGoogleAPI:
-        PlatformJar += GoogleAPI
-    if iLevelNum >= 14:
-        supportLibs = [
-            "android-support-annotations.jar",
-            "android-support-v4.jar", 
-            "android-support-v7-appcompat.jar",
-            "android-support-v7-cardview.jar",
-            "android-support-v7-gridlayout.jar",
-            "android-support-v7-mediarouter.jar",
-            "android-support-v7-palette.jar",
-            "android-support-v7-preference.jar",
-            "android-support-v7-recyclerview.jar"
-        ]
-        for lib in supportLibs:
-            PlatformJar += os.pathsep + os.path.normpath(os.path.join(SootAndroidLocation, "deps", lib))
+        _, iLevelNum = gatorLauncher.parseAPILevel(apiLevel)
+        platformEntries = gatorLauncher.platformClassPath(sdkLocation, settings.gatorRoot, apiLevel, output)
+    except gatorLauncher.LauncherError as e:
+        fatalError("FATALERROR: " + str(e))
     if extraLib != None and extraLib != "":
         # extraLib 可能包含冒号分隔的路径列表，需要转换为当前系统的分隔符
         extraLibPaths = extraLib.replace(":", os.pathsep).split(os.pathsep)
         for libPath in extraLibPaths:
             if libPath.strip():
-                PlatformJar += os.pathsep + os.path.normpath(libPath.strip())
-    
-    # 获取 JRE 路径和 Java 版本
-    jreLib = ""
-    javaVersion = 8  # 默认假设 Java 8
-    
-    # 检测 Java 版本
-    try:
-        versionOutput = subprocess.check_output(['java', '-version'], 
-                                              stderr=subprocess.STDOUT,
-                                              universal_newlines=True)
-        # 解析版本号（例如 "18.0.2.1" 或 "1.8.0_xxx"）
-        import re
-        match = re.search(r'version "(\d+)\.(\d+)', versionOutput)
-        if match:
-            majorVer = int(match.group(1))
-            if majorVer == 1:
-                # 旧版本格式 "1.8.x"
-                javaVersion = int(match.group(2))
-            else:
-                # 新版本格式 "9.x", "11.x", "18.x" 等
-                javaVersion = majorVer
-    except Exception as e:
-        if SootGlobalConfig.bDebug:
-            print("Warning: Could not detect Java version:", e)
-    
-    # 根据 Java 版本获取适当的库路径
-    javaHome = os.environ.get("JAVA_HOME")
-    if not javaHome:
-        # 尝试从 java 命令推断
-        try:
-            javaCmd = subprocess.check_output(['where' if sys.platform == 'win32' else 'which', 'java'], 
-                                            stderr=subprocess.STDOUT,
-                                            universal_newlines=True).strip().split('\n')[0]
-            javaHome = os.path.dirname(os.path.dirname(javaCmd))
-        except Exception:
-            pass
-    
-    if javaHome and javaVersion >= 9:
-        # Java 9+ 使用模块系统，不需要 rt.jar
-        # 我们将使用空的 jreLib，Soot 会自动处理
-        jreLib = ""
-        if SootGlobalConfig.bDebug:
-            print(f"Detected Java {javaVersion}, using module system")
-    elif javaHome:
-        # Java 8 及以下，查找 rt.jar
-        rtJar = os.path.join(javaHome, "jre", "lib", "rt.jar")
-        if os.path.exists(rtJar):
-            jreLib = rtJar
-        else:
-            # 某些 JDK 的 rt.jar 直接在 lib 目录
-            rtJar = os.path.join(javaHome, "lib", "rt.jar")
-            if os.path.exists(rtJar):
-                jreLib = rtJar
-        
-        if SootGlobalConfig.bDebug:
-            print(f"Detected Java {javaVersion}, rt.jar: {jreLib if jreLib else 'Not found'}")
-    
-    #Finished computing platform libraries
-    callList = [\
-                'java', \
-                '-Xmx12G']\
-    
-    # 对于 Java 9+，设置模块相关选项和必需的系统属性
-    if javaVersion >= 9:
-        # Java 9+ 需要添加模块访问权限
-        callList.extend([
-            '--add-opens', 'java.base/java.lang=ALL-UNNAMED',
-            '--add-opens', 'java.base/java.util=ALL-UNNAMED',
-            '--add-opens', 'java.base/java.io=ALL-UNNAMED'
-        ])
-        # 设置 Soot 需要的系统属性（Java 9+ 中这些属性已被移除）
-        callList.extend([
-            '-Djava.class.path=' + ClassPathJar,
-            '-Dsun.boot.class.path=',
-            '-Djava.ext.dirs=',
-            '-Djava.endorsed.dirs='
-        ])
-    elif jreLib:
-        # 只在 Java 8 且有 rt.jar 时设置 sun.boot.class.path
-        callList.extend(['-Dsun.boot.class.path=' + jreLib])
-    
-    callList.extend([\
-                '-classpath', ClassPathJar, \
-                'presto.android.Main'])
-    
-    # 只在 Java 8 且有 jreLib 时添加 -jre 参数
-    if javaVersion < 9 and jreLib:
-        callList.extend(['-jre', jreLib])
+                platformEntries.append(os.path.normpath(libPath.strip()))
+    # 修正 classPath，确保不为空且路径存在
+    if not classPath or not os.path.exists(classPath):
+        classPath = os.path.normpath(os.path.join(SootAndroidLocation, "bin"))
     
-    # 添加其余参数
-    callList.extend([\
+    # JDK 只探测一次，结果缓存在 <GatorRoot>/cache 中
+    toolchain = gatorLauncher.probeJava(os.path.join(settings.gatorRoot, "cache"))
+    mainArgs = [\
                 '-project', projPath,\
-                '-android', PlatformJar,\
+                '-android', os.pathsep.join(platformEntries),\
                 '-sdkDir', sdkLocation,\
                 '-classFiles', classPath, \
                 '-resourcePath', resPath, \
                 '-manifestFile', manifestPath,\
-                '-apiLevel', "android-" + sLevelNum,\
+                '-apiLevel', "android-" + str(iLevelNum),\
                 '-benchmarkName', benchmarkName,\
                 '-guiAnalysis',
                 '-listenerSpecFile', os.path.normpath(os.path.join(SootAndroidLocation, "listeners.xml")),\
-                '-wtgSpecFile', os.path.normpath(os.path.join(SootAndroidLocation, 'wtg.xml'))])
-    options = options.split()
-    callList.extend(options);
+                '-wtgSpecFile', os.path.normpath(os.path.join(SootAndroidLocation, 'wtg.xml'))]
+    mainArgs.extend(toolchain.mainOptions())
+    mainArgs.extend(options.split())
+    callList, argFile = gatorLauncher.launchCommand(toolchain, ['-Xmx' + PROJECT_HEAP],
+                                                    gatorLauncher.gatorClassPath(settings.gatorRoot),
+                                                    mainArgs, settings.outputDir)
     
     # 调试输出
-    if SootGlobalConfig.bDebug:
-        print("JRE Lib:", jreLib)
-        print("Command:", ' '.join(callList))
+    if settings.debug:
+        writeMessage(output, f"Java: {toolchain.java} (major version {toolchain.majorVersion}), rt.jar: {toolchain.rtJar or 'Not used'}")
+        writeMessage(output, "Command: " + ' '.join(callList))
+        if argFile:
+            writeMessage(output, "Arguments: " + ' '.join(mainArgs))
     
-    subprocess.call(callList)
-    pass
+    if output:
+        output.flush()
+    try:
+        return subprocess.call(callList, cwd = settings.outputDir, stdout = output, stderr = output)
+    finally:
+        gatorLauncher.removeArgFile(argFile)
 
 def fatalError(str):
     print(str)
@@ -593,6 +525,16 @@ def parseMainParam():
         elif val == '-e' or val == '--exact':
             SootGlobalConfig.bExact = True
             continue
+        elif val == '--force':
+            SootGlobalConfig.bForce = True
+            continue
+        elif val == '--jobs':
+            i += 1
+            try:
+                SootGlobalConfig.jobs = int(params[i])
+            except (IndexError, ValueError):
+                fatalError("--jobs expects a number")
+            continue
         elif val == "-app":
             i += 1
             SootGlobalConfig.AppPath = params[i]
@@ -633,8 +575,8 @@ def runOnSingleApp():
             SootGlobalConfig.paramBASE_CLIENT, SootGlobalConfig.paramBASE_CLIENT_PARAM)
         else:
             GatorParam = SootGlobalConfig.paramBASE_PARAM
-        runApk.runGatorOnAPKDirect(SootGlobalConfig.AppPath, GatorParam.split(), False)
-        return
+        return runApk.runGatorOnAPKDirect(SootGlobalConfig.AppPath, GatorParam.split(), False,
+                                          configs = apkRunConfigs(RunSettings.fromGlobalConfig()))
     elif appType == PROJ_TYPE_STUDIO or appType == PROJ_TYPE_ECLIPSE:
         #It is an Android Studio project or an eclipse project
         if SootGlobalConfig.AppAPILevel == "":
@@ -651,36 +593,83 @@ def runOnSingleApp():
             projParam = SootGlobalConfig.paramBASE_PARAM,\
             projClient = SootGlobalConfig.paramBASE_CLIENT,\
             projClientParam = SootGlobalConfig.paramBASE_CLIENT_PARAM)
-        curProj.execute()
-        return
+        return curProj.execute(RunSettings.fromGlobalConfig())
     elif appType == PROJ_TYPE_UNKNOWN:
         fatalError("Unknow project type, abort!")
-        return
-    pass
+    return 1
 
 def main():
     parseMainParam()
     if SootGlobalConfig.AppPath != "":
-        runOnSingleApp()
-        return
+        return 1 if runOnSingleApp() != 0 else 0
 
     print("Loading " + SootGlobalConfig.ConfigFile)
     jsData = loadJSON(SootGlobalConfig.ConfigFile)
     parseProjects(jsData)
     if SootGlobalConfig.bDebug:
         debugOutput()
+    selected = []
     if len(SootGlobalConfig.pList) > 0:
         for curStr in SootGlobalConfig.pList:
             for curItem in SootGlobalConfig.projList:
                 if (SootGlobalConfig.bExact and curStr == curItem.name) or ((not SootGlobalConfig.bExact) and curStr in curItem.name ):
-                    curItem.execute()
+                    selected.append(curItem)
     else:
-        for curItem in SootGlobalConfig.projList:
-            curItem.execute()
+        selected = list(SootGlobalConfig.projList)
+    settings = RunSettings.fromGlobalConfig()
+    # Extract all project zips up front, several at a time
+    projectZips.extractAll([(curItem.zip, curItem.zipDirectory()) for curItem in selected if curItem.zip != ""])
+    if SootGlobalConfig.jobs == 1:
+        failed = sum(1 for curItem in selected if curItem.execute(settings) != 0)
+    else:
+        failed = runProjectsConcurrently(selected, settings, SootGlobalConfig.jobs)
     print("All Done!")
-    pass
+    return 1 if failed > 0 else 0
+
+def runProjectsConcurrently(projects, settings, jobs):
+    """Run the projects on up to jobs threads, each writing to <output dir>/<project>.log
+
+    Returns the number of projects that failed."""
+    # A project selected by several -p patterns runs once
+    uniqueProjects = []
+    for curItem in projects:
+        if curItem not in uniqueProjects:
+            uniqueProjects.append(curItem)
+    jobs, _, budgetBytes = runApk.planBatchParallelism(jobs, None)
+    os.makedirs(settings.outputDir, exist_ok=True)
+    print(f"[INFO] Running {len(uniqueProjects)} project(s) with {jobs} parallel job(s), logs in {settings.outputDir}")
+    printLock = threading.Lock()
+    memoryGate = runApk.MemoryGate(budgetBytes)
+
+    def runOne(curItem):
+        logPath = os.path.join(settings.outputDir, curItem.name + ".log")
+        heapBytes = curItem.heapBytes()
+        memoryGate.acquire(heapBytes)
+        try:
+            with open(logPath, 'w', encoding='utf-8') as logFile:
+                try:
+                    retval = curItem.execute(settings, output = logFile)
+                except SystemExit as e:
+                    # fatalError() inside a worker must only fail this project
+                    retval = e.code if isinstance(e.code, int) and e.code != 0 else 1
+                except Exception as e:
+                    logFile.write(f"[ERROR] Analysis aborted: {e}\n")
+                    retval = 1
+        finally:
+            memoryGate.release(heapBytes)
+        with printLock:
+            if retval == 0:
+                print(f"[✓] {curItem.name} - SUCCESS")
+            else:
+                print(f"[✗] {curItem.name} - FAILED (exit code: {retval}, log: {logPath})")
+        return retval
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        results = list(executor.map(runOne, uniqueProjects))
+    failed = sum(1 for retval in results if retval != 0)
+    print(f"Total: {len(results)} | Success: {len(results) - failed} | Failed: {failed}")
+    return failed
 
 
 if __name__ == "__main__":
-    main()
-    pass
+    sys.exit(main())
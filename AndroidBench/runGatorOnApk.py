@@ -1,12 +1,33 @@
 import os, sys
+import socket
 import json, subprocess, glob
 import tempfile, shutil
 import threading
 import re
 import time
+import copy
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
-GLOBAL_DECODE_LOCK = threading.Lock()
+import gatorCache
+import gatorLauncher
+import gatorDaemon
+import gatorEvents
+import appCds
+import resourceSampler
+import resultsWarehouse
+import axmlReader
+import apkShards
+
+# apktool installs its framework (1.apk) on the first decode without any locking,
+# so only that first decode is serialized; later decodes run concurrently.
+FRAMEWORK_INSTALL_LOCK = threading.Lock()
+FRAMEWORK_READY = False
+
+SHARED_CACHES = {}
+SHARED_CACHES_LOCK = threading.Lock()
 
 # ========== Configuration ==========
 # You can modify these default values or use a config file
@@ -16,7 +37,32 @@ DEFAULT_CONFIG = {
     "java_memory": "12G",
     "apktool_jar": "apktool_2.9.1.jar",
     "apk_directory": r"C:\Code\experiment\Gator\AndroidBench\apk",
-    "analysis_timeout": 600  # 10 minutes default timeout
+    "analysis_timeout": 600,  # 10 minutes default timeout
+    "max_jobs": 1,  # number of APKs analyzed concurrently in batch mode
+    "decode_lookahead": 2,  # APKs decoded ahead of the running analyses in batch mode
+    "apktool_framework_dir": None,  # None = apktool's default framework location
+    "decode_mode": "resources",  # "resources" skips smali disassembly, "full" runs a complete apktool decode
+    "decode_cache": True,  # reuse apktool output for APKs with identical content
+    "decode_cache_dir": None,  # None = <GatorRoot>/cache/decode
+    "decode_cache_max_mb": 20480,
+    "result_cache": True,  # reuse Gator results when APK, options, API level and Gator build are unchanged
+    "result_cache_dir": None,  # None = <GatorRoot>/cache/result
+    "result_cache_max_mb": 4096,
+    "mem_budget": None,  # total heap for concurrent jobs, e.g. "48G" (None = 90% of physical RAM)
+    "app_cds": True,  # record and reuse a JVM class-data sharing archive (JDK 13+)
+    "app_cds_dir": None,  # None = <GatorRoot>/cache/cds
+    "resource_sampling": True,  # record RSS, CPU and threads of each Gator JVM (Linux)
+    "sample_interval": 1.0,  # seconds between resource samples
+    "gc_log": False,  # let the JVM log GC pauses and summarize them in resources.json
+    "live_progress": True,  # print Gator's phase events while an analysis runs
+    "daemon": True,  # hand analyses to a running gatorDaemon.py, if there is one
+    "daemon_port": 47100,
+    "daemon_workers": 1,  # worker JVMs started by "gatorDaemon.py serve"
+    "daemon_max_jobs": 50,  # recycle a worker JVM after this many APKs
+    "daemon_heap_recycle": 0.75,  # recycle a worker JVM whose heap stays above this fraction after GC
+    "wtg_ndjson": False,  # also write wtg.ndjson, the line-delimited WTG export read by wtgStream.py
+    "results_db": True,  # upsert every finished analysis into the SQLite results warehouse
+    "results_db_path": None  # None = <GatorRoot>/output/results.db
 }
 
 def loadConfig():
@@ -45,17 +91,21 @@ class GlobalConfigs:
       self.APKTOOL_PATH=""
       self.GATOR_OPTIONS=[]
       self.KEEP_DECODE=False
+      self.JOBS=None
+      self.MEM_BUDGET=None
+      self.DECODE_LOOKAHEAD=None
+      self.FORCE=False
+      self.RESUME_TASK=None
+      self.DIFF_BASELINE=None
+      self.SHARD=None
+      self.TASK_NAME=None
+      self.MERGE_SHARDS=None
 
 def fatalError(str):
     print(str)
     sys.exit(1)
     pass
 
-def extractLibsFromPath(pathName):
-    if not pathExists(pathName):
-        return []
-    return glob.glob(os.path.join(pathName, "*.jar"))
-
 def pathExists(pathName):
     if os.access(pathName, os.F_OK):
         return True
@@ -72,56 +122,21 @@ def invokeGatorOnAPK(\
                 options,
                 configs,
                 output = None,
-                timeout = 0
+                timeout = 0,
+                eventFile = None,
+                sampleDir = None
                 ):
     ''''''
     SootAndroidLocation = os.path.join(configs.GATOR_ROOT, "SootAndroid")
-    bGoogleAPI = False
-    if len(apiLevel) > 6:
-        if apiLevel[:6] == "google":
-            bGoogleAPI = True
-    sLevelNum = apiLevel[apiLevel.find('-') + 1:]
     try:
-        iLevelNum = int(sLevelNum)
-    except:
-        fatalError("FATALERROR: API Level not valid")
-    if (bGoogleAPI):
-        GoogleAPIDir = os.path.join(sdkLocation, "add-ons", "addon-google_apis-google-" + sLevelNum)
-        if not pathExists(GoogleAPIDir) :
-            print("Google API Level:" + sLevelNum + "Not installed!")
-            sys.exit(-1);
-        GoogleAPI = os.pathsep.join([
-            os.path.join(GoogleAPIDir, "libs", "maps.jar"),
-            os.path.join(GoogleAPIDir, "libs", "usb.jar"),
-            os.path.join(GoogleAPIDir, "libs", "effects.jar")])
-    classPathEntries = [os.path.join(SootAndroidLocation, "bin")]
-    classPathEntries.extend(extractLibsFromPath(os.path.join(SootAndroidLocation, "lib")))
-    ClassPathJar = os.pathsep.join(classPathEntries)
-    platformJarEntries = [os.path.join(sdkLocation, "platforms", "android-" + sLevelNum, "android.jar")]
-    supportLibs = [
-        "android-support-annotations.jar",
-        "android-support-v4.jar",
-        "android-support-v7-appcompat.jar",
-        "android-support-v7-cardview.jar",
-        "android-support-v7-gridlayout.jar",
-        "android-support-v7-mediarouter.jar",
-        "android-support-v7-palette.jar",
-        "android-support-v7-preference.jar",
-        "android-support-v7-recyclerview.jar"
-    ]
-    platformJarEntries.extend([os.path.join(SootAndroidLocation, "deps", lib) for lib in supportLibs])
-    if iLevelNum >= 23:
-        #include the apache library
-        apacheLib = os.path.join(sdkLocation, "platforms", "android-" + sLevelNum, "optional", "org.apache.http.legacy.jar")
-        if pathExists(apacheLib):
-            platformJarEntries.append(apacheLib)
-    PlatformJar = os.pathsep.join(platformJarEntries)
+        _, iLevelNum = gatorLauncher.parseAPILevel(apiLevel)
+        PlatformJar = os.pathsep.join(gatorLauncher.platformClassPath(sdkLocation, configs.GATOR_ROOT, apiLevel, output))
+    except gatorLauncher.LauncherError as e:
+        fatalError(f"FATALERROR: {e}")
+    sLevelNum = str(iLevelNum)
+    toolchain = javaToolchain(configs)
     #Finished computing platform libraries
-    callList = [\
-                'java', \
-                f'-Xmx{CONFIG["java_memory"]}', \
-                '-classpath', ClassPathJar, \
-                'presto.android.Main', \
+    mainArgs = [\
                 '-project', apkPath,\
                 '-android', PlatformJar,\
                 '-sdkDir', sdkLocation,\
@@ -133,24 +148,79 @@ def invokeGatorOnAPK(\
                 '-guiAnalysis',
                 '-listenerSpecFile', os.path.join(SootAndroidLocation, "listeners.xml"),
                 '-wtgSpecFile', os.path.join(SootAndroidLocation, 'wtg.xml')]
-    callList.extend(options);
+    mainArgs.extend(toolchain.mainOptions())
+    mainArgs.extend(options);
+    if eventFile != None:
+        mainArgs.extend(['-eventFile', eventFile])
+    
+    # Resource usage of the JVM is stored next to log.txt
+    sampler = None
+    gcOptions = []
+    if sampleDir != None and CONFIG.get("resource_sampling", True):
+        gcLog = None
+        if CONFIG.get("gc_log", False):
+            gcLog = os.path.join(sampleDir, resourceSampler.GC_LOG_FILE)
+            gcOptions = resourceSampler.gcLogOptions(toolchain.majorVersion, gcLog)
+        sampler = resourceSampler.ResourceSampler(sampleDir, CONFIG.get("sample_interval", 1.0), gcLog)
+    
+    if CONFIG.get("daemon", True):
+        # Daemon workers are shared by many jobs, so they keep no per-job GC log
+        daemonSampler = resourceSampler.ResourceSampler(sampleDir, sampler.interval) if sampler else None
+        try:
+            retval = gatorDaemon.submit(mainArgs, output, timeout, CONFIG.get("daemon_port", gatorDaemon.DEFAULT_PORT),
+                                        onStart = daemonSampler.start if daemonSampler else None)
+        finally:
+            # Also when the daemon dropped the job: the fallback JVM below gets its own sampler
+            if daemonSampler:
+                daemonSampler.stop()
+        if retval != None:
+            return retval
+    
+    cds = gatorAppCDS(configs)
+    cdsOptions, buildingCDS = cds.launchOptions() if cds else ([], False)
+    classPath = cds.classPath().split(os.pathsep) if cds else gatorLauncher.gatorClassPath(configs.GATOR_ROOT)
+    callList, argFile = gatorLauncher.launchCommand(toolchain, [f'-Xmx{CONFIG["java_memory"]}'] + cdsOptions + gcOptions,
+                                                    classPath, mainArgs, sampleDir)
     #print(callList)
     
     # Set up environment with GatorRoot
     env = os.environ.copy()
     env['GatorRoot'] = configs.GATOR_ROOT
     
+    try:
+        retval = runGatorProcess(callList, env, output, timeout, sampler)
+    finally:
+        gatorLauncher.removeArgFile(argFile)
+    if buildingCDS:
+        cds.finishBuild(retval == 0)
+    return retval
+
+def runGatorProcess(callList, env, output = None, timeout = 0, sampler = None):
+    if output:
+        # Messages written before the launch must precede the JVM's own output in the log
+        output.flush()
+    process = subprocess.Popen(callList, stdout = output, stderr = output, env = env)
+    if sampler != None:
+        sampler.start(process.pid)
+    try:
+        return waitForGatorProcess(process, output, timeout)
+    finally:
+        if sampler != None:
+            summary = sampler.stop()
+            if "peak_rss_mb" in summary:
+                message = (f"[RESOURCES] Peak RSS: {summary['peak_rss_mb']:.0f}MB | "
+                           f"CPU: {summary['cpu_seconds']:.1f}s ({summary['cpu_utilization']:.1f} cores)")
+                if output == None:
+                    print(message)
+                else:
+                    output.write(message + "\n")
+
+def waitForGatorProcess(process, output, timeout):
     if timeout == 0:
-        return subprocess.call(callList, stdout = output, stderr = output, env = env)
+        return process.wait()
     else:
-        # Use Popen for better timeout control and forced termination
+        # Wait with a timeout for better control and forced termination
         try:
-            process = subprocess.Popen(
-                callList,
-                stdout=output,
-                stderr=output,
-                env=env
-            )
             retval = process.wait(timeout=timeout)
             return retval
         except subprocess.TimeoutExpired:
@@ -182,20 +252,208 @@ def invokeGatorOnAPK(\
             return -50
     pass
 
-def decodeAPK(apkPath, decodeLocation, output = None):
-    global GLOBAL_DECODE_LOCK
-    GLOBAL_DECODE_LOCK.acquire()
+def gatorClassPath(configs):
+    return os.pathsep.join(gatorLauncher.gatorClassPath(configs.GATOR_ROOT))
+
+def javaToolchain(configs):
+    """The JDK on PATH, probed once and remembered in <GatorRoot>/cache"""
+    return gatorLauncher.probeJava(os.path.join(configs.GATOR_ROOT, "cache"))
+
+def gatorAppCDS(configs):
+    """Shared class-data sharing archive for the Gator classpath, or None if disabled or unsupported"""
+    if not CONFIG.get("app_cds", True):
+        return None
+    SootAndroidLocation = os.path.join(configs.GATOR_ROOT, "SootAndroid")
+    cacheDir = CONFIG.get("app_cds_dir") or os.path.join(configs.GATOR_ROOT, "cache", "cds")
+    return appCds.archiveFor(SootAndroidLocation, gatorLauncher.libJars(configs.GATOR_ROOT), cacheDir,
+                             javaToolchain(configs))
+
+def getApktoolFrameworkDir():
+    frameworkDir = CONFIG.get("apktool_framework_dir")
+    if frameworkDir:
+        return frameworkDir
+    homeDir = os.path.expanduser("~")
+    if sys.platform == "win32":
+        return os.path.join(homeDir, "AppData", "Local", "apktool", "framework")
+    if sys.platform == "darwin":
+        return os.path.join(homeDir, "Library", "apktool", "framework")
+    return os.path.join(homeDir, ".local", "share", "apktool", "framework")
+
+def useFullDecode(keepDecode):
+    """Full smali disassembly is only needed when the decoded tree is kept for the user"""
+    return keepDecode or CONFIG.get("decode_mode", "resources") == "full"
+
+def decodeAPK(apkPath, decodeLocation, output = None, full = False):
+    """Decode an APK with apktool and return apktool's exit code
+
+    Gator reads the bytecode straight from the APK (-classFiles), so unless a
+    full decode is requested only AndroidManifest.xml, res/ and apktool.yml
+    are produced and the dex files are left undisassembled.
+    """
+    global FRAMEWORK_READY
     callList = ['java',\
                 '-jar',\
                 CONFIG["apktool_jar"],\
                 'd', apkPath,\
                 '-o', decodeLocation, \
                 '-f']
-    ret = subprocess.call(callList, stdout = output, stderr = None)
-    GLOBAL_DECODE_LOCK.release()
-    if ret != 0:
-        fatalError("APK Decode Failed!")
-    pass
+    if not full:
+        callList.append('--no-src')
+    if CONFIG.get("apktool_framework_dir"):
+        callList.extend(['-p', CONFIG["apktool_framework_dir"]])
+    if FRAMEWORK_READY or pathExists(os.path.join(getApktoolFrameworkDir(), "1.apk")):
+        return subprocess.call(callList, stdout = output, stderr = None)
+    with FRAMEWORK_INSTALL_LOCK:
+        ret = subprocess.call(callList, stdout = output, stderr = None)
+        if ret == 0:
+            FRAMEWORK_READY = True
+    return ret
+
+def getSharedCache(kind, configs):
+    """The "decode" or "result" cache shared by all jobs of this process, or None if disabled"""
+    if not CONFIG.get(f"{kind}_cache", True):
+        return None
+    with SHARED_CACHES_LOCK:
+        if kind not in SHARED_CACHES:
+            cacheClass, defaultMaxMB = {
+                "decode": (gatorCache.DecodeCache, 20480),
+                "result": (gatorCache.ResultCache, 4096)}[kind]
+            cacheDir = CONFIG.get(f"{kind}_cache_dir") or os.path.join(configs.GATOR_ROOT, "cache", kind)
+            maxBytes = CONFIG.get(f"{kind}_cache_max_mb", defaultMaxMB) * (1 << 20)
+            graceSeconds = max(3600, 2 * CONFIG.get("analysis_timeout", 600))
+            SHARED_CACHES[kind] = cacheClass(cacheDir, maxBytes, graceSeconds)
+    return SHARED_CACHES[kind]
+
+def getResultsWarehouse(configs):
+    """The results warehouse shared by all jobs of this process, or None if disabled"""
+    if not CONFIG.get("results_db", True):
+        return None
+    with SHARED_CACHES_LOCK:
+        if "warehouse" not in SHARED_CACHES:
+            dbPath = CONFIG.get("results_db_path") or resultsWarehouse.defaultPath(configs.GATOR_ROOT)
+            SHARED_CACHES["warehouse"] = resultsWarehouse.ResultsWarehouse(dbPath)
+    return SHARED_CACHES["warehouse"]
+
+class DecodedAPK:
+    """An APK decoded into its own temporary directory, or into a shared decode cache entry"""
+    def __init__(self, apkPath, full = False, apiLevel = None):
+        self.apkPath = apkPath
+        self.full = full
+        self.tempDir = tempfile.mkdtemp(prefix="gator_decode_")
+        self.decodeDir = os.path.normpath(os.path.join(self.tempDir, "source"))
+        os.makedirs(self.decodeDir, exist_ok=True)
+        self.logPath = None
+        self.apkHash = None
+        self.cached = False
+        self.retcode = None
+        self.apiLevel = apiLevel
+        self.decodeSeconds = 0.0
+
+    def decode(self, configs, output = None):
+        start = time.time()
+        cache = getSharedCache("decode", configs)
+        if cache == None:
+            self.retcode = decodeAPK(self.apkPath, self.decodeDir, output = output, full = self.full)
+        else:
+            self.decodeThroughCache(cache, output)
+        if self.retcode == 0 and self.apiLevel == None:
+            self.apiLevel = determinAPILevel(self.decodeDir, configs)
+        self.decodeSeconds = time.time() - start
+        return self
+
+    def apkSha256(self):
+        if self.apkHash == None:
+            self.apkHash = gatorCache.fileSha256(self.apkPath)
+        return self.apkHash
+
+    def decodeThroughCache(self, cache, output):
+        key = cache.key(self.apkSha256(), CONFIG["apktool_jar"], self.full)
+        # Identical APKs under different names share a key, so only one of them is decoded
+        with cache.keyLock(key):
+            entry = cache.lookup(key)
+            if entry == None:
+                stagingDir = cache.newStagingDir()
+                self.retcode = decodeAPK(self.apkPath, stagingDir, output = output, full = self.full)
+                if self.retcode != 0:
+                    cache.discard(stagingDir)
+                    return
+                entry = cache.publish(key, stagingDir)
+                message = "[CACHE] Decoded APK stored in: " + entry
+            else:
+                self.retcode = 0
+                message = "[CACHE] Decoded APK reused from: " + entry
+        self.decodeDir = entry
+        self.cached = True
+        if output == None:
+            print(message)
+        else:
+            output.write(message + "\n")
+
+    def decodeAhead(self, configs):
+        """Decode before the analysis log exists, keeping apktool's output for replayLog()"""
+        self.logPath = os.path.join(self.tempDir, "decode.log")
+        try:
+            with open(self.logPath, 'w', encoding='utf-8') as logFile:
+                self.decode(configs, output = logFile)
+        except (Exception, SystemExit) as e:
+            with open(self.logPath, 'a', encoding='utf-8') as logFile:
+                logFile.write(f"[ERROR] Decode aborted: {e}\n")
+            self.retcode = 1
+        return self
+
+    def replayLog(self, output):
+        if self.logPath is None or not pathExists(self.logPath):
+            return
+        with open(self.logPath, 'r', encoding='utf-8', errors='replace') as logFile:
+            if output == None:
+                sys.stdout.write(logFile.read())
+            else:
+                shutil.copyfileobj(logFile, output)
+
+def analysisOptions(GatorOptions):
+    """Gator options as the analysis runs them: WTGVisualizationClient unless a client is given"""
+    options = list(GatorOptions)
+    if not any('-client' in opt for opt in options):
+        options.extend(['-client', 'WTGVisualizationClient'])
+    if CONFIG.get("wtg_ndjson", False) and "WTGVisualizationClient" in options and "ndjson" not in options:
+        options.extend(['-clientParam', 'ndjson'])
+    return options
+
+def lookupResult(decoded, options, configs):
+    """(result cache, key, cached result) of an APK
+
+    Needs no decode when the API level is known from the binary manifest;
+    otherwise the key is None until decode() read apktool.yml."""
+    resultCache = getSharedCache("result", configs)
+    if resultCache == None or decoded.apiLevel == None:
+        return resultCache, None, None
+    resultKey = resultCache.key(decoded.apkSha256(), options, decoded.apiLevel,
+                                gatorCache.gatorBuildFingerprint(configs.GATOR_ROOT))
+    return resultCache, resultKey, (None if configs.FORCE else resultCache.lookup(resultKey))
+
+def iterDecodedAPKs(apkFiles, configs, lookahead, full = False, journal = None, plans = None, options = None):
+    """Yield (apkPath, DecodedAPK) in order while up to `lookahead` later APKs are decoded by a worker pool
+
+    With the analysis options given, APKs whose result is cached are not
+    decoded; runGatorOnAPKDirect restores their result instead. Pass no
+    options when the decoded tree is kept for the user."""
+    def decodeJob(decoded):
+        if options != None and lookupResult(decoded, options, configs)[2] != None:
+            return decoded
+        if journal != None:
+            journal.record(decoded.apkPath, "decoding")
+        return decoded.decodeAhead(configs)
+    lookahead = max(0, lookahead)
+    window = deque()
+    with ThreadPoolExecutor(max_workers=max(1, lookahead), thread_name_prefix="decode") as executor:
+        for apkPath in apkFiles:
+            window.append((apkPath, executor.submit(decodeJob, DecodedAPK(apkPath, full, plans[apkPath].apiLevel if plans else None))))
+            if len(window) > lookahead:
+                nextPath, future = window.popleft()
+                yield nextPath, future.result()
+        while window:
+            nextPath, future = window.popleft()
+            yield nextPath, future.result()
 
 def parseMainParam():
     params = sys.argv
@@ -211,6 +469,60 @@ def parseMainParam():
         if var == "--keep-decoded-apk-dir":
             configs.KEEP_DECODE = True
             continue
+        if var == "--force":
+            configs.FORCE = True
+            continue
+        if var == "--resume":
+            i += 1
+            if i >= len(params):
+                fatalError("--resume expects a task name such as task_2025-12-18_21-22-01")
+            configs.RESUME_TASK = params[i]
+            continue
+        if var == "--diff-baseline":
+            i += 1
+            if i >= len(params):
+                fatalError("--diff-baseline expects a task name or task directory")
+            configs.DIFF_BASELINE = params[i]
+            continue
+        if var == "--shard":
+            i += 1
+            try:
+                configs.SHARD = apkShards.parseShard(params[i])
+            except (IndexError, ValueError) as e:
+                fatalError(f"--shard expects I/N, the 0-based shard index and the number of shards: {e}")
+            continue
+        if var == "--task":
+            i += 1
+            if i >= len(params):
+                fatalError("--task expects a task name")
+            configs.TASK_NAME = params[i]
+            continue
+        if var == "--merge-shards":
+            i += 1
+            if i >= len(params):
+                fatalError("--merge-shards expects a task name or task directory")
+            configs.MERGE_SHARDS = params[i]
+            continue
+        if var == "--jobs":
+            i += 1
+            try:
+                configs.JOBS = int(params[i])
+            except (IndexError, ValueError):
+                fatalError("--jobs expects an integer")
+            continue
+        if var == "--decode-lookahead":
+            i += 1
+            try:
+                configs.DECODE_LOOKAHEAD = int(params[i])
+            except (IndexError, ValueError):
+                fatalError("--decode-lookahead expects an integer")
+            continue
+        if var == "--mem-budget":
+            i += 1
+            if i >= len(params):
+                fatalError("--mem-budget expects a size such as 48G")
+            configs.MEM_BUDGET = params[i]
+            continue
         configs.GATOR_OPTIONS.append(var)
         pass
     return configs
@@ -229,17 +541,48 @@ def determinAPILevel(dirName, configs):
                 minLevel = extractAPILevelFromLine(lines[i])
                 if minLevel > targetLevel:
                     targetLevel = minLevel
-        if (targetLevel != 0):
-            adkPlatform = os.path.join(configs.ADK_ROOT, "platforms", "android-" + str(targetLevel))
-            if pathExists(adkPlatform):
-                return targetLevel
-            else:
-                return 23
+        return resolvePlatformLevel(targetLevel, configs)
+    else:
+        return 23
+
+def resolvePlatformLevel(targetLevel, configs):
+    """Use the app's API level if that platform is installed in the ADK, otherwise 23"""
+    if (targetLevel != 0):
+        adkPlatform = os.path.join(configs.ADK_ROOT, "platforms", "android-" + str(targetLevel))
+        if pathExists(adkPlatform):
+            return targetLevel
         else:
             return 23
     else:
         return 23
 
+class APKPlan:
+    """What is known about an APK before decoding it, read straight from the zip"""
+    def __init__(self, apkPath, configs):
+        self.apkPath = apkPath
+        self.manifest = None
+        self.apiLevel = None
+        self.dexBytes = 0
+        try:
+            with zipfile.ZipFile(apkPath) as apk:
+                self.dexBytes = sum(info.file_size for info in apk.infolist()
+                                    if re.fullmatch(r"classes\d*\.dex", info.filename))
+                self.manifest = axmlReader.parseManifest(apk.read("AndroidManifest.xml"))
+        except (axmlReader.AXMLError, zipfile.BadZipFile, KeyError, OSError):
+            # Malformed manifest: the API level is taken from apktool.yml after decoding
+            return
+        levels = [level for level in (self.manifest.minSdkVersion, self.manifest.targetSdkVersion) if level]
+        self.apiLevel = resolvePlatformLevel(max(levels, default=0), configs)
+
+    def cost(self):
+        """Predicted analysis cost, dominated by the amount of bytecode"""
+        if self.dexBytes > 0:
+            return self.dexBytes
+        try:
+            return os.path.getsize(self.apkPath)
+        except OSError:
+            return 0
+
 def extractAPILevelFromLine(curLine):
     match = re.search(r"(\d+)", curLine)
     if not match:
@@ -308,7 +651,8 @@ def getParentDir(pathName):
         return parent
     fatalError(f"Cannot determine parent directory of: {pathName}")
 
-def runGatorOnAPKDirect(apkFileName, GatorOptions, keepdecodedDir, output = None, configs = None, timeout = 0, taskName = None):
+def runGatorOnAPKDirect(apkFileName, GatorOptions, keepdecodedDir, output = None, configs = None, timeout = 0, taskName = None,
+                        decoded = None, outputDir = None):
     # Record start time
     start_time = time.time()
     
@@ -326,11 +670,18 @@ def runGatorOnAPKDirect(apkFileName, GatorOptions, keepdecodedDir, output = None
         timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
         taskName = f"task_{timestamp}"
     outputBaseDir = os.path.normpath(os.path.join(configs.GATOR_ROOT, "output", taskName, appName))
+    if outputDir != None:
+        # A staging directory that the caller moves to output/<task>/<app> itself
+        outputBaseDir = os.path.normpath(outputDir)
     
-    # Use temp directory for decoded APK (will always be deleted)
-    tempDir = tempfile.mkdtemp(prefix="gator_decode_")
-    decodeDir = os.path.normpath(os.path.join(tempDir, "source"))
-    os.makedirs(decodeDir, exist_ok=True)
+    # Use temp directory for decoded APK (kept under output/.../source only with --keep-decoded-apk-dir)
+    if decoded == None:
+        decoded = DecodedAPK(apkFileName, useFullDecode(keepdecodedDir), APKPlan(apkFileName, configs).apiLevel)
+    else:
+        # Decoded ahead of time by the batch pipeline; still count it in the total
+        start_time -= decoded.decodeSeconds
+    tempDir = decoded.tempDir
+    decodeDir = decoded.decodeDir
     os.makedirs(outputBaseDir, exist_ok=True)
     
     if output == None:
@@ -342,26 +693,58 @@ def runGatorOnAPKDirect(apkFileName, GatorOptions, keepdecodedDir, output = None
     
     configs.KEEP_DECODE = keepdecodedDir
     configs.APK_NAME = apkFileName
-    configs.GATOR_OPTIONS = GatorOptions
     
     # Ensure WTGVisualizationClient is used if no client is specified
-    has_client = any('-client' in opt for opt in configs.GATOR_OPTIONS)
+    has_client = any('-client' in opt for opt in GatorOptions)
+    configs.GATOR_OPTIONS = analysisOptions(GatorOptions)
     if not has_client:
-        configs.GATOR_OPTIONS.extend(['-client', 'WTGVisualizationClient'])
         if output == None:
             print("[INFO] Using default client: WTGVisualizationClient")
         else:
             output.write("[INFO] Using default client: WTGVisualizationClient\n")
 
-    decodeAPK(configs.APK_NAME, decodeDir, output = output)
-    numAPILevel = determinAPILevel(decodeDir, configs)
+    # Reuse a previous result when the APK, options, API level and Gator build are unchanged.
+    # The API level from the binary manifest is enough for the key, so a hit skips apktool.
+    resultCache, resultKey, cachedResult = lookupResult(decoded, configs.GATOR_OPTIONS, configs)
+    if cachedResult == None or keepdecodedDir:
+        if decoded.retcode == None:
+            decoded.decode(configs, output = output)
+        else:
+            decoded.replayLog(output)
+        if decoded.retcode != 0:
+            shutil.rmtree(tempDir, ignore_errors=True)
+            fatalError("APK Decode Failed!")
+        if resultKey == None:
+            # The API level came from apktool.yml
+            resultCache, resultKey, cachedResult = lookupResult(decoded, configs.GATOR_OPTIONS, configs)
+    numAPILevel = decoded.apiLevel
+    decodeDir = decoded.decodeDir
 
     manifestPath = decodeDir + "/AndroidManifest.xml"
     resPath = decodeDir + "/res"
     
+    if output:
+        output.flush()
+        logOffset = output.tell()
+    
     # Record Gator execution start
     gator_start = time.time()
-    retval = invokeGatorOnAPK(\
+    if cachedResult != None:
+        cachedLog = resultCache.restore(cachedResult, outputBaseDir)
+        message = f"[CACHE] Analysis result reused from: {cachedResult} (use --force to re-analyze)"
+        if output == None:
+            print(message)
+        else:
+            output.write(message + "\n")
+            if cachedLog:
+                output.write(cachedLog)
+        retval = 0
+    else:
+        # Gator reports its progress as JSON lines; follow them live and keep a summary
+        eventFollower = gatorEvents.EventFollower(os.path.join(outputBaseDir, gatorEvents.EVENT_FILE),
+                                                  appName, CONFIG.get("live_progress", True))
+        eventFollower.start()
+        retval = invokeGatorOnAPK(\
                 apkPath = configs.APK_NAME,\
                 resPath = resPath, \
                 manifestPath = manifestPath,\
@@ -371,49 +754,96 @@ def runGatorOnAPKDirect(apkFileName, GatorOptions, keepdecodedDir, output = None
                 options = configs.GATOR_OPTIONS,
                 configs = configs,
                 output = output,
-                timeout = timeout)
+                timeout = timeout,
+                eventFile = eventFollower.path,
+                sampleDir = outputBaseDir)
+        try:
+            gatorEvents.writeMetrics(os.path.join(outputBaseDir, gatorEvents.METRICS_FILE), eventFollower.stop())
+        except OSError as e:
+            if output == None:
+                print(f"[WARNING] Failed to write metrics: {e}")
+            else:
+                output.write(f"[WARNING] Failed to write metrics: {e}\n")
     gator_end = time.time()
     
-    # Ensure all output is flushed to disk before continuing
+    # Gator writes wtg.json atomically, so it is complete once the JVM has exited
     if output:
         output.flush()
-        os.fsync(output.fileno())  # Force write to disk
-    
-    # Small delay to ensure file system operations complete
-    time.sleep(0.5)
     
-    # Calculate execution time here before updating JSON
     end_time = time.time()
     total_time = end_time - start_time
     gator_time = gator_end - gator_start
 
-    # Add timing information to the generated wtg.json file and reorganize
-    wtg_json_path = os.path.join(outputBaseDir, "wtg.json")
-    if os.path.exists(wtg_json_path):
+    # Run metadata goes into a sidecar next to wtg.json instead of rewriting the graph
+    if cachedResult == None:
+        runInfo = {
+            'analysis_time': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'analysis_duration_seconds': round(total_time, 3),
+            'gator_seconds': round(gator_time, 3),
+            'retval': retval,
+            'api_level': numAPILevel,
+            'options': configs.GATOR_OPTIONS
+        }
+    else:
+        # A cached result keeps the timing of the analysis that produced it
+        runInfo = resultsWarehouse.loadRunInfo(outputBaseDir) or {}
+    runInfo.update({'task': taskName, 'app': appName, 'cached': cachedResult != None})
+    try:
+        resultsWarehouse.writeRunInfo(outputBaseDir, runInfo)
+    except OSError as e:
+        if output == None:
+            print(f"[WARNING] Failed to write run metadata: {e}")
+        else:
+            output.write(f"[WARNING] Failed to write run metadata: {e}\n")
+
+    try:
+        warehouse = getResultsWarehouse(configs)
+        if warehouse != None:
+            warehouse.ingest(outputBaseDir, taskName, appName,
+                             apkSha256 = decoded.apkSha256(),
+                             gatorBuild = gatorCache.gatorBuildFingerprint(configs.GATOR_ROOT),
+                             options = configs.GATOR_OPTIONS,
+                             apiLevel = numAPILevel,
+                             retval = retval,
+                             cached = cachedResult != None,
+                             gatorSeconds = gator_time)
+    except Exception as e:
+        if output == None:
+            print(f"[WARNING] Failed to record results in the warehouse: {e}")
+        else:
+            output.write(f"[WARNING] Failed to record results in the warehouse: {e}\n")
+
+    if resultCache != None and cachedResult == None and retval == 0:
         try:
-            with open(wtg_json_path, 'r', encoding='utf-8') as f:
-                wtg_data = json.load(f)
-            
-            # Create new ordered dict with timing info at the beginning
-            ordered_data = {
-                'analysis_time': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                'analysis_duration_seconds': round(total_time, 3)
-            }
-            # Add rest of the data
-            for key, value in wtg_data.items():
-                ordered_data[key] = value
-            
-            # Write reorganized JSON back
-            with open(wtg_json_path, 'w', encoding='utf-8') as f:
-                json.dump(ordered_data, f, indent=2, ensure_ascii=False)
-            
-            if output:
-                output.write(f"[INFO] Added timing information to wtg.json: {total_time:.3f}s\n")
+            gatorLog = None
+            if output and hasattr(output, "name") and pathExists(output.name):
+                with open(output.name, 'rb') as f:
+                    f.seek(logOffset)
+                    gatorLog = f.read().decode('utf-8', errors='replace')
+            resultCache.store(resultKey, outputBaseDir, gatorLog, replace = configs.FORCE)
         except Exception as e:
-            if output:
-                output.write(f"[WARNING] Failed to add timing information to wtg.json: {e}\n")
+            if output == None:
+                print(f"[WARNING] Failed to store result in cache: {e}")
+            else:
+                output.write(f"[WARNING] Failed to store result in cache: {e}\n")
+
+    if keepdecodedDir:
+        keptDir = os.path.join(outputBaseDir, "source")
+        try:
+            shutil.rmtree(keptDir, ignore_errors=True)
+            if decoded.cached:
+                shutil.copytree(decodeDir, keptDir)
+            else:
+                shutil.move(decodeDir, keptDir)
+            if output == None:
+              print("Decoded APK kept at: " + keptDir)
             else:
-                print(f"[WARNING] Failed to add timing information to wtg.json: {e}")
+              output.write("Decoded APK kept at: " + keptDir + "\n")
+        except Exception as e:
+            if output == None:
+              print(f"Warning: Failed to keep decoded APK directory: {e}")
+            else:
+              output.write(f"Warning: Failed to keep decoded APK directory: {e}\n")
 
     # Always clean up temporary decoded APK directory
     try:
@@ -442,8 +872,182 @@ def runGatorOnAPKDirect(apkFileName, GatorOptions, keepdecodedDir, output = None
     
     return retval
 
-def runGatorOnAllAPKsInDirectory(apkDirectory, GatorOptions, keepdecodedDir, configs=None, timeout=None):
-    """Run Gator analysis on all APK files in the specified directory"""
+def loadPhaseTimings(outputDir):
+    """Per-phase wall and CPU times Gator recorded in wtg.json, or {} if there are none"""
+    try:
+        with open(os.path.join(outputDir, "wtg.json"), 'r', encoding='utf-8') as f:
+            return json.load(f).get("timings", {})
+    except (OSError, ValueError, AttributeError):
+        return {}
+
+def printPhaseTimings(taskDir, apkFiles, slowest = 3):
+    """Print per-phase totals over a batch and the apps that spent the longest in each phase"""
+    phases = {}
+    for apkPath in apkFiles:
+        appName = os.path.basename(apkPath).replace(".apk", "").replace(".zip", "")
+        for phase, timing in loadPhaseTimings(os.path.join(taskDir, appName)).items():
+            phases.setdefault(phase, []).append((timing.get("wall_ms", 0), timing.get("cpu_ms", 0), appName))
+    if not phases:
+        return
+    # Phases can nest (cfgScheduler runs inside wtg), so the rows do not add up to the total
+    print("Phase timings (wall / CPU, summed over apps):")
+    for phase, entries in phases.items():
+        wallSeconds = sum(entry[0] for entry in entries) / 1000
+        cpuSeconds = sum(entry[1] for entry in entries) / 1000
+        top = sorted(entries, reverse=True)[:slowest]
+        print(f"  {phase:<14}{wallSeconds:>9.1f}s /{cpuSeconds:>9.1f}s | slowest: "
+              + ", ".join(f"{appName} {wall / 1000:.1f}s" for wall, _, appName in top))
+
+def printBaselineDiff(configs, taskName, apkFiles):
+    """Diff the WTG of every app in the task against the same app in the baseline task"""
+    baselineDir = configs.DIFF_BASELINE
+    if not os.path.isdir(baselineDir):
+        baselineDir = os.path.join(configs.GATOR_ROOT, "output", configs.DIFF_BASELINE)
+    if not os.path.isdir(baselineDir):
+        print(f"[WARNING] Baseline task not found: {configs.DIFF_BASELINE}")
+        return
+    try:
+        import wtgDiff
+    except ImportError as e:
+        print(f"[WARNING] WTG diff needs NumPy: {e}")
+        return
+    apps = [os.path.basename(apkPath).replace(".apk", "").replace(".zip", "") for apkPath in apkFiles]
+    results = wtgDiff.diffTasks(baselineDir, os.path.join(configs.GATOR_ROOT, "output", taskName), apps)
+    wtgDiff.printTaskDiff(results, os.path.basename(os.path.normpath(baselineDir)))
+
+def parseMemorySize(sizeStr):
+    """Convert a JVM style size such as "12G", "512m" or "1048576" into bytes"""
+    match = re.fullmatch(r"\s*(\d+)\s*([kKmMgGtT]?)[bB]?\s*", str(sizeStr))
+    if not match:
+        fatalError(f"Invalid memory size: {sizeStr}")
+    units = {"": 1, "k": 1 << 10, "m": 1 << 20, "g": 1 << 30, "t": 1 << 40}
+    return int(match.group(1)) * units[match.group(2).lower()]
+
+def formatMemorySize(numBytes):
+    return f"{numBytes / (1 << 30):.1f}G"
+
+def getPhysicalMemory():
+    """Total physical memory in bytes, or None if it cannot be determined"""
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (AttributeError, ValueError, OSError):
+        pass
+    if sys.platform == "win32":
+        import ctypes
+        class MEMORYSTATUSEX(ctypes.Structure):
+            _fields_ = [("dwLength", ctypes.c_ulong),
+                        ("dwMemoryLoad", ctypes.c_ulong),
+                        ("ullTotalPhys", ctypes.c_ulonglong),
+                        ("ullAvailPhys", ctypes.c_ulonglong),
+                        ("ullTotalPageFile", ctypes.c_ulonglong),
+                        ("ullAvailPageFile", ctypes.c_ulonglong),
+                        ("ullTotalVirtual", ctypes.c_ulonglong),
+                        ("ullAvailVirtual", ctypes.c_ulonglong),
+                        ("ullAvailExtendedVirtual", ctypes.c_ulonglong)]
+        status = MEMORYSTATUSEX()
+        status.dwLength = ctypes.sizeof(MEMORYSTATUSEX)
+        if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+            return status.ullTotalPhys
+    return None
+
+class JobJournal:
+    """Append-only log of job states in the task directory, used to resume interrupted batches
+
+    Every line is a JSON object with the APK path, its new state (queued,
+    decoding, running, leased by a workQueue.py worker, done, timeout or
+    failed) and a timestamp; final states
+    also carry the exit code and timings. Each shard of a sharded batch
+    keeps its own journal (journal.shard-I-of-N.jsonl) in the shared task
+    directory.
+    """
+    FILE_NAME = "journal.jsonl"
+    FINAL_STATES = ("done", "timeout", "failed")
+
+    def __init__(self, taskDir, shard = None):
+        fileName = self.FILE_NAME if shard == None else f"journal.{apkShards.shardTag(*shard)}.jsonl"
+        self.path = os.path.join(taskDir, fileName)
+        self.lock = threading.Lock()
+
+    def record(self, apkPath, state, **fields):
+        entry = {"apk": apkPath, "state": state, "time": round(time.time(), 3)}
+        entry.update(fields)
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self.lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def recordResult(self, apkPath, retval, **fields):
+        state = "done" if retval == 0 else ("timeout" if retval == -50 else "failed")
+        self.record(apkPath, state, exit_code=retval, **fields)
+
+    def load(self):
+        """Return the APKs in queue order and the last journal entry of each"""
+        apkFiles = []
+        lastEntries = {}
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # The last line may be cut short by a crash
+                    continue
+                if entry["apk"] not in lastEntries:
+                    apkFiles.append(entry["apk"])
+                lastEntries[entry["apk"]] = entry
+        return apkFiles, lastEntries
+
+class MemoryGate:
+    """Admit jobs only while the heaps their JVMs reserve fit into the memory budget"""
+    def __init__(self, budget):
+        self.budget = budget
+        self.used = 0
+        self.cond = threading.Condition()
+
+    def acquire(self, amount):
+        with self.cond:
+            # A job bigger than the whole budget is still admitted, but only on its own
+            while self.used > 0 and self.used + amount > self.budget:
+                self.cond.wait()
+            self.used += amount
+
+    def release(self, amount):
+        with self.cond:
+            self.used -= amount
+            self.cond.notify_all()
+
+def planBatchParallelism(jobs, memBudget):
+    """Resolve the number of concurrent jobs and the memory budget for a batch"""
+    cores = os.cpu_count() or 1
+    if jobs is None:
+        jobs = CONFIG.get("max_jobs", 1)
+    if jobs <= 0:
+        jobs = cores
+    jobs = min(jobs, cores)
+    heapBytes = parseMemorySize(CONFIG["java_memory"])
+    if memBudget is None:
+        memBudget = CONFIG.get("mem_budget")
+    if memBudget is not None:
+        budgetBytes = parseMemorySize(memBudget)
+    else:
+        physical = getPhysicalMemory()
+        if physical is None:
+            print("[WARN] Cannot determine physical memory, memory admission disabled")
+            budgetBytes = heapBytes * jobs
+        else:
+            budgetBytes = int(physical * 0.9)
+    return jobs, heapBytes, budgetBytes
+
+def runGatorOnAllAPKsInDirectory(apkDirectory, GatorOptions, keepdecodedDir, configs=None, timeout=None,
+                                 jobs=None, memBudget=None, decodeLookahead=None, resumeTask=None):
+    """Run Gator analysis on all APK files in the specified directory
+
+    With resumeTask, the APK list comes from that task's journal instead and
+    only the APKs that never reached a final state are analyzed again. With
+    configs.SHARD = (index, count), only that shard of the directory is
+    analyzed (see apkShards.py) and its summary is written for --merge-shards.
+    """
     if configs is None:
         configs = GlobalConfigs()
     
@@ -456,55 +1060,153 @@ def runGatorOnAllAPKsInDirectory(apkDirectory, GatorOptions, keepdecodedDir, con
     
     print(f"[INFO] Analysis timeout: {timeout}s ({timeout//60} minutes)")
     
-    # Find all APK files in the directory
-    if not pathExists(apkDirectory):
-        print(f"[ERROR] APK directory not found: {apkDirectory}")
-        return -1
-    
-    apkFiles = glob.glob(os.path.join(apkDirectory, "*.apk"))
-    if not apkFiles:
-        print(f"[WARNING] No APK files found in: {apkDirectory}")
-        return 0
+    shard = configs.SHARD
+    batchStart = time.time()
+    costs = {}
+    finished = {}
+    if resumeTask is not None:
+        taskName = resumeTask
+        journal = JobJournal(os.path.join(configs.GATOR_ROOT, "output", taskName), shard)
+        if not pathExists(journal.path):
+            print(f"[ERROR] No journal to resume from: {journal.path}")
+            return -1
+        apkFiles, lastEntries = journal.load()
+        for apkPath, entry in lastEntries.items():
+            if entry["state"] in JobJournal.FINAL_STATES:
+                finished[apkPath] = entry.get("exit_code", 0 if entry["state"] == "done" else 1)
+    else:
+        # Find all APK files in the directory
+        if not pathExists(apkDirectory):
+            print(f"[ERROR] APK directory not found: {apkDirectory}")
+            return -1
+        
+        # Sorted: glob order depends on the file system
+        apkFiles = sorted(glob.glob(os.path.join(apkDirectory, "*.apk")))
+        if not apkFiles:
+            print(f"[WARNING] No APK files found in: {apkDirectory}")
+            return 0
+        if shard != None:
+            costs = {apkPath: apkShards.predictedCost(apkPath) for apkPath in apkFiles}
+            shardFiles = apkShards.assignShards(apkFiles, shard[1], costs)[shard[0]]
+            print(f"[INFO] Shard {shard[0]}/{shard[1]}: {len(shardFiles)} of {len(apkFiles)} APK file(s), "
+                  f"{sum(costs[apkPath] for apkPath in shardFiles) / (1 << 20):.1f}MB of "
+                  f"{sum(costs.values()) / (1 << 20):.1f}MB predicted cost (dex size)")
+            apkFiles = shardFiles
+        
+        if configs.TASK_NAME != None:
+            taskName = configs.TASK_NAME
+        elif shard != None:
+            print("[ERROR] --shard needs --task NAME, the task all shards of the batch write into")
+            return -1
+        else:
+            # Create a single timestamp for all APKs in this batch
+            timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+            taskName = f"task_{timestamp}"
+        taskDir = os.path.join(configs.GATOR_ROOT, "output", taskName)
+        os.makedirs(taskDir, exist_ok=True)
+        journal = JobJournal(taskDir, shard)
+        if pathExists(journal.path):
+            print(f"[ERROR] Task {taskName} already has a journal ({journal.path}), "
+                  f"continue it with --resume {taskName}" + (" and the same --shard" if shard != None else ""))
+            return -1
+        for apkPath in apkFiles:
+            journal.record(apkPath, "queued")
+    pendingFiles = [apkPath for apkPath in apkFiles if apkPath not in finished]
     
-    # Create a single timestamp for all APKs in this batch
-    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    taskName = f"task_{timestamp}"
+    jobs, heapBytes, budgetBytes = planBatchParallelism(jobs, memBudget)
+    if decodeLookahead is None:
+        decodeLookahead = CONFIG.get("decode_lookahead", 2)
     
-    print(f"\n[INFO] Found {len(apkFiles)} APK file(s) in {apkDirectory}")
-    print(f"[INFO] Batch task: {taskName}")
+    if resumeTask is not None:
+        print(f"\n[INFO] Resuming batch task: {taskName}")
+        print(f"[INFO] {len(finished)} of {len(apkFiles)} APK file(s) already finished, {len(pendingFiles)} remaining")
+    else:
+        print(f"\n[INFO] Found {len(apkFiles)} APK file(s) in {apkDirectory}")
+        print(f"[INFO] Batch task: {taskName}")
+    if jobs > 1:
+        print(f"[INFO] Parallel jobs: {jobs} | Heap per job: {formatMemorySize(heapBytes)} | "
+              f"Memory budget: {formatMemorySize(budgetBytes)}")
     print(f"[INFO] Starting batch analysis...\n")
     
-    results = []
-    for idx, apkPath in enumerate(apkFiles, 1):
+    # Read every binary manifest up front: API levels are known before any decode,
+    # and parallel batches start the most expensive APKs first
+    planStart = time.time()
+    plans = {apkPath: APKPlan(apkPath, configs) for apkPath in pendingFiles}
+    unreadable = sum(1 for plan in plans.values() if plan.apiLevel == None)
+    print(f"[INFO] Read {len(plans)} binary manifest(s) in {(time.time() - planStart) * 1000:.0f}ms"
+          + (f" ({unreadable} unreadable, falling back to apktool.yml)" if unreadable else ""))
+    if jobs > 1:
+        pendingFiles.sort(key=lambda apkPath: plans[apkPath].cost(), reverse=True)
+    
+    printLock = threading.Lock()
+    memoryGate = MemoryGate(budgetBytes)
+    # At most `jobs` analyses are submitted; together with the decode lookahead this
+    # bounds how many decoded APKs wait in temp directories or the decode cache
+    analysisSlots = threading.Semaphore(jobs)
+    
+    def analyzeOne(idx, apkPath, decoded):
         apkName = os.path.basename(apkPath)
-        print(f"\n{'='*60}")
-        print(f"[{idx}/{len(apkFiles)}] Processing: {apkName}")
-        print(f"{'='*60}\n")
-        
-        # Create log file for each APK
-        appName = apkName.replace(".apk", "").replace(".zip", "")
-        logDir = os.path.join(configs.GATOR_ROOT, "output", taskName, appName)
-        os.makedirs(logDir, exist_ok=True)
-        logPath = os.path.join(logDir, "log.txt")
-        
-        with open(logPath, 'w', encoding='utf-8') as logFile:
-            retval = runGatorOnAPKDirect(
-                apkPath, 
-                GatorOptions, 
-                keepdecodedDir, 
-                output=logFile, 
-                configs=configs,
-                timeout=timeout,
-                taskName=taskName
-            )
-            results.append((apkName, retval))
-        
-        if retval == 0:
-            print(f"[✓] {apkName} - SUCCESS")
-        elif retval == -50:
-            print(f"[✗] {apkName} - TIMEOUT")
-        else:
-            print(f"[✗] {apkName} - FAILED (exit code: {retval})")
+        jobStart = time.time()
+        try:
+            journal.record(apkPath, "running")
+            with printLock:
+                print(f"\n{'='*60}")
+                print(f"[{idx}/{len(pendingFiles)}] Processing: {apkName}")
+                print(f"{'='*60}\n")
+            
+            # Create log file for each APK
+            appName = apkName.replace(".apk", "").replace(".zip", "")
+            logDir = os.path.join(configs.GATOR_ROOT, "output", taskName, appName)
+            os.makedirs(logDir, exist_ok=True)
+            logPath = os.path.join(logDir, "log.txt")
+            
+            with open(logPath, 'w', encoding='utf-8') as logFile:
+                try:
+                    # Each job gets its own copies, runGatorOnAPKDirect mutates both
+                    retval = runGatorOnAPKDirect(
+                        apkPath, 
+                        list(GatorOptions), 
+                        keepdecodedDir, 
+                        output=logFile, 
+                        configs=copy.copy(configs),
+                        timeout=timeout,
+                        taskName=taskName,
+                        decoded=decoded
+                    )
+                except SystemExit as e:
+                    # fatalError() inside a worker must only fail this APK
+                    retval = e.code if isinstance(e.code, int) and e.code != 0 else 1
+                except Exception as e:
+                    logFile.write(f"[ERROR] Analysis aborted: {e}\n")
+                    retval = 1
+            journal.recordResult(apkPath, retval,
+                                 decode_seconds=round(decoded.decodeSeconds, 3),
+                                 wall_seconds=round(time.time() - jobStart, 3))
+            
+            with printLock:
+                if retval == 0:
+                    print(f"[✓] {apkName} - SUCCESS")
+                elif retval == -50:
+                    print(f"[✗] {apkName} - TIMEOUT")
+                else:
+                    print(f"[✗] {apkName} - FAILED (exit code: {retval})")
+            return retval
+        finally:
+            memoryGate.release(heapBytes)
+            analysisSlots.release()
+    
+    futures = []
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        decodedAPKs = iterDecodedAPKs(pendingFiles, configs, decodeLookahead, useFullDecode(keepdecodedDir), journal, plans,
+                                      None if keepdecodedDir else analysisOptions(GatorOptions))
+        for idx in range(1, len(pendingFiles) + 1):
+            # Take a slot before pulling the next APK, so decoding never runs further ahead than the lookahead
+            analysisSlots.acquire()
+            apkPath, decoded = next(decodedAPKs)
+            memoryGate.acquire(heapBytes)
+            futures.append(executor.submit(analyzeOne, idx, apkPath, decoded))
+    finished.update((apkPath, future.result()) for apkPath, future in zip(pendingFiles, futures))
+    results = [(os.path.basename(apkPath), finished[apkPath]) for apkPath in apkFiles]
     
     # Print summary
     print(f"\n{'='*60}")
@@ -515,13 +1217,97 @@ def runGatorOnAllAPKsInDirectory(apkDirectory, GatorOptions, keepdecodedDir, con
     for apkName, retval in results:
         status = "SUCCESS" if retval == 0 else ("TIMEOUT" if retval == -50 else f"FAILED({retval})")
         print(f"  - {apkName}: {status}")
+    printPhaseTimings(os.path.join(configs.GATOR_ROOT, "output", taskName), apkFiles)
+    if configs.DIFF_BASELINE != None:
+        printBaselineDiff(configs, taskName, apkFiles)
+    for kind in ("decode", "result"):
+        if kind in SHARED_CACHES:
+            print(f"{kind.capitalize()} cache: {SHARED_CACHES[kind].statistics()}")
+    if shard != None:
+        writeShardSummary(journal, shard, finished, costs, time.time() - batchStart)
+        print(f"Shard summary written; after the last shard run: python runGatorOnApk.py --merge-shards {taskName}")
     print(f"{'='*60}\n")
     
     return 0 if success_count == len(results) else 1
 
+def writeShardSummary(journal, shard, finished, costs, wallSeconds):
+    """Write the summary of one shard's run, taking the per-APK timings from its journal"""
+    _, lastEntries = journal.load()
+    apks = []
+    for apkPath, retval in finished.items():
+        entry = lastEntries.get(apkPath, {})
+        apks.append({
+            "apk": os.path.basename(apkPath),
+            "path": apkPath,
+            "status": "done" if retval == 0 else ("timeout" if retval == -50 else "failed"),
+            "exit_code": retval,
+            "cost": costs[apkPath] if apkPath in costs else apkShards.predictedCost(apkPath),
+            "decode_seconds": entry.get("decode_seconds"),
+            "wall_seconds": entry.get("wall_seconds")
+        })
+    apkShards.writeShardSummary(os.path.dirname(journal.path), shard[0], shard[1], {
+        "host": socket.gethostname(),
+        "finished": datetime.now().isoformat(timespec="seconds"),
+        "wall_seconds": round(wallSeconds, 3),
+        "apks": apks
+    })
+
+def mergeShards(configs, task):
+    """Combine the shard summaries of a sharded batch into one report"""
+    taskDir = task
+    if not os.path.isdir(taskDir):
+        taskDir = os.path.join(configs.GATOR_ROOT, "output", task)
+    if not os.path.isdir(taskDir):
+        print(f"[ERROR] Task not found: {task}")
+        return -1
+    merged = apkShards.mergeShardSummaries(taskDir)
+    if merged == None:
+        print(f"[ERROR] No shard summaries in {taskDir}")
+        return -1
+    print(f"\n{'='*60}")
+    print(f"BATCH ANALYSIS SUMMARY ({len(merged['shard_stats'])} of {merged['shards']} shards)")
+    print(f"{'='*60}")
+    print(f"Total: {merged['total']} | Success: {merged['success']} | Failed: {merged['total'] - merged['success']}")
+    for entry in merged["apks"]:
+        if entry["exit_code"] != 0:
+            status = "TIMEOUT" if entry["exit_code"] == -50 else f"FAILED({entry['exit_code']})"
+            print(f"  - {entry['apk']}: {status} (shard {entry['shard']})")
+    print("Shards (APKs, predicted cost, wall time):")
+    for stats in merged["shard_stats"]:
+        wall = f"{stats['wall_seconds']:.1f}s" if stats["wall_seconds"] != None else "?"
+        print(f"  {stats['shard']:>3}: {stats['apks']:>5} | {stats['predicted_cost'] / (1 << 20):>7.1f}MB | "
+              f"{wall:>9} | {stats['host']}")
+    walls = [stats["wall_seconds"] for stats in merged["shard_stats"] if stats["wall_seconds"]]
+    if len(walls) > 1:
+        print(f"Slowest shard took {max(walls) / (sum(walls) / len(walls)):.2f}x the mean shard time")
+    if merged["missing_shards"]:
+        print(f"[WARNING] No summary from shard(s): {', '.join(str(index) for index in merged['missing_shards'])}")
+    if merged["duplicate_apks"]:
+        print(f"[WARNING] Analyzed by more than one shard: {', '.join(merged['duplicate_apks'])}")
+    printPhaseTimings(taskDir, [entry["apk"] for entry in merged["apks"]])
+    print(f"Merged summary: {os.path.join(taskDir, apkShards.SUMMARY_FILE)}")
+    print(f"{'='*60}\n")
+    failed = merged["total"] - merged["success"]
+    return 0 if failed == 0 and not merged["missing_shards"] else 1
+
 def main():
     configs = parseMainParam();
     
+    if configs.MERGE_SHARDS != None:
+        return mergeShards(configs, configs.MERGE_SHARDS)
+    
+    if configs.RESUME_TASK != None:
+        return runGatorOnAllAPKsInDirectory(
+            CONFIG.get("apk_directory"),
+            configs.GATOR_OPTIONS,
+            configs.KEEP_DECODE,
+            configs=configs,
+            jobs=configs.JOBS,
+            memBudget=configs.MEM_BUDGET,
+            decodeLookahead=configs.DECODE_LOOKAHEAD,
+            resumeTask=configs.RESUME_TASK
+        )
+    
     # If no APK specified, try to use APK directory from config
     if configs.APK_NAME == "":
         if "apk_directory" in CONFIG and pathExists(CONFIG["apk_directory"]):
@@ -530,12 +1316,22 @@ def main():
                 CONFIG["apk_directory"],
                 configs.GATOR_OPTIONS,
                 configs.KEEP_DECODE,
-                configs=configs
+                configs=configs,
+                jobs=configs.JOBS,
+                memBudget=configs.MEM_BUDGET,
+                decodeLookahead=configs.DECODE_LOOKAHEAD
             )
         else:
             print("[ERROR] No APK file specified and no valid apk_directory in config")
             print("Usage: python runGatorOnApk.py <path_to_apk> [options]")
             print("   or: Set 'apk_directory' in config file to analyze all APKs in that directory")
+            print("       [--jobs N] [--mem-budget SIZE] run N APKs at once within SIZE of JVM heap")
+            print("       [--decode-lookahead N] decode up to N APKs ahead of the running analyses")
+            print("       [--force] re-analyze APKs even if a cached result exists")
+            print("       [--diff-baseline TASK] diff every app's WTG against the same app in TASK")
+            print("       [--shard I/N --task NAME] analyze shard I (0-based) of N of the directory into task NAME")
+            print("   or: python runGatorOnApk.py --merge-shards <taskName> to combine the shard summaries")
+            print("   or: python runGatorOnApk.py --resume <taskName> [options] to finish an interrupted batch")
             return -1
     
     return runGatorOnAPKDirect(configs.APK_NAME,\
@@ -9,6 +9,9 @@ import sys
 import subprocess
 import webbrowser
 import time
+import pathlib
+
+import wtgViewer
 
 def main():
     # Get the script directory
@@ -39,35 +42,31 @@ def main():
     print()
     print("[2/3] Looking for generated files...")
     
-    # Find the generated HTML file in output directory
+    # Gator writes output/apv/ under the Gator root
+    output_dir = os.path.join(script_dir, "..", "output", "apv")
+    json_file = os.path.join(output_dir, "wtg.json")
+    dot_file = os.path.join(output_dir, "wtg.dot")
     html_file = None
-    dot_file = None
-    
-    # Check in output/apv/results directory
-    output_dir = os.path.join(script_dir, "..", "output", "apv", "results")
-    if os.path.exists(output_dir):
-        for f in os.listdir(output_dir):
-            if f.endswith("_wtg_viewer.html"):
-                html_file = os.path.join(output_dir, f)
-            if f.endswith("_wtg.dot"):
-                dot_file = os.path.join(output_dir, f)
     
-    if html_file and os.path.exists(html_file):
-        print(f"✓ Found HTML viewer: {html_file}")
+    if os.path.exists(json_file):
+        print(f"✓ Found WTG summary: {json_file}")
+        html_file = wtgViewer.buildViewer(output_dir)
+        print(f"✓ Built HTML viewer: {html_file}")
     else:
-        print("✗ HTML viewer not found")
+        print("✗ wtg.json not found")
     
-    if dot_file and os.path.exists(dot_file):
+    if os.path.exists(dot_file):
         print(f"✓ Found DOT file: {dot_file}")
     else:
         print("✗ DOT file not found")
+        dot_file = None
     
     print()
     print("[3/3] Opening visualization...")
     
     if html_file and os.path.exists(html_file):
         # Open in default browser
-        file_url = f"file:///{html_file.replace(os.sep, '/')}"
+        file_url = pathlib.Path(os.path.abspath(html_file)).as_uri()
         print(f"Opening: {file_url}")
         webbrowser.open(file_url)
         
@@ -89,8 +88,7 @@ def main():
         print()
         print("To visualize the graph:")
         print("  1. Use the HTML viewer (already opened)")
-        print("  2. Copy DOT content from the 'DOT File' tab")
-        print("  3. Paste at: https://dreampuf.github.io/GraphvizOnline/")
+        print("  2. Paste the DOT file at: https://dreampuf.github.io/GraphvizOnline/")
         print()
     else:
         print("=" * 70)
@@ -0,0 +1,622 @@
+"""
+Multi-host APK batches: a coordinator owns the job list, workers pull jobs
+
+    python workQueue.py coordinator [apk dir | manifest] [--port P] [--bind ADDR] [--secret S] [--lease S]
+                                    [--max-attempts N] [--resume TASK] [--force]
+    python workQueue.py worker <host>[:port] [--secret S] [--jobs N] [--name NAME]
+
+The coordinator reads the APKs from a directory (default: apk_directory in
+gator_config.json) or from a manifest, a text file with one APK path per line
+(relative to the manifest; # starts a comment). It records every job in the
+task's journal.jsonl like runGatorOnApk.py does, so `--resume TASK` picks an
+interrupted batch up again, and exits once every job has a final state.
+
+Workers connect over TCP, lease one job at a time and run runGatorOnAPKDirect
+on it. A lease must be renewed while the job runs; a lease that is not
+renewed in time (the worker died or lost the network) goes back to the queue,
+and a job that loses its lease --max-attempts times is marked failed. A result
+is accepted only from a worker whose lease was not handed to another worker
+in the meantime; a late result of a requeued job is discarded. A worker
+uses the APK path directly when it can see the file (shared file system) and
+downloads it from the coordinator otherwise. Results land in the
+coordinator's output/<task>/<app>: a worker that finds the coordinator's
+token file (output/<task>/.coordinator-token) under its own Gator root shares
+the coordinator's output directory and writes into a staging directory there,
+which the coordinator moves into place once it accepts the result; any other
+worker uploads the directory when the job ends, even if its checkout has the
+same path as the coordinator's. Only the coordinator writes to the results
+warehouse.
+
+The coordinator listens on 127.0.0.1 unless --bind says otherwise. Every
+request carries a shared secret (--secret, or the GATOR_QUEUE_SECRET
+environment variable); a coordinator bound to another address without one
+generates a secret and prints it. The secret is sent in clear text, so keep
+the port inside the cluster network.
+Several workers on one host can be used to try it out.
+"""
+import os, sys
+import copy
+import json
+import time
+import uuid
+import glob
+import shutil
+import socket
+import zipfile
+import secrets
+import tempfile
+import threading
+import socketserver
+from collections import deque
+from datetime import datetime
+
+import runGatorOnApk as runApk
+
+DEFAULT_PORT = 47200
+LEASE_SECONDS = 120
+MAX_ATTEMPTS = 3
+CHUNK_SIZE = 1 << 20
+# A worker gives up after the coordinator has been unreachable this long
+UNREACHABLE_SECONDS = 300
+# The coordinator keeps answering after the last job so that idle workers learn they can exit
+DONE_GRACE_SECONDS = 10
+OUTPUT_TOKEN_FILE = ".coordinator-token"
+# Below output/<task>: results of shared-output workers until the coordinator accepts them
+STAGING_DIR = ".staging"
+SECRET_VARIABLE = "GATOR_QUEUE_SECRET"
+LOOPBACK_ADDRESSES = ("127.0.0.1", "localhost", "::1")
+
+def appNameOf(apkPath):
+    return os.path.basename(apkPath).replace(".apk", "").replace(".zip", "")
+
+def loadManifest(path):
+    """APK paths listed in a manifest file"""
+    baseDir = os.path.dirname(os.path.abspath(path))
+    apkFiles = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.split('#', 1)[0].strip()
+            if line:
+                apkFiles.append(os.path.normpath(os.path.join(baseDir, line)))
+    return apkFiles
+
+def readPayload(stream, size, path):
+    with open(path, 'wb') as f:
+        remaining = size
+        while remaining > 0:
+            chunk = stream.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                raise OSError("connection closed before the payload was complete")
+            f.write(chunk)
+            remaining -= len(chunk)
+
+def writeMessage(stream, message, payloadPath = None):
+    """One JSON line, followed by the bytes of payloadPath whose size the message announces"""
+    if payloadPath != None:
+        message = dict(message, payload = os.path.getsize(payloadPath))
+    stream.write((json.dumps(message) + "\n").encode('utf-8'))
+    if payloadPath != None:
+        with open(payloadPath, 'rb') as f:
+            shutil.copyfileobj(f, stream, CHUNK_SIZE)
+    stream.flush()
+
+def packDirectory(directory, archivePath):
+    with zipfile.ZipFile(archivePath, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for dirPath, _, fileNames in os.walk(directory):
+            for fileName in sorted(fileNames):
+                path = os.path.join(dirPath, fileName)
+                archive.write(path, os.path.relpath(path, directory).replace(os.sep, '/'))
+
+def installDirectory(archivePath, directory):
+    """Replace directory with the contents of an uploaded archive"""
+    stagingDir = f"{directory}.upload-{uuid.uuid4().hex[:8]}"
+    with zipfile.ZipFile(archivePath) as archive:
+        archive.extractall(stagingDir)
+    replaceDirectory(stagingDir, directory)
+
+def replaceDirectory(stagingDir, directory):
+    """Move stagingDir to directory, replacing what is there"""
+    oldDir = f"{stagingDir}.old"
+    if os.path.exists(directory):
+        os.replace(directory, oldDir)
+    os.replace(stagingDir, directory)
+    shutil.rmtree(oldDir, ignore_errors=True)
+
+class Coordinator:
+    """Job list, leases and results of one task"""
+    def __init__(self, configs, taskName, apkFiles, finished, journal, leaseSeconds, maxAttempts, secret = None):
+        self.configs = configs
+        self.secret = secret
+        self.taskName = taskName
+        self.taskDir = os.path.join(configs.GATOR_ROOT, "output", taskName)
+        self.apkFiles = apkFiles
+        self.journal = journal
+        self.leaseSeconds = leaseSeconds
+        self.maxAttempts = maxAttempts
+        self.cond = threading.Condition()
+        self.pending = deque(apkPath for apkPath in apkFiles if apkPath not in finished)
+        self.results = dict(finished)
+        self.leases = {}
+        self.attempts = {}
+        self.tokens = {}
+        self.installing = 0
+        # Lets workers tell a shared output directory from a local one at the same path
+        self.outputToken = uuid.uuid4().hex
+        with open(os.path.join(self.taskDir, OUTPUT_TOKEN_FILE), 'w', encoding='utf-8') as f:
+            f.write(self.outputToken)
+
+    def outputDir(self, apkPath):
+        return os.path.join(self.taskDir, appNameOf(apkPath))
+
+    def isFinished(self):
+        with self.cond:
+            return len(self.results) == len(self.apkFiles) and self.installing == 0
+
+    def expireLeases(self):
+        """Requeue the jobs whose lease ran out; call with cond held"""
+        now = time.time()
+        for apkPath, lease in list(self.leases.items()):
+            if lease["expires"] > now:
+                continue
+            del self.leases[apkPath]
+            apkName = os.path.basename(apkPath)
+            if self.attempts[apkPath] >= self.maxAttempts:
+                self.results[apkPath] = 1
+                self.journal.recordResult(apkPath, 1, reason = f"lease lost {self.attempts[apkPath]} times")
+                print(f"[✗] {apkName} - FAILED (lease lost {self.attempts[apkPath]} times, last worker: {lease['worker']})")
+                self.cond.notify_all()
+            else:
+                self.pending.appendleft(apkPath)
+                self.journal.record(apkPath, "queued", reason = "lease expired")
+                print(f"[WARN] Lease of {apkName} held by {lease['worker']} expired, job requeued")
+
+    def lease(self, worker):
+        with self.cond:
+            self.expireLeases()
+            while self.pending:
+                apkPath = self.pending.popleft()
+                try:
+                    size = os.path.getsize(apkPath)
+                except OSError as e:
+                    self.results[apkPath] = 1
+                    self.journal.recordResult(apkPath, 1, reason = str(e))
+                    print(f"[✗] {os.path.basename(apkPath)} - FAILED ({e})")
+                    self.cond.notify_all()
+                    continue
+                self.attempts[apkPath] = self.attempts.get(apkPath, 0) + 1
+                token = uuid.uuid4().hex
+                self.tokens.setdefault(apkPath, set()).add(token)
+                self.leases[apkPath] = {"token": token, "worker": worker, "expires": time.time() + self.leaseSeconds}
+                self.journal.record(apkPath, "leased", worker = worker, attempt = self.attempts[apkPath])
+                print(f"[INFO] {os.path.basename(apkPath)} -> {worker} (attempt {self.attempts[apkPath]})")
+                return {
+                    "apk": apkPath,
+                    "token": token,
+                    "size": size,
+                    "task": self.taskName,
+                    "output_token": self.outputToken,
+                    "lease_seconds": self.leaseSeconds,
+                    "options": list(self.configs.GATOR_OPTIONS),
+                    "force": self.configs.FORCE
+                }
+            if self.leases or self.installing:
+                # Running jobs may still come back to the queue
+                return {"wait": min(5, self.leaseSeconds / 4)}
+            return {"done": True}
+
+    def authorized(self, request):
+        return self.secret == None or secrets.compare_digest(str(request.get("secret", "")), self.secret)
+
+    def stagingDir(self, request):
+        """The staging directory a shared-output worker names in its completion, or None"""
+        name = request.get("staging")
+        if not name or name != os.path.basename(name) or name.startswith("."):
+            return None
+        return os.path.join(self.taskDir, STAGING_DIR, name)
+
+    def holdsLease(self, apkPath, token):
+        with self.cond:
+            lease = self.leases.get(apkPath)
+            return lease != None and lease["token"] == token
+
+    def renew(self, apkPath, token):
+        with self.cond:
+            lease = self.leases.get(apkPath)
+            if lease == None or lease["token"] != token:
+                return {"ok": False}
+            lease["expires"] = time.time() + self.leaseSeconds
+            return {"ok": True}
+
+    def complete(self, request, archivePath):
+        apkPath = request["apk"]
+        stagingDir = self.stagingDir(request)
+        with self.cond:
+            lease = self.leases.get(apkPath)
+            if apkPath in self.results or apkPath not in self.attempts:
+                reason = "job already finished"
+            elif request.get("token") not in self.tokens.get(apkPath, ()):
+                reason = "unknown lease"
+            elif lease != None and lease["token"] != request.get("token"):
+                # Expired and leased again: only the run of the current lease counts
+                reason = "job was leased to another worker"
+            else:
+                reason = None
+            if reason != None:
+                if stagingDir != None:
+                    shutil.rmtree(stagingDir, ignore_errors=True)
+                return {"ok": False, "reason": reason}
+            # Also accepted after the lease expired, as long as nobody else took the job
+            self.leases.pop(apkPath, None)
+            if apkPath in self.pending:
+                self.pending.remove(apkPath)
+            retval = request.get("retval", 1)
+            self.results[apkPath] = retval
+            self.installing += 1
+        try:
+            outputDir = self.outputDir(apkPath)
+            if archivePath != None:
+                installDirectory(archivePath, outputDir)
+            elif stagingDir != None and os.path.isdir(stagingDir):
+                replaceDirectory(stagingDir, outputDir)
+            try:
+                warehouse = runApk.getResultsWarehouse(self.configs)
+                if warehouse != None:
+                    warehouse.ingest(outputDir, self.taskName, appNameOf(apkPath), retval = retval)
+            except Exception as e:
+                print(f"[WARNING] Failed to record {appNameOf(apkPath)} in the warehouse: {e}")
+            self.journal.recordResult(apkPath, retval, worker = request.get("worker"),
+                                      wall_seconds = request.get("wall_seconds"))
+            apkName = os.path.basename(apkPath)
+            if retval == 0:
+                print(f"[✓] {apkName} - SUCCESS ({request.get('worker')})")
+            elif retval == -50:
+                print(f"[✗] {apkName} - TIMEOUT ({request.get('worker')})")
+            else:
+                print(f"[✗] {apkName} - FAILED (exit code: {retval}, {request.get('worker')})")
+        finally:
+            with self.cond:
+                self.installing -= 1
+                self.cond.notify_all()
+        return {"ok": True}
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    """One request per connection: a JSON line, possibly followed by a payload"""
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return
+        request = json.loads(line.decode('utf-8'))
+        coordinator = self.server.coordinator
+        if not coordinator.authorized(request):
+            # Nothing of an unauthorized request is read or answered beyond this
+            writeMessage(self.wfile, {"error": "unauthorized"})
+            return
+        op = request.get("op")
+        if op == "lease":
+            writeMessage(self.wfile, coordinator.lease(request.get("worker", "?")))
+        elif op == "renew":
+            writeMessage(self.wfile, coordinator.renew(request["apk"], request["token"]))
+        elif op == "fetch":
+            # Only the APK of a lease the worker holds can be downloaded
+            if coordinator.holdsLease(request["apk"], request["token"]):
+                writeMessage(self.wfile, {"ok": True}, request["apk"])
+            else:
+                writeMessage(self.wfile, {"ok": False})
+        elif op == "complete":
+            archivePath = None
+            try:
+                if request.get("payload"):
+                    fd, archivePath = tempfile.mkstemp(prefix = "gator-upload-", suffix = ".zip",
+                                                       dir = coordinator.taskDir)
+                    os.close(fd)
+                    readPayload(self.rfile, request["payload"], archivePath)
+                writeMessage(self.wfile, coordinator.complete(request, archivePath))
+            finally:
+                if archivePath != None:
+                    os.remove(archivePath)
+        else:
+            writeMessage(self.wfile, {"error": f"unknown op {op}"})
+
+class QueueServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+def coordinate(params):
+    configs = runApk.GlobalConfigs()
+    runApk.determinGatorRootAndSDKPath(configs)
+    port = DEFAULT_PORT
+    bind = "127.0.0.1"
+    secret = os.environ.get(SECRET_VARIABLE)
+    leaseSeconds = LEASE_SECONDS
+    maxAttempts = MAX_ATTEMPTS
+    source = runApk.CONFIG.get("apk_directory")
+    i = 0
+    while i < len(params):
+        var = params[i]
+        try:
+            if var == "--port":
+                i += 1
+                port = int(params[i])
+            elif var == "--bind":
+                i += 1
+                bind = params[i]
+            elif var == "--secret":
+                i += 1
+                secret = params[i]
+            elif var == "--lease":
+                i += 1
+                leaseSeconds = float(params[i])
+            elif var == "--max-attempts":
+                i += 1
+                maxAttempts = int(params[i])
+            elif var == "--resume":
+                i += 1
+                configs.RESUME_TASK = params[i]
+            elif var == "--force":
+                configs.FORCE = True
+            elif var.startswith("--"):
+                runApk.fatalError(f"Unknown option: {var}")
+            else:
+                source = var
+        except (IndexError, ValueError):
+            runApk.fatalError(f"{var} expects a value")
+        i += 1
+
+    finished = {}
+    if configs.RESUME_TASK != None:
+        taskName = configs.RESUME_TASK
+        journal = runApk.JobJournal(os.path.join(configs.GATOR_ROOT, "output", taskName))
+        if not runApk.pathExists(journal.path):
+            runApk.fatalError(f"[ERROR] No journal to resume from: {journal.path}")
+        apkFiles, lastEntries = journal.load()
+        for apkPath, entry in lastEntries.items():
+            if entry["state"] in runApk.JobJournal.FINAL_STATES:
+                finished[apkPath] = entry.get("exit_code", 0 if entry["state"] == "done" else 1)
+    else:
+        if source == None or not runApk.pathExists(source):
+            runApk.fatalError(f"[ERROR] APK directory or manifest not found: {source}")
+        if os.path.isdir(source):
+            apkFiles = sorted(glob.glob(os.path.join(source, "*.apk")))
+        else:
+            apkFiles = loadManifest(source)
+        apkFiles = [os.path.abspath(apkPath) for apkPath in apkFiles]
+        if not apkFiles:
+            print(f"[WARNING] No APK files found in: {source}")
+            return 0
+        taskName = "task_" + datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        os.makedirs(os.path.join(configs.GATOR_ROOT, "output", taskName), exist_ok=True)
+        journal = runApk.JobJournal(os.path.join(configs.GATOR_ROOT, "output", taskName))
+        for apkPath in apkFiles:
+            journal.record(apkPath, "queued")
+
+    if not secret and bind not in LOOPBACK_ADDRESSES:
+        secret = secrets.token_hex(16)
+        print(f"[INFO] Reachable from other hosts: start workers with --secret {secret}")
+    coordinator = Coordinator(configs, taskName, apkFiles, finished, journal, leaseSeconds, maxAttempts, secret or None)
+    server = QueueServer((bind, port), RequestHandler)
+    server.coordinator = coordinator
+    print(f"[INFO] Batch task: {taskName} | {len(apkFiles) - len(finished)} of {len(apkFiles)} APK file(s) to analyze")
+    print(f"[OK] Coordinator listening on {bind}:{port} (lease {leaseSeconds:g}s, {maxAttempts} attempts per job)")
+
+    def watch():
+        # Expires leases even while no worker asks for work, and stops the server at the end
+        while not coordinator.isFinished():
+            with coordinator.cond:
+                coordinator.expireLeases()
+                coordinator.cond.wait(1.0)
+        time.sleep(DONE_GRACE_SECONDS)
+        server.shutdown()
+
+    watcher = threading.Thread(target = watch, daemon = True)
+    watcher.start()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"[INFO] Interrupted, continue with: python workQueue.py coordinator --resume {taskName}")
+        return 1
+    finally:
+        server.server_close()
+        # Results of workers whose run was discarded
+        shutil.rmtree(os.path.join(coordinator.taskDir, STAGING_DIR), ignore_errors=True)
+
+    results = coordinator.results
+    failed = [apkPath for apkPath in apkFiles if results.get(apkPath) != 0]
+    print(f"\n{'='*60}")
+    print("BATCH ANALYSIS SUMMARY")
+    print(f"{'='*60}")
+    print(f"Total: {len(apkFiles)} | Success: {len(apkFiles) - len(failed)} | Failed: {len(failed)}")
+    for apkPath in failed:
+        print(f"  - {os.path.basename(apkPath)}: exit code {results.get(apkPath)}")
+    runApk.printPhaseTimings(coordinator.taskDir, apkFiles)
+    print(f"{'='*60}\n")
+    return 1 if failed else 0
+
+class Worker:
+    """Pulls jobs from a coordinator until it has none left"""
+    def __init__(self, host, port, name, configs, secret = None):
+        self.host = host
+        self.port = port
+        self.name = name
+        self.configs = configs
+        self.secret = secret
+
+    def call(self, request, payloadPath = None, responsePath = None):
+        if self.secret:
+            request = dict(request, secret = self.secret)
+        with socket.create_connection((self.host, self.port), timeout = 60) as sock:
+            with sock.makefile('rwb') as stream:
+                writeMessage(stream, request, payloadPath)
+                line = stream.readline()
+                if not line:
+                    raise OSError("coordinator closed the connection")
+                response = json.loads(line.decode('utf-8'))
+                if response.get("payload") and responsePath != None:
+                    readPayload(stream, response["payload"], responsePath)
+                return response
+
+    def callRetrying(self, request, payloadPath = None, responsePath = None):
+        """call() that rides out coordinator restarts; None once it stays unreachable"""
+        deadline = time.time() + UNREACHABLE_SECONDS
+        delay = 1
+        while True:
+            try:
+                return self.call(request, payloadPath, responsePath)
+            except OSError as e:
+                if time.time() > deadline:
+                    print(f"[ERROR] {self.name}: coordinator unreachable ({e}), giving up")
+                    return None
+                time.sleep(delay)
+                delay = min(delay * 2, 30)
+
+    def run(self, slot, memoryGate, heapBytes):
+        name = f"{self.name}/{slot}"
+        while True:
+            # Memory first: a slot waiting for memory must not hold a lease it cannot renew
+            memoryGate.acquire(heapBytes)
+            try:
+                job = self.callRetrying({"op": "lease", "worker": name})
+                if job != None and "token" in job:
+                    self.runJob(job, name)
+            finally:
+                memoryGate.release(heapBytes)
+            if job == None or job.get("done"):
+                return
+            if "error" in job:
+                print(f"[ERROR] {name}: coordinator refused the request: {job['error']}")
+                return
+            if "wait" in job:
+                time.sleep(job["wait"])
+
+    def sharesOutput(self, job):
+        """True if this worker's output/<task> is the coordinator's, e.g. on a shared file system"""
+        try:
+            with open(os.path.join(self.configs.GATOR_ROOT, "output", job["task"], OUTPUT_TOKEN_FILE),
+                      'r', encoding='utf-8') as f:
+                return f.read().strip() == job["output_token"]
+        except OSError:
+            return False
+
+    def heartbeat(self, job, stopped):
+        """Renew the lease until the job ends"""
+        while not stopped.wait(job["lease_seconds"] / 3):
+            try:
+                if not self.call({"op": "renew", "apk": job["apk"], "token": job["token"]}).get("ok"):
+                    print(f"[WARN] {self.name}: lease of {os.path.basename(job['apk'])} was lost")
+                    return
+            except OSError:
+                # Retried at the next beat; the lease outlives a few missed renewals
+                pass
+
+    def runJob(self, job, name):
+        start = time.time()
+        apkPath = job["apk"]
+        apkName = os.path.basename(apkPath)
+        stopped = threading.Event()
+        beat = threading.Thread(target = self.heartbeat, args = (job, stopped), daemon = True)
+        beat.start()
+        tempDir = tempfile.mkdtemp(prefix = "gator-job-")
+        try:
+            if not (os.path.isfile(apkPath) and os.path.getsize(apkPath) == job["size"]):
+                # Not on a shared file system: download it under the same file name
+                apkPath = os.path.join(tempDir, apkName)
+                response = self.call({"op": "fetch", "apk": job["apk"], "token": job["token"]}, responsePath = apkPath)
+                if not response.get("ok"):
+                    print(f"[WARN] {name}: cannot download {apkName}, lease lost")
+                    return
+            print(f"[INFO] {name}: analyzing {apkName}")
+            shared = self.sharesOutput(job)
+            stagingName = None
+            if shared:
+                # The coordinator moves it to output/<task>/<app> only if it accepts the result
+                stagingName = f"{appNameOf(apkPath)}-{job['token']}"
+                outputDir = os.path.join(self.configs.GATOR_ROOT, "output", job["task"], STAGING_DIR, stagingName)
+            else:
+                outputDir = os.path.join(self.configs.GATOR_ROOT, "output", job["task"], appNameOf(apkPath))
+            os.makedirs(outputDir, exist_ok=True)
+            configs = copy.copy(self.configs)
+            configs.FORCE = configs.FORCE or job.get("force", False)
+            with open(os.path.join(outputDir, "log.txt"), 'w', encoding='utf-8') as logFile:
+                try:
+                    retval = runApk.runGatorOnAPKDirect(apkPath, list(job["options"]), False, output = logFile,
+                                                        configs = configs,
+                                                        timeout = runApk.CONFIG.get("analysis_timeout", 600),
+                                                        taskName = job["task"],
+                                                        outputDir = outputDir if shared else None)
+                except SystemExit as e:
+                    # fatalError() must only fail this job
+                    retval = e.code if isinstance(e.code, int) and e.code != 0 else 1
+                except Exception as e:
+                    logFile.write(f"[ERROR] Analysis aborted: {e}\n")
+                    retval = 1
+            stopped.set()
+            request = {"op": "complete", "apk": job["apk"], "token": job["token"], "worker": name,
+                       "retval": retval, "wall_seconds": round(time.time() - start, 3)}
+            archivePath = None
+            if shared:
+                request["staging"] = stagingName
+            else:
+                archivePath = os.path.join(tempDir, "result.zip")
+                packDirectory(outputDir, archivePath)
+            response = self.callRetrying(request, archivePath)
+            status = "SUCCESS" if retval == 0 else f"FAILED (exit code: {retval})"
+            if response != None and not response.get("ok"):
+                status += f", result discarded: {response.get('reason')}"
+            print(f"[{'✓' if retval == 0 else '✗'}] {name}: {apkName} - {status}")
+        finally:
+            stopped.set()
+            shutil.rmtree(tempDir, ignore_errors=True)
+
+def work(params):
+    configs = runApk.GlobalConfigs()
+    runApk.determinGatorRootAndSDKPath(configs)
+    address = None
+    jobs = 1
+    name = socket.gethostname()
+    secret = os.environ.get(SECRET_VARIABLE)
+    i = 0
+    while i < len(params):
+        var = params[i]
+        try:
+            if var == "--jobs":
+                i += 1
+                jobs = int(params[i])
+            elif var == "--name":
+                i += 1
+                name = params[i]
+            elif var == "--secret":
+                i += 1
+                secret = params[i]
+            elif var.startswith("--"):
+                runApk.fatalError(f"Unknown option: {var}")
+            else:
+                address = var
+        except (IndexError, ValueError):
+            runApk.fatalError(f"{var} expects a value")
+        i += 1
+    if address == None:
+        runApk.fatalError("worker expects the coordinator address, e.g. host:47200")
+    host, _, port = address.partition(":")
+    jobs, heapBytes, budgetBytes = runApk.planBatchParallelism(jobs, None)
+    # The coordinator records every accepted result; a worker's own rows could come from discarded runs
+    runApk.CONFIG["results_db"] = False
+    worker = Worker(host, int(port) if port else DEFAULT_PORT, f"{name}-{os.getpid()}", configs, secret)
+    memoryGate = runApk.MemoryGate(budgetBytes)
+    print(f"[INFO] Worker {worker.name}: {jobs} job slot(s), coordinator {host}:{worker.port}")
+    slots = [threading.Thread(target = worker.run, args = (slot, memoryGate, heapBytes)) for slot in range(1, jobs + 1)]
+    for thread in slots:
+        thread.start()
+    for thread in slots:
+        thread.join()
+    print(f"[INFO] Worker {worker.name}: no jobs left")
+    return 0
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in ("coordinator", "worker"):
+        print(__doc__)
+        return 1
+    if sys.argv[1] == "coordinator":
+        return coordinate(sys.argv[2:])
+    return work(sys.argv[2:])
+
+if __name__ == '__main__':
+    sys.exit(main())
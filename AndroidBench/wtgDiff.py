@@ -0,0 +1,180 @@
+"""
+Differences between the WTGs of two analysis runs or two versions of an app
+
+Node ids and the numeric suffixes in window names ("ACT[com.app.Main]1234")
+are assigned by Gator per run, so nodes are matched by window identity: the
+window text with those suffixes removed. Edges are matched by a 64-bit hash
+of (source window, target window, event type); both sides are compared as
+multisets with NumPy, so graphs with 100k edges diff in well under a second.
+
+    python wtgDiff.py <old wtg.json | dir> <new wtg.json | dir> [-o report.json]
+    python wtgDiff.py --tasks <baseline task dir> <task dir>
+
+The second form diffs every app of a task against the same app in a baseline
+task and writes wtg_diff.json into each app's output directory; runGatorOnApk.py
+does the same after a batch with --diff-baseline <task>. Exits with 1 if any
+graph differs.
+"""
+import os, sys
+import re
+import json
+import hashlib
+
+import numpy as np
+
+from wtgGraph import WTGGraph
+
+DIFF_FILE = "wtg_diff.json"
+# Gator appends its per-run node id to every window name: "ACT[...]1234", "DIALOG[...]56, alloc: ..."
+RUN_ID_SUFFIX = re.compile(r"\](\d+)")
+MULTIPLIERS = (np.uint64(0x9E3779B97F4A7C15), np.uint64(0xC2B2AE3D27D4EB4F), np.uint64(0x165667B19E3779F9))
+
+def windowIdentity(window):
+    return RUN_ID_SUFFIX.sub("]", window)
+
+def hash64(texts):
+    return np.array([int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little')
+                     for text in texts], dtype=np.uint64)
+
+class HashedGraph:
+    """Node and edge identity hashes of a WTG"""
+    def __init__(self, graph):
+        self.graph = graph
+        self.identities = [windowIdentity(window) for window in graph.windows]
+        self.nodeKeys = hash64(self.identities)
+        eventKeys = hash64(graph.eventNames)
+        with np.errstate(over='ignore'):
+            self.edgeKeys = (self.nodeKeys[graph.sources] * MULTIPLIERS[0]) \
+                ^ (self.nodeKeys[graph.targets] * MULTIPLIERS[1]) \
+                ^ (eventKeys[graph.eventTypes] * MULTIPLIERS[2])
+
+    def describeNode(self, node):
+        return self.identities[node]
+
+    def describeEdge(self, edge):
+        graph = self.graph
+        return {
+            "source": self.identities[graph.sources[edge]],
+            "target": self.identities[graph.targets[edge]],
+            "event_type": graph.eventNames[graph.eventTypes[edge]]
+        }
+
+def multisetDelta(oldKeys, newKeys):
+    """(keys, count change, first old position, first new position) of every key whose count differs"""
+    oldUnique, oldFirst, oldCounts = np.unique(oldKeys, return_index=True, return_counts=True)
+    newUnique, newFirst, newCounts = np.unique(newKeys, return_index=True, return_counts=True)
+    allKeys = np.union1d(oldUnique, newUnique)
+    counts = np.zeros((2, len(allKeys)), dtype=np.int64)
+    first = np.full((2, len(allKeys)), -1, dtype=np.int64)
+    oldSlots = np.searchsorted(allKeys, oldUnique)
+    newSlots = np.searchsorted(allKeys, newUnique)
+    counts[0, oldSlots] = oldCounts
+    counts[1, newSlots] = newCounts
+    first[0, oldSlots] = oldFirst
+    first[1, newSlots] = newFirst
+    delta = counts[1] - counts[0]
+    changed = np.flatnonzero(delta)
+    return allKeys[changed], delta[changed], first[0, changed], first[1, changed]
+
+def diffGraphs(oldGraph, newGraph):
+    """Structured delta between two WTGGraphs"""
+    old = HashedGraph(oldGraph)
+    new = HashedGraph(newGraph)
+    report = {
+        "old": {"application": oldGraph.application, "nodes": oldGraph.nodeCount(), "edges": oldGraph.edgeCount()},
+        "new": {"application": newGraph.application, "nodes": newGraph.nodeCount(), "edges": newGraph.edgeCount()}
+    }
+    nodes = {"added": [], "removed": []}
+    _, delta, oldFirst, newFirst = multisetDelta(old.nodeKeys, new.nodeKeys)
+    for change, oldNode, newNode in zip(delta.tolist(), oldFirst.tolist(), newFirst.tolist()):
+        if change > 0:
+            nodes["added"].append({"window": new.describeNode(newNode), "count": change})
+        else:
+            nodes["removed"].append({"window": old.describeNode(oldNode), "count": -change})
+    edges = {"added": [], "removed": []}
+    _, delta, oldFirst, newFirst = multisetDelta(old.edgeKeys, new.edgeKeys)
+    for change, oldEdge, newEdge in zip(delta.tolist(), oldFirst.tolist(), newFirst.tolist()):
+        if change > 0:
+            edges["added"].append(dict(new.describeEdge(newEdge), count=change))
+        else:
+            edges["removed"].append(dict(old.describeEdge(oldEdge), count=-change))
+    for side in (nodes, edges):
+        for key in side:
+            side[key].sort(key=lambda item: json.dumps(item, sort_keys=True))
+    oldEvents = dict(zip(oldGraph.eventNames, np.bincount(oldGraph.eventTypes, minlength=len(oldGraph.eventNames)).tolist()))
+    newEvents = dict(zip(newGraph.eventNames, np.bincount(newGraph.eventTypes, minlength=len(newGraph.eventNames)).tolist()))
+    report["event_types"] = {name: {"old": oldEvents.get(name, 0), "new": newEvents.get(name, 0)}
+                             for name in sorted(set(oldEvents) | set(newEvents))
+                             if oldEvents.get(name, 0) != newEvents.get(name, 0)}
+    report["nodes"] = nodes
+    report["edges"] = edges
+    report["identical"] = not (nodes["added"] or nodes["removed"] or edges["added"] or edges["removed"])
+    return report
+
+def diffFiles(oldPath, newPath):
+    return diffGraphs(WTGGraph.load(oldPath), WTGGraph.load(newPath))
+
+def describeDiff(report):
+    if report["identical"]:
+        return "identical"
+    nodes = report["nodes"]
+    edges = report["edges"]
+    return (f"nodes +{sum(item['count'] for item in nodes['added'])} -{sum(item['count'] for item in nodes['removed'])}, "
+            f"edges +{sum(item['count'] for item in edges['added'])} -{sum(item['count'] for item in edges['removed'])}")
+
+def diffTasks(baselineTaskDir, taskDir, apps = None):
+    """Diff every app of taskDir that has a wtg.json against baselineTaskDir
+
+    Writes wtg_diff.json into each diffed app directory and returns
+    {app: report summary}; apps missing from the baseline map to None."""
+    if apps == None:
+        apps = sorted(name for name in os.listdir(taskDir) if os.path.isdir(os.path.join(taskDir, name)))
+    results = {}
+    for app in apps:
+        newPath = os.path.join(taskDir, app, "wtg.json")
+        if not os.path.exists(newPath):
+            continue
+        oldPath = os.path.join(baselineTaskDir, app, "wtg.json")
+        if not os.path.exists(oldPath):
+            results[app] = None
+            continue
+        report = diffFiles(oldPath, newPath)
+        report["baseline"] = os.path.abspath(oldPath)
+        with open(os.path.join(taskDir, app, DIFF_FILE), 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        results[app] = report
+    return results
+
+def printTaskDiff(results, baselineName):
+    changed = [app for app, report in results.items() if report != None and not report["identical"]]
+    missing = [app for app, report in results.items() if report == None]
+    print(f"WTG diff against {baselineName}: {len(changed)} changed | "
+          f"{len(results) - len(changed) - len(missing)} identical | {len(missing)} not in baseline")
+    for app in changed:
+        print(f"  - {app}: {describeDiff(results[app])}")
+    return len(changed) > 0
+
+def main():
+    args = sys.argv[1:]
+    outputPath = None
+    if "-o" in args:
+        i = args.index("-o")
+        outputPath = args[i + 1]
+        del args[i:i + 2]
+    if len(args) == 3 and args[0] == "--tasks":
+        results = diffTasks(args[1], args[2])
+        return 1 if printTaskDiff(results, os.path.basename(os.path.normpath(args[1]))) else 0
+    if len(args) != 2:
+        print(__doc__)
+        return 2
+    report = diffFiles(args[0], args[1])
+    if outputPath:
+        with open(outputPath, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    else:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    print(f"[INFO] {describeDiff(report)}", file=sys.stderr)
+    return 0 if report["identical"] else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,343 @@
+"""
+Array-backed Window Transition Graph for post-analysis queries
+
+WTGGraph loads the nodes and edges of a wtg.json (or a wtg.ndjson export)
+into NumPy arrays: nodes are numbered 0..n-1 in file order, edges are kept
+as source/target/event-type columns with event types encoded as small
+integers, and outgoing edges are indexed in compressed sparse row (CSR)
+form. The arrays are cached as wtg.npz next to the JSON file, so the next
+load skips JSON parsing entirely.
+
+    graph = WTGGraph.load("output/task_.../Calendar")
+    distances = graph.bfsDistances()          # hops from the launcher, -1 if unreachable
+    labels, count = graph.stronglyConnectedComponents()
+    for path in graph.paths(3): ...           # edge index sequences, like PathGenerationDemoClient
+
+Usage outside the runners:
+    python wtgGraph.py <wtg.json | wtg.ndjson | output dir> [--paths K] [--no-cache]
+"""
+import os, sys
+import json
+
+import numpy as np
+
+JSON_FILE = "wtg.json"
+NDJSON_FILE = "wtg.ndjson"
+CACHE_FILE = "wtg.npz"
+CACHE_VERSION = 1
+
+NODE_TYPES = ["Launcher", "Activity", "Dialog", "OptionsMenu", "ContextMenu", "Other"]
+# Inbound edges of these types do not start a path (see PathGenerationDemoClient)
+IMPLICIT_EVENTS = ("implicit_back_event", "implicit_home_event", "implicit_rotate_event", "implicit_power_event")
+
+def csr(keys, count):
+    """(offsets, order) such that order[offsets[k]:offsets[k + 1]] are the positions of key k"""
+    order = np.argsort(keys, kind='stable')
+    offsets = np.zeros(count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys, minlength=count), out=offsets[1:])
+    return offsets, order
+
+def gatherRows(offsets, values, rows):
+    """Concatenation of the CSR rows of all given row indices"""
+    starts = offsets[rows]
+    counts = offsets[rows + 1] - starts
+    total = int(counts.sum())
+    if total == 0:
+        return values[:0]
+    # Position of every gathered entry: its row start plus its offset inside the row
+    rowStarts = np.repeat(starts - (np.cumsum(counts) - counts), counts)
+    return values[rowStarts + np.arange(total)]
+
+class WTGGraph:
+    def __init__(self, application, nodeIds, nodeTypes, windows, eventNames, sources, targets, eventTypes):
+        self.application = application
+        # Node ids as Gator assigned them; nodes are referred to by their index into this array
+        self.nodeIds = np.asarray(nodeIds, dtype=np.int64)
+        self.nodeTypes = np.asarray(nodeTypes, dtype=np.int8)
+        self.windows = list(windows)
+        self.eventNames = list(eventNames)
+        self.sources = np.asarray(sources, dtype=np.int32)
+        self.targets = np.asarray(targets, dtype=np.int32)
+        self.eventTypes = np.asarray(eventTypes, dtype=np.int16)
+        # Outgoing edges of node i: self.outEdges[self.outOffsets[i]:self.outOffsets[i + 1]]
+        self.outOffsets, self.outEdges = csr(self.sources, self.nodeCount())
+        self.outTargets = self.targets[self.outEdges]
+        self.inDegrees = np.bincount(self.targets, minlength=self.nodeCount())
+
+    def nodeCount(self):
+        return len(self.nodeIds)
+
+    def edgeCount(self):
+        return len(self.sources)
+
+    @classmethod
+    def fromRecords(cls, application, nodes, edges):
+        """Build from node and edge dicts as found in wtg.json or wtg.ndjson"""
+        nodeIds = []
+        nodeTypes = []
+        windows = []
+        index = {}
+        for node in nodes:
+            index[node["id"]] = len(nodeIds)
+            nodeIds.append(node["id"])
+            nodeType = node.get("type", "Other")
+            nodeTypes.append(NODE_TYPES.index(nodeType) if nodeType in NODE_TYPES else NODE_TYPES.index("Other"))
+            windows.append(node.get("window", ""))
+        eventCodes = {}
+        sources = []
+        targets = []
+        eventTypes = []
+        for edge in edges:
+            sources.append(index[edge["source_id"]])
+            targets.append(index[edge["target_id"]])
+            eventTypes.append(eventCodes.setdefault(edge.get("event_type", "unknown"), len(eventCodes)))
+        return cls(application, nodeIds, nodeTypes, windows, list(eventCodes),
+                   np.array(sources, dtype=np.int32), np.array(targets, dtype=np.int32),
+                   np.array(eventTypes, dtype=np.int16))
+
+    @classmethod
+    def fromJSON(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return cls.fromRecords(data.get("application"), data.get("nodes", []), data.get("edges", []))
+
+    @classmethod
+    def fromNDJSON(cls, path):
+        import wtgStream
+        stream = wtgStream.WTGStream(path)
+        header = stream.header() or {}
+        return cls.fromRecords(header.get("application"), stream.nodes(), stream.edges())
+
+    @classmethod
+    def load(cls, path, useCache = True):
+        """Load a graph from a JSON export or output directory, through the wtg.npz cache"""
+        if os.path.isdir(path):
+            jsonPath = os.path.join(path, JSON_FILE)
+            path = jsonPath if os.path.exists(jsonPath) else os.path.join(path, NDJSON_FILE)
+        stat = os.stat(path)
+        cachePath = os.path.join(os.path.dirname(path), CACHE_FILE)
+        source = f"{os.path.basename(path)}|{stat.st_size}|{stat.st_mtime_ns}"
+        if useCache:
+            graph = cls.loadCache(cachePath, source)
+            if graph != None:
+                return graph
+        graph = cls.fromNDJSON(path) if path.endswith(".ndjson") else cls.fromJSON(path)
+        if useCache:
+            try:
+                graph.saveCache(cachePath, source)
+            except OSError:
+                pass
+        return graph
+
+    @classmethod
+    def loadCache(cls, cachePath, source):
+        """The cached graph if it was built from exactly this source file, else None"""
+        try:
+            with np.load(cachePath, allow_pickle=False) as data:
+                if int(data["version"]) != CACHE_VERSION or str(data["source"]) != source:
+                    return None
+                return cls(str(data["application"]), data["nodeIds"], data["nodeTypes"],
+                           data["windows"].tolist(), data["eventNames"].tolist(),
+                           data["sources"], data["targets"], data["eventTypes"])
+        except (OSError, KeyError, ValueError):
+            return None
+
+    def saveCache(self, cachePath, source):
+        tempPath = cachePath + ".tmp.npz"
+        np.savez(tempPath,
+                 version=np.array(CACHE_VERSION), source=np.array(source),
+                 application=np.array(self.application or ""),
+                 nodeIds=self.nodeIds, nodeTypes=self.nodeTypes,
+                 windows=np.array(self.windows, dtype=str), eventNames=np.array(self.eventNames, dtype=str),
+                 sources=self.sources, targets=self.targets, eventTypes=self.eventTypes)
+        os.replace(tempPath, cachePath)
+
+    def launcher(self):
+        """Index of the launcher node, or None"""
+        launchers = np.flatnonzero(self.nodeTypes == NODE_TYPES.index("Launcher"))
+        return int(launchers[0]) if len(launchers) else None
+
+    def eventCode(self, eventName):
+        return self.eventNames.index(eventName) if eventName in self.eventNames else -1
+
+    def bfsDistances(self, source = None):
+        """Hop distance of every node from source (default: the launcher); -1 where unreachable"""
+        if source == None:
+            source = self.launcher()
+        distances = np.full(self.nodeCount(), -1, dtype=np.int32)
+        if source == None:
+            return distances
+        distances[source] = 0
+        frontier = np.array([source], dtype=np.int64)
+        level = 0
+        while len(frontier):
+            level += 1
+            neighbors = gatherRows(self.outOffsets, self.outTargets, frontier)
+            frontier = np.unique(neighbors[distances[neighbors] < 0]).astype(np.int64)
+            distances[frontier] = level
+        return distances
+
+    def reachable(self, source = None):
+        return self.bfsDistances(source) >= 0
+
+    def stronglyConnectedComponents(self):
+        """(labels, count): the component of every node, numbered in reverse topological order"""
+        n = self.nodeCount()
+        offsets = self.outOffsets.tolist()
+        targets = self.outTargets.tolist()
+        index = [-1] * n
+        lowLink = [0] * n
+        onStack = [False] * n
+        labels = [-1] * n
+        stack = []
+        counter = 0
+        count = 0
+        # Iterative Tarjan: the call stack holds (node, next edge position)
+        for root in range(n):
+            if index[root] >= 0:
+                continue
+            work = [(root, offsets[root])]
+            index[root] = lowLink[root] = counter
+            counter += 1
+            stack.append(root)
+            onStack[root] = True
+            while work:
+                node, position = work[-1]
+                if position < offsets[node + 1]:
+                    work[-1] = (node, position + 1)
+                    target = targets[position]
+                    if index[target] < 0:
+                        index[target] = lowLink[target] = counter
+                        counter += 1
+                        stack.append(target)
+                        onStack[target] = True
+                        work.append((target, offsets[target]))
+                    elif onStack[target]:
+                        lowLink[node] = min(lowLink[node], index[target])
+                    continue
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowLink[parent] = min(lowLink[parent], lowLink[node])
+                if lowLink[node] == index[node]:
+                    while True:
+                        member = stack.pop()
+                        onStack[member] = False
+                        labels[member] = count
+                        if member == node:
+                            break
+                    count += 1
+        return np.array(labels, dtype=np.int32), count
+
+    def condensation(self):
+        """(labels, count, edges): the SCC labels and the distinct edges between components as a (k, 2) array"""
+        labels, count = self.stronglyConnectedComponents()
+        sourceLabels = labels[self.sources]
+        targetLabels = labels[self.targets]
+        between = sourceLabels != targetLabels
+        pairs = np.stack([sourceLabels[between], targetLabels[between]], axis=1)
+        return labels, count, np.unique(pairs, axis=0) if len(pairs) else pairs.reshape(0, 2)
+
+    def initialEdges(self):
+        """Edges entering an activity other than through an implicit event, where paths start"""
+        implicit = [self.eventCode(name) for name in IMPLICIT_EVENTS]
+        entersActivity = self.nodeTypes[self.targets] == NODE_TYPES.index("Activity")
+        return np.flatnonzero(entersActivity & ~np.isin(self.eventTypes, implicit))
+
+    def paths(self, k, initialEdges = None, limit = None):
+        """Edge index sequences of length 1..k that start with an initial edge, depth first
+
+        Unlike DFSGenericPathGenerator this does not replay window stack
+        operations, which wtg.json does not record."""
+        if initialEdges is None:
+            initialEdges = self.initialEdges()
+        offsets = self.outOffsets
+        produced = 0
+        for first in initialEdges:
+            path = [int(first)]
+            work = [iter(self.outEdges[offsets[self.targets[first]]:offsets[self.targets[first] + 1]].tolist())]
+            yield list(path)
+            produced += 1
+            if limit != None and produced >= limit:
+                return
+            while work:
+                if len(path) >= k:
+                    work.pop()
+                    path.pop()
+                    continue
+                edge = next(work[-1], None)
+                if edge == None:
+                    work.pop()
+                    path.pop()
+                    continue
+                path.append(edge)
+                yield list(path)
+                produced += 1
+                if limit != None and produced >= limit:
+                    return
+                target = self.targets[edge]
+                work.append(iter(self.outEdges[offsets[target]:offsets[target + 1]].tolist()))
+
+    def describePath(self, path):
+        return " -> ".join([self.windows[self.sources[path[0]]]] +
+                           [f"[{self.eventNames[self.eventTypes[edge]]}] {self.windows[self.targets[edge]]}" for edge in path])
+
+    def degreeStatistics(self):
+        outDegrees = np.diff(self.outOffsets)
+        statistics = {"nodes": self.nodeCount(), "edges": self.edgeCount()}
+        for name, degrees in (("out_degree", outDegrees), ("in_degree", self.inDegrees)):
+            if len(degrees) == 0:
+                continue
+            statistics[name] = {
+                "mean": round(float(degrees.mean()), 2),
+                "median": float(np.median(degrees)),
+                "p90": float(np.percentile(degrees, 90)),
+                "max": int(degrees.max()),
+                "max_node": self.windows[int(degrees.argmax())],
+                "zero": int((degrees == 0).sum())
+            }
+        statistics["self_loops"] = int((self.sources == self.targets).sum())
+        counts = np.bincount(self.eventTypes, minlength=len(self.eventNames))
+        statistics["event_types"] = {name: int(counts[code]) for code, name in enumerate(self.eventNames)}
+        return statistics
+
+def main():
+    args = sys.argv[1:]
+    if not args:
+        print(__doc__)
+        return 1
+    path = None
+    k = 0
+    useCache = True
+    i = 0
+    while i < len(args):
+        if args[i] == '--paths':
+            i += 1
+            k = int(args[i])
+        elif args[i] == '--no-cache':
+            useCache = False
+        else:
+            path = args[i]
+        i += 1
+    graph = WTGGraph.load(path, useCache)
+    print(f"{graph.application}: {graph.nodeCount()} nodes, {graph.edgeCount()} edges")
+    print(json.dumps(graph.degreeStatistics(), indent=2))
+    distances = graph.bfsDistances()
+    reached = distances >= 0
+    print(f"Reachable from launcher: {int(reached.sum())}/{graph.nodeCount()} nodes, "
+          f"max depth {int(distances.max()) if reached.any() else 0}")
+    for node in np.flatnonzero(~reached):
+        print(f"  unreachable: {graph.windows[node]}")
+    labels, count, between = graph.condensation()
+    sizes = np.bincount(labels, minlength=count)
+    print(f"Strongly connected components: {count} (largest {int(sizes.max()) if count else 0} nodes), "
+          f"{len(between)} edges between components")
+    if k > 0:
+        total = 0
+        for path in graph.paths(k):
+            total += 1
+        print(f"Paths of up to {k} edges: {total}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,129 @@
+"""
+Lazy reader for the line-delimited WTG export (wtg.ndjson)
+
+WTGVisualizationClient writes wtg.ndjson when run with "-clientParam ndjson"
+(or "wtg_ndjson": true in gator_config.json). The first line is a header,
+followed by one record per node and one per edge:
+
+    {"record": "header", "version": 1, "application": "...", "nodes": 14, "edges": 105, "launcher": 0}
+    {"record": "node", "id": 3, "type": "Activity", "window": "ACT[...]", "in_edges": 2, "out_edges": 9}
+    {"record": "edge", "id": 0, "source_id": 3, "target_id": 5, "event_type": "click",
+     "handlers": ["<...: void onClick(android.view.View)>"], "callbacks": [...], "stack_ops": [...], ...}
+
+WTGStream reads one line at a time, so memory use does not depend on the
+size of the graph. Usage outside the runners:
+    python wtgStream.py <wtg.ndjson | output dir> [--nodes [--type <type>] | --edges [--event <type>]]
+                        [--window <text>] [--count]
+"""
+import os, sys
+import gzip
+import json
+
+NDJSON_FILE = "wtg.ndjson"
+
+def openText(path):
+    if path.endswith(".gz"):
+        return gzip.open(path, 'rt', encoding='utf-8')
+    return open(path, 'r', encoding='utf-8')
+
+class WTGStream:
+    """Iterates the records of a wtg.ndjson file; every method starts a new pass over the file"""
+    def __init__(self, path):
+        if os.path.isdir(path):
+            path = os.path.join(path, NDJSON_FILE)
+        self.path = path
+
+    def records(self):
+        with openText(self.path) as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+    def header(self):
+        for record in self.records():
+            return record if record.get("record") == "header" else None
+        return None
+
+    def nodes(self, nodeType = None, window = None):
+        """Node records, optionally only of one type or whose window contains the given text"""
+        for record in self.records():
+            if record.get("record") != "node":
+                continue
+            if nodeType != None and record.get("type") != nodeType:
+                continue
+            if window != None and window not in record.get("window", ""):
+                continue
+            yield record
+
+    def edges(self, eventType = None, window = None):
+        """Edge records, optionally only of one event type or leaving or entering a matching window"""
+        for record in self.records():
+            if record.get("record") != "edge":
+                continue
+            if eventType != None and record.get("event_type") != eventType:
+                continue
+            if window != None and window not in record.get("source", "") and window not in record.get("target", ""):
+                continue
+            yield record
+
+    def handlerMethods(self, eventType = None, window = None):
+        """Distinct event handler signatures of the matching edges"""
+        seen = set()
+        for edge in self.edges(eventType, window):
+            for handler in edge.get("handlers", []):
+                if handler not in seen:
+                    seen.add(handler)
+                    yield handler
+
+def main():
+    args = sys.argv[1:]
+    if not args:
+        print(__doc__)
+        return 1
+    path = None
+    kind = "edges"
+    eventType = None
+    nodeType = None
+    window = None
+    countOnly = False
+    i = 0
+    while i < len(args):
+        val = args[i]
+        if val == '--nodes':
+            kind = "nodes"
+        elif val == '--edges':
+            kind = "edges"
+        elif val == '--event':
+            i += 1
+            eventType = args[i]
+        elif val == '--type':
+            i += 1
+            nodeType = args[i]
+        elif val == '--window':
+            i += 1
+            window = args[i]
+        elif val == '--count':
+            countOnly = True
+        else:
+            path = val
+        i += 1
+    stream = WTGStream(path)
+    if not os.path.exists(stream.path):
+        print(f"[ERROR] No WTG export at {stream.path} (run Gator with -clientParam ndjson)")
+        return 1
+    if kind == "nodes":
+        records = stream.nodes(nodeType, window)
+    else:
+        records = stream.edges(eventType, window)
+    count = 0
+    for record in records:
+        count += 1
+        if not countOnly:
+            print(json.dumps(record, ensure_ascii=False))
+    if countOnly:
+        print(count)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
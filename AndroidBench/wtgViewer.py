@@ -0,0 +1,470 @@
+"""
+Paged WTG viewer built from wtg.json, outside the analysis JVM
+
+The single-page wtg_viewer.html that WTGVisualizationClient used to write
+inlined every node, edge and the DOT text, which is unusable for real apps.
+This script writes a static viewer into <output dir>/viewer/ instead:
+
+    index.html          searchable, paged node list and an overview of node clusters
+    data/index.js       nodes, clusters (one per owning activity) and the cluster layout
+    data/edges-N.js     edge details, loaded only when a node of that chunk is selected
+
+Data files are plain scripts, so the viewer also works from file:// URLs.
+The viewer is rebuilt only when wtg.json (or wtg.ndjson, whose edges carry
+handler signatures) changed since it was generated.
+
+    python wtgViewer.py <output dir | wtg.json> [--open] [--force]
+"""
+import os, sys
+import re
+import json
+import shutil
+import pathlib
+import webbrowser
+from collections import Counter, deque
+
+VIEWER_DIR = "viewer"
+VIEWER_VERSION = 1
+STAMP_FILE = "stamp.json"
+# Edge records per lazily loaded data file
+CHUNK_EDGES = 4000
+
+ACTIVITY_CLASS = re.compile(r"ACT\[([^\]]+)\]")
+ALLOC_CLASS = re.compile(r"alloc: <([^:>]+):")
+LAUNCHER_CLUSTER = "(launcher)"
+OTHER_CLUSTER = "(other)"
+
+def sourceStamp(outputDir):
+    stamp = {"version": VIEWER_VERSION}
+    for name in ("wtg.json", "wtg.ndjson"):
+        try:
+            stat = os.stat(os.path.join(outputDir, name))
+        except OSError:
+            continue
+        stamp[name] = [stat.st_size, stat.st_mtime_ns]
+    return stamp
+
+def loadGraph(outputDir):
+    """(application, summary, nodes, edges) with handler signatures when wtg.ndjson exists"""
+    with open(os.path.join(outputDir, "wtg.json"), 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    nodes = data.get("nodes", [])
+    edges = data.get("edges", [])
+    ndjsonPath = os.path.join(outputDir, "wtg.ndjson")
+    if os.path.exists(ndjsonPath):
+        import wtgStream
+        edges = list(wtgStream.WTGStream(ndjsonPath).edges())
+    return data.get("application", ""), data.get("summary", {}), nodes, edges
+
+def assignClusters(nodes, edges, index):
+    """Name of the owning activity of every node"""
+    owners = []
+    for node in nodes:
+        window = node.get("window", "")
+        if node.get("type") == "Launcher":
+            owners.append(LAUNCHER_CLUSTER)
+            continue
+        match = ACTIVITY_CLASS.search(window)
+        if match:
+            # Activities own themselves; an options menu names its activity
+            owners.append(match.group(1))
+            continue
+        match = ALLOC_CLASS.search(window)
+        owners.append(match.group(1) if match else None)
+    activities = {owner for node, owner in zip(nodes, owners) if node.get("type") == "Activity"}
+    # A dialog allocated outside an activity class, or a context menu, belongs to the activity it is opened from
+    openedFrom = {}
+    for edge in edges:
+        source = index[edge["source_id"]]
+        target = index[edge["target_id"]]
+        if owners[source] in activities:
+            openedFrom.setdefault(target, Counter())[owners[source]] += 1
+    for i, owner in enumerate(owners):
+        if owner in activities or owner == LAUNCHER_CLUSTER:
+            continue
+        counts = openedFrom.get(i)
+        owners[i] = counts.most_common(1)[0][0] if counts else OTHER_CLUSTER
+    return owners
+
+def layoutClusters(clusterNames, clusterEdges):
+    """Layered layout: a cluster's column is its BFS depth from the launcher cluster"""
+    successors = {}
+    for (a, b) in clusterEdges:
+        successors.setdefault(a, []).append(b)
+    depth = {}
+    roots = [i for i, name in enumerate(clusterNames) if name == LAUNCHER_CLUSTER] or [0]
+    queue = deque()
+    for root in roots:
+        if root < len(clusterNames):
+            depth[root] = 0
+            queue.append(root)
+    while queue:
+        current = queue.popleft()
+        for nextCluster in successors.get(current, []):
+            if nextCluster not in depth:
+                depth[nextCluster] = depth[current] + 1
+                queue.append(nextCluster)
+    # Clusters the launcher cannot reach go into one column after the others
+    lastColumn = max(depth.values(), default=0) + 1
+    rows = Counter()
+    layout = []
+    for i in range(len(clusterNames)):
+        column = depth.get(i, lastColumn)
+        layout.append((column, rows[column]))
+        rows[column] += 1
+    return layout
+
+def handlerField(edge):
+    handlers = edge.get("handlers", 0)
+    return handlers if isinstance(handlers, list) else int(handlers)
+
+def buildViewerData(outputDir):
+    application, summary, nodes, edges = loadGraph(outputDir)
+    index = {node["id"]: i for i, node in enumerate(nodes)}
+    owners = assignClusters(nodes, edges, index)
+    clusterNames = sorted(set(owners), key=lambda name: (name != LAUNCHER_CLUSTER, name == OTHER_CLUSTER, name))
+    clusterIndex = {name: i for i, name in enumerate(clusterNames)}
+    nodeTypes = sorted({node.get("type", "Other") for node in nodes})
+    eventTypes = sorted({edge.get("event_type", "unknown") for edge in edges})
+    eventIndex = {name: i for i, name in enumerate(eventTypes)}
+
+    outgoing = [[] for _ in nodes]
+    incoming = [[] for _ in nodes]
+    clusterEdges = Counter()
+    for edge in edges:
+        source = index[edge["source_id"]]
+        target = index[edge["target_id"]]
+        event = eventIndex[edge.get("event_type", "unknown")]
+        record = [target, event, handlerField(edge)]
+        if "callbacks" in edge:
+            record.append(edge["callbacks"] if isinstance(edge["callbacks"], list) else int(edge["callbacks"]))
+        outgoing[source].append(record)
+        incoming[target].append([source, event])
+        clusterEdges[(clusterIndex[owners[source]], clusterIndex[owners[target]])] += 1
+
+    # Nodes of a cluster are listed together and share data files as far as possible
+    order = sorted(range(len(nodes)), key=lambda i: (clusterIndex[owners[i]], nodes[i].get("window", "")))
+    chunks = [{}]
+    chunkOf = [0] * len(nodes)
+    chunkSize = 0
+    for i in order:
+        size = len(outgoing[i]) + len(incoming[i])
+        if chunkSize and chunkSize + size > CHUNK_EDGES:
+            chunks.append({})
+            chunkSize = 0
+        chunks[-1][i] = {"out": outgoing[i], "in": incoming[i]}
+        chunkOf[i] = len(chunks) - 1
+        chunkSize += size
+
+    layout = layoutClusters(clusterNames, [pair for pair in clusterEdges if pair[0] != pair[1]])
+    clusters = []
+    for i, name in enumerate(clusterNames):
+        members = [node for node in order if clusterIndex[owners[node]] == i]
+        clusters.append({"name": name, "nodes": members, "column": layout[i][0], "row": layout[i][1]})
+    viewerIndex = {
+        "application": application,
+        "summary": summary,
+        "nodeTypes": nodeTypes,
+        "eventTypes": eventTypes,
+        # [window, type, cluster, in-degree, out-degree, data file]
+        "nodes": [[node.get("window", ""), nodeTypes.index(node.get("type", "Other")), clusterIndex[owners[i]],
+                   len(incoming[i]), len(outgoing[i]), chunkOf[i]] for i, node in enumerate(nodes)],
+        "clusters": clusters,
+        "clusterEdges": [[a, b, count] for (a, b), count in sorted(clusterEdges.items()) if a != b]
+    }
+    return viewerIndex, chunks
+
+def writeScript(path, prefix, data, suffix):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(prefix)
+        json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+        f.write(suffix)
+
+def buildViewer(outputDir, force = False):
+    """Write the viewer for one output directory unless it is up to date; returns the index.html path"""
+    viewerDir = os.path.join(outputDir, VIEWER_DIR)
+    indexPath = os.path.join(viewerDir, "index.html")
+    stamp = sourceStamp(outputDir)
+    stampPath = os.path.join(viewerDir, STAMP_FILE)
+    if not force and os.path.exists(indexPath):
+        try:
+            with open(stampPath, 'r', encoding='utf-8') as f:
+                if json.load(f) == stamp:
+                    return indexPath
+        except (OSError, ValueError):
+            pass
+    viewerIndex, chunks = buildViewerData(outputDir)
+    # Build next to the old viewer and swap it in, so an open viewer never sees a mix of both
+    stagingDir = viewerDir + ".tmp"
+    shutil.rmtree(stagingDir, ignore_errors=True)
+    os.makedirs(os.path.join(stagingDir, "data"))
+    writeScript(os.path.join(stagingDir, "data", "index.js"), "window.WTG_INDEX = ", viewerIndex, ";\n")
+    for i, chunk in enumerate(chunks):
+        writeScript(os.path.join(stagingDir, "data", f"edges-{i}.js"), f"WTGViewer.chunkLoaded({i}, ", chunk, ");\n")
+    with open(os.path.join(stagingDir, "index.html"), 'w', encoding='utf-8') as f:
+        f.write(VIEWER_HTML)
+    with open(os.path.join(stagingDir, STAMP_FILE), 'w', encoding='utf-8') as f:
+        json.dump(stamp, f)
+    shutil.rmtree(viewerDir, ignore_errors=True)
+    os.replace(stagingDir, viewerDir)
+    return indexPath
+
+VIEWER_HTML = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>WTG Viewer</title>
+<style>
+body { font-family: Arial, sans-serif; margin: 0; background: #f5f5f5; font-size: 13px; }
+header { background: #2c3e50; color: white; padding: 10px 16px; }
+header h1 { font-size: 18px; margin: 0; display: inline; }
+header span { margin-left: 16px; color: #bdc3c7; }
+#overview { background: white; border-bottom: 1px solid #ddd; height: 240px; overflow: auto; }
+#main { display: flex; height: calc(100vh - 290px); }
+#list { width: 45%; border-right: 1px solid #ddd; display: flex; flex-direction: column; background: white; }
+#controls { padding: 8px; border-bottom: 1px solid #eee; }
+#controls input, #controls select { margin-right: 6px; }
+#nodes { flex: 1; overflow: auto; }
+#pager { padding: 6px 8px; border-top: 1px solid #eee; }
+#details { flex: 1; overflow: auto; padding: 10px 16px; }
+.node { padding: 4px 8px; border-bottom: 1px solid #f0f0f0; cursor: pointer; white-space: nowrap; overflow: hidden; text-overflow: ellipsis; }
+.node:hover, .node.selected { background: #eaf2f8; }
+.type { display: inline-block; width: 90px; color: #7f8c8d; }
+.edge { padding: 3px 0; border-bottom: 1px dotted #eee; }
+.event { display: inline-block; min-width: 150px; color: #c0392b; }
+.link { color: #2980b9; cursor: pointer; }
+.sig { color: #7f8c8d; font-family: monospace; font-size: 11px; margin-left: 20px; }
+svg text { font-size: 11px; pointer-events: none; }
+svg rect { cursor: pointer; }
+</style>
+</head>
+<body>
+<header><h1 id="title">WTG Viewer</h1><span id="stats"></span></header>
+<div id="overview"></div>
+<div id="main">
+  <div id="list">
+    <div id="controls">
+      <input id="search" placeholder="Search windows" size="30">
+      <select id="cluster"><option value="-1">All activities</option></select>
+      <select id="type"><option value="-1">All types</option></select>
+    </div>
+    <div id="nodes"></div>
+    <div id="pager"></div>
+  </div>
+  <div id="details">Select a node to see its transitions.</div>
+</div>
+<script src="data/index.js"></script>
+<script>
+var WTGViewer = (function () {
+  var index = window.WTG_INDEX;
+  var PAGE = 100, EDGE_PAGE = 200;
+  var page = 0, filtered = [], selected = -1;
+  var chunks = {}, waiting = {};
+
+  function el(tag, text, cls) {
+    var e = document.createElement(tag);
+    if (text !== undefined) e.textContent = text;
+    if (cls) e.className = cls;
+    return e;
+  }
+
+  function applyFilter() {
+    var text = document.getElementById('search').value.toLowerCase();
+    var cluster = +document.getElementById('cluster').value;
+    var type = +document.getElementById('type').value;
+    var candidates = cluster >= 0 ? index.clusters[cluster].nodes : index.clusters.reduce(function (all, c) { return all.concat(c.nodes); }, []);
+    filtered = candidates.filter(function (i) {
+      var n = index.nodes[i];
+      return (type < 0 || n[1] === type) && (!text || n[0].toLowerCase().indexOf(text) >= 0);
+    });
+    page = 0;
+    renderList();
+  }
+
+  function renderList() {
+    var list = document.getElementById('nodes');
+    list.innerHTML = '';
+    filtered.slice(page * PAGE, (page + 1) * PAGE).forEach(function (i) {
+      var n = index.nodes[i];
+      var row = el('div', undefined, 'node' + (i === selected ? ' selected' : ''));
+      row.appendChild(el('span', index.nodeTypes[n[1]], 'type'));
+      row.appendChild(document.createTextNode(n[0] + '  (in ' + n[3] + ', out ' + n[4] + ')'));
+      row.onclick = function () { select(i); };
+      list.appendChild(row);
+    });
+    var pages = Math.max(1, Math.ceil(filtered.length / PAGE));
+    var pager = document.getElementById('pager');
+    pager.innerHTML = '';
+    var prev = el('button', '<'), next = el('button', '>');
+    prev.disabled = page === 0;
+    next.disabled = page >= pages - 1;
+    prev.onclick = function () { page--; renderList(); };
+    next.onclick = function () { page++; renderList(); };
+    pager.appendChild(prev);
+    pager.appendChild(el('span', ' page ' + (page + 1) + ' / ' + pages + ' (' + filtered.length + ' nodes) '));
+    pager.appendChild(next);
+  }
+
+  function loadChunk(chunk, callback) {
+    if (chunks[chunk]) { callback(chunks[chunk]); return; }
+    if (!waiting[chunk]) {
+      waiting[chunk] = [];
+      var script = document.createElement('script');
+      script.src = 'data/edges-' + chunk + '.js';
+      document.body.appendChild(script);
+    }
+    waiting[chunk].push(callback);
+  }
+
+  function chunkLoaded(chunk, data) {
+    chunks[chunk] = data;
+    (waiting[chunk] || []).forEach(function (callback) { callback(data); });
+    delete waiting[chunk];
+  }
+
+  function select(i) {
+    selected = i;
+    renderList();
+    var details = document.getElementById('details');
+    details.innerHTML = '';
+    details.appendChild(el('p', 'Loading...'));
+    loadChunk(index.nodes[i][5], function (data) {
+      if (selected === i) renderDetails(i, data[i] || {out: [], in: []});
+    });
+  }
+
+  function nodeLink(i) {
+    var link = el('span', index.nodes[i][0], 'link');
+    link.onclick = function () { select(i); };
+    return link;
+  }
+
+  function renderEdges(container, edges, outgoing) {
+    var shown = 0;
+    function more() {
+      edges.slice(shown, shown + EDGE_PAGE).forEach(function (e) {
+        var row = el('div', undefined, 'edge');
+        row.appendChild(el('span', index.eventTypes[e[1]], 'event'));
+        row.appendChild(nodeLink(e[0]));
+        if (outgoing) {
+          var handlers = e[2];
+          if (Array.isArray(handlers)) {
+            handlers.forEach(function (h) { row.appendChild(el('div', h, 'sig')); });
+          } else if (handlers) {
+            row.appendChild(el('span', '  [' + handlers + ' handlers]'));
+          }
+          var callbacks = e[3];
+          if (Array.isArray(callbacks)) {
+            callbacks.forEach(function (c) { row.appendChild(el('div', 'callback: ' + c.method, 'sig')); });
+          }
+        }
+        container.insertBefore(row, button);
+      });
+      shown += EDGE_PAGE;
+      button.style.display = shown < edges.length ? '' : 'none';
+    }
+    var button = el('button', 'More');
+    button.onclick = more;
+    container.appendChild(button);
+    more();
+  }
+
+  function renderDetails(i, data) {
+    var n = index.nodes[i];
+    var details = document.getElementById('details');
+    details.innerHTML = '';
+    details.appendChild(el('h3', n[0]));
+    details.appendChild(el('p', index.nodeTypes[n[1]] + ' in ' + index.clusters[n[2]].name));
+    details.appendChild(el('h4', 'Outgoing transitions (' + data.out.length + ')'));
+    var out = el('div');
+    details.appendChild(out);
+    renderEdges(out, data.out, true);
+    details.appendChild(el('h4', 'Incoming transitions (' + data.in.length + ')'));
+    var incoming = el('div');
+    details.appendChild(incoming);
+    renderEdges(incoming, data.in, false);
+  }
+
+  function renderOverview() {
+    var W = 190, H = 34, GAP_X = 60, GAP_Y = 12, NS = 'http://www.w3.org/2000/svg';
+    var columns = 0, rows = 0;
+    index.clusters.forEach(function (c) { columns = Math.max(columns, c.column + 1); rows = Math.max(rows, c.row + 1); });
+    var svg = document.createElementNS(NS, 'svg');
+    svg.setAttribute('width', columns * (W + GAP_X) + 20);
+    svg.setAttribute('height', rows * (H + GAP_Y) + 20);
+    function center(c) { return [10 + c.column * (W + GAP_X) + W / 2, 10 + c.row * (H + GAP_Y) + H / 2]; }
+    index.clusterEdges.forEach(function (e) {
+      var a = center(index.clusters[e[0]]), b = center(index.clusters[e[1]]);
+      var line = document.createElementNS(NS, 'line');
+      line.setAttribute('x1', a[0]); line.setAttribute('y1', a[1]);
+      line.setAttribute('x2', b[0]); line.setAttribute('y2', b[1]);
+      line.setAttribute('stroke', '#95a5a6');
+      line.setAttribute('stroke-width', Math.min(6, 0.5 + Math.log(1 + e[2])));
+      line.setAttribute('opacity', 0.5);
+      svg.appendChild(line);
+    });
+    index.clusters.forEach(function (c, ci) {
+      var rect = document.createElementNS(NS, 'rect');
+      rect.setAttribute('x', 10 + c.column * (W + GAP_X)); rect.setAttribute('y', 10 + c.row * (H + GAP_Y));
+      rect.setAttribute('width', W); rect.setAttribute('height', H); rect.setAttribute('rx', 5);
+      rect.setAttribute('fill', '#d6eaf8'); rect.setAttribute('stroke', '#2980b9');
+      rect.onclick = function () { document.getElementById('cluster').value = ci; applyFilter(); };
+      var title = document.createElementNS(NS, 'title');
+      title.textContent = c.name;
+      rect.appendChild(title);
+      svg.appendChild(rect);
+      var label = document.createElementNS(NS, 'text');
+      var name = c.name.split('.').pop();
+      label.textContent = (name.length > 24 ? name.slice(0, 23) + '\\u2026' : name) + ' (' + c.nodes.length + ')';
+      label.setAttribute('x', 16 + c.column * (W + GAP_X)); label.setAttribute('y', 31 + c.row * (H + GAP_Y));
+      svg.appendChild(label);
+    });
+    document.getElementById('overview').appendChild(svg);
+  }
+
+  function init() {
+    document.getElementById('title').textContent = 'WTG: ' + index.application;
+    document.title = 'WTG: ' + index.application;
+    var s = index.summary;
+    document.getElementById('stats').textContent = index.nodes.length + ' nodes, ' + (s.total_edges || 0) + ' edges, ' + index.clusters.length + ' activities';
+    var clusterSelect = document.getElementById('cluster');
+    index.clusters.forEach(function (c, i) { var o = el('option', c.name + ' (' + c.nodes.length + ')'); o.value = i; clusterSelect.appendChild(o); });
+    var typeSelect = document.getElementById('type');
+    index.nodeTypes.forEach(function (t, i) { var o = el('option', t); o.value = i; typeSelect.appendChild(o); });
+    document.getElementById('search').oninput = applyFilter;
+    clusterSelect.onchange = applyFilter;
+    typeSelect.onchange = applyFilter;
+    renderOverview();
+    applyFilter();
+  }
+
+  init();
+  return {chunkLoaded: chunkLoaded, select: select};
+})();
+</script>
+</body>
+</html>
+"""
+
+def main():
+    args = sys.argv[1:]
+    openBrowser = "--open" in args
+    force = "--force" in args
+    paths = [arg for arg in args if not arg.startswith("--")]
+    if len(paths) != 1:
+        print(__doc__)
+        return 1
+    outputDir = paths[0]
+    if os.path.isfile(outputDir):
+        outputDir = os.path.dirname(os.path.abspath(outputDir))
+    if not os.path.exists(os.path.join(outputDir, "wtg.json")):
+        print(f"[ERROR] No wtg.json in {outputDir}")
+        return 1
+    indexPath = buildViewer(outputDir, force)
+    print(f"[OK] WTG viewer: {indexPath}")
+    if openBrowser:
+        webbrowser.open(pathlib.Path(os.path.abspath(indexPath)).as_uri())
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -32,6 +32,8 @@ public class AnalysisEntrypoint {
   public void run() {
     System.out.println("[Stat] #Classes: " + Scene.v().getClasses().size() +
         ", #AppClasses: " + Scene.v().getApplicationClasses().size());
+    EventLog.phaseEnd("soot", "classes", Scene.v().getClasses().size(),
+        "appClasses", Scene.v().getApplicationClasses().size());
 
     // Sanity check
     if (!"1".equals(System.getenv("PRODUCTION"))) {
@@ -40,7 +42,8 @@ public class AnalysisEntrypoint {
 
     if (Configs.instrument) {
       new InstrumentationMain().run();
-      System.exit(0);
+      exit();
+      return;
     }
 
 
@@ -68,6 +71,15 @@ public class AnalysisEntrypoint {
       guiAnalysis.run();
       Date endTime = new Date();
       System.out.println("Soot stopped on " + endTime);
+      exit();
+    }
+  }
+
+  // A GatorServer worker keeps its JVM for the next job
+  void exit() {
+    EventLog.emit("end");
+    EventLog.close();
+    if (!Configs.serverMode) {
       System.exit(0);
     }
   }
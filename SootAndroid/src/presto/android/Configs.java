@@ -138,6 +138,12 @@ public class Configs {
 
   public static boolean preRun = false;
 
+  // JSON-lines progress events (see EventLog); empty = disabled
+  public static String eventFile = "";
+
+  // Running inside GatorServer: finish jobs without exiting the JVM
+  public static boolean serverMode = false;
+
   public static Set<String> onDemandClassSet = Sets.newHashSet();
 
   public static Map<String, String> widgetMap = Maps.newHashMap();
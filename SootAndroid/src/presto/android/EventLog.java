@@ -0,0 +1,114 @@
+/*
+ * EventLog.java - part of the GATOR project
+ *
+ * Copyright (c) 2014, 2015 The Ohio State University
+ *
+ * This file is distributed under the terms described in LICENSE in the
+ * root directory.
+ */
+package presto.android;
+
+import java.io.FileOutputStream;
+import java.io.IOException;
+import java.io.OutputStreamWriter;
+import java.io.PrintWriter;
+
+/**
+ * Machine-readable progress events, one JSON object per line, written to the
+ * file given by -eventFile. Every event has a timestamp "t" in milliseconds
+ * and a name "event"; the remaining fields are given as key/value pairs, e.g.
+ *
+ *   EventLog.emit("flowgraph", "nodes", n, "varNodes", m);
+ *
+ * Without -eventFile all calls are no-ops.
+ */
+public class EventLog {
+  private static PrintWriter out;
+
+  public static synchronized void open(String path) {
+    try {
+      out = new PrintWriter(new OutputStreamWriter(new FileOutputStream(path), "UTF-8"));
+    } catch (IOException e) {
+      System.out.println("[WARNING] Cannot write events to " + path + ": " + e);
+      out = null;
+    }
+  }
+
+  public static synchronized void close() {
+    if (out != null) {
+      out.close();
+      out = null;
+    }
+  }
+
+  public static boolean enabled() {
+    return out != null;
+  }
+
+  public static synchronized void emit(String event, Object... fields) {
+    if (out == null) {
+      return;
+    }
+    StringBuilder sb = new StringBuilder();
+    sb.append("{\"t\": ").append(System.currentTimeMillis());
+    sb.append(", \"event\": ").append(quote(event));
+    for (int i = 0; i + 1 < fields.length; i += 2) {
+      sb.append(", ").append(quote(String.valueOf(fields[i]))).append(": ");
+      Object value = fields[i + 1];
+      if (value instanceof Number || value instanceof Boolean) {
+        sb.append(value);
+      } else {
+        sb.append(quote(String.valueOf(value)));
+      }
+    }
+    sb.append("}");
+    out.println(sb);
+    // Consumers follow the file while the analysis runs
+    out.flush();
+  }
+
+  /**
+   * Start timing a phase (see PhaseTimer) and report it.
+   */
+  public static synchronized void phaseStart(String phase) {
+    PhaseTimer.start(phase);
+    emit("phaseStart", "phase", phase);
+  }
+
+  /**
+   * Stop timing a phase and report its wall and CPU time with the given fields.
+   */
+  public static synchronized void phaseEnd(String phase, Object... fields) {
+    long[] elapsed = PhaseTimer.stop(phase);
+    Object[] all = new Object[fields.length + 6];
+    all[0] = "phase";
+    all[1] = phase;
+    all[2] = "wallMs";
+    all[3] = elapsed == null ? -1 : elapsed[0] / 1000000;
+    all[4] = "cpuMs";
+    all[5] = elapsed == null ? -1 : elapsed[1] / 1000000;
+    System.arraycopy(fields, 0, all, 6, fields.length);
+    emit("phaseEnd", all);
+  }
+
+  static String quote(String s) {
+    StringBuilder sb = new StringBuilder("\"");
+    for (int i = 0; i < s.length(); i++) {
+      char c = s.charAt(i);
+      switch (c) {
+        case '"': sb.append("\\\""); break;
+        case '\\': sb.append("\\\\"); break;
+        case '\n': sb.append("\\n"); break;
+        case '\r': sb.append("\\r"); break;
+        case '\t': sb.append("\\t"); break;
+        default:
+          if (c < 0x20) {
+            sb.append(String.format("\\u%04x", (int) c));
+          } else {
+            sb.append(c);
+          }
+      }
+    }
+    return sb.append('"').toString();
+  }
+}
@@ -0,0 +1,190 @@
+/*
+ * GatorServer.java - part of the GATOR project
+ *
+ * Copyright (c) 2014, 2015 The Ohio State University
+ *
+ * This file is distributed under the terms described in LICENSE in the
+ * root directory.
+ */
+package presto.android;
+
+import java.io.BufferedReader;
+import java.io.File;
+import java.io.FileOutputStream;
+import java.io.IOException;
+import java.io.InputStreamReader;
+import java.io.OutputStreamWriter;
+import java.io.PrintStream;
+import java.io.PrintWriter;
+import java.lang.management.ManagementFactory;
+import java.lang.reflect.InvocationTargetException;
+import java.net.InetAddress;
+import java.net.ServerSocket;
+import java.net.Socket;
+import java.net.URL;
+import java.net.URLClassLoader;
+import java.util.ArrayList;
+import java.util.List;
+
+/**
+ * A long-lived analysis worker that runs presto.android.Main once per request,
+ * so the JVM, Soot and the JIT stay warm across APKs.
+ *
+ * Gator keeps its per-app state in static fields and singletons. Each job
+ * therefore loads the presto.* classes through a fresh child-first class
+ * loader, and Soot's global state is reset with G.reset(). Soot itself and
+ * the libraries stay loaded by the application class loader.
+ *
+ * G.reset() also drops the Scene, so android.jar and the support jars are
+ * parsed again for every job; Soot cannot keep resolved classes of one Scene
+ * for the next. What a worker saves is JVM start-up, class loading and JIT
+ * warm-up, not the platform reload.
+ *
+ * The protocol is line based and spoken over a single localhost connection
+ * (see AndroidBench/gatorDaemon.py). On start-up the server prints
+ * "READY port pid" on stdout. A request is "RUN logPath", one argument of
+ * Main per line, then "END". The output of the job is appended to logPath
+ * and the reply is "DONE exitCode usedHeapBytes maxHeapBytes".
+ */
+public class GatorServer {
+  private static final String SERVER_CLASS = GatorServer.class.getName();
+
+  public static void main(String[] args) throws IOException {
+    int port = 0;
+    for (int i = 0; i < args.length; i++) {
+      String s = args[i];
+      if ("-port".equals(s)) {
+        port = Integer.parseInt(args[++i]);
+      } else {
+        throw new RuntimeException("Unknown option: " + s);
+      }
+    }
+
+    ServerSocket server = new ServerSocket(port, 1, InetAddress.getLoopbackAddress());
+    System.out.println("READY " + server.getLocalPort() + " " + pid());
+    System.out.flush();
+
+    // Serve exactly one client: the dispatcher that started this JVM
+    Socket socket = server.accept();
+    server.close();
+    BufferedReader in = new BufferedReader(
+        new InputStreamReader(socket.getInputStream(), "UTF-8"));
+    PrintWriter out = new PrintWriter(
+        new OutputStreamWriter(socket.getOutputStream(), "UTF-8"), true);
+    String line;
+    while ((line = in.readLine()) != null) {
+      if ("QUIT".equals(line)) {
+        break;
+      }
+      if (!line.startsWith("RUN ")) {
+        out.println("ERROR unexpected request: " + line);
+        continue;
+      }
+      String logPath = line.substring("RUN ".length());
+      List<String> jobArgs = new ArrayList<String>();
+      while ((line = in.readLine()) != null && !"END".equals(line)) {
+        jobArgs.add(line);
+      }
+      int exitCode = runJob(logPath, jobArgs);
+
+      // Report the heap left over after the job so that the dispatcher can
+      // recycle workers whose static state leaks across class loaders
+      Runtime runtime = Runtime.getRuntime();
+      System.gc();
+      long used = runtime.totalMemory() - runtime.freeMemory();
+      out.println("DONE " + exitCode + " " + used + " " + runtime.maxMemory());
+    }
+    socket.close();
+    System.exit(0);
+  }
+
+  /**
+   * Run one analysis with its output appended to logPath and return the exit
+   * code a separate JVM would have reported.
+   */
+  static int runJob(String logPath, List<String> jobArgs) {
+    PrintStream stdout = System.out;
+    PrintStream stderr = System.err;
+    Thread current = Thread.currentThread();
+    ClassLoader parent = current.getContextClassLoader();
+    int exitCode = 0;
+    PrintStream log;
+    try {
+      log = new PrintStream(new FileOutputStream(logPath, true), true);
+    } catch (IOException e) {
+      stderr.println("[SERVER] Cannot open log " + logPath + ": " + e);
+      return 1;
+    }
+    jobArgs.add("-serverMode");
+    try {
+      System.setOut(log);
+      System.setErr(log);
+      soot.G.reset();
+      ClassLoader loader = new JobClassLoader(classPathURLs(), GatorServer.class.getClassLoader());
+      current.setContextClassLoader(loader);
+      Class<?> mainClass = loader.loadClass("presto.android.Main");
+      mainClass.getMethod("main", String[].class).invoke(null,
+          (Object) jobArgs.toArray(new String[jobArgs.size()]));
+    } catch (InvocationTargetException e) {
+      e.getCause().printStackTrace();
+      exitCode = 1;
+    } catch (Exception e) {
+      e.printStackTrace();
+      exitCode = 1;
+    } finally {
+      current.setContextClassLoader(parent);
+      System.setOut(stdout);
+      System.setErr(stderr);
+      log.close();
+      // Drop the Scene of the finished app before the heap is measured
+      soot.G.reset();
+    }
+    return exitCode;
+  }
+
+  static URL[] classPathURLs() throws IOException {
+    List<URL> urls = new ArrayList<URL>();
+    for (String entry : System.getProperty("java.class.path").split(File.pathSeparator)) {
+      if (!entry.isEmpty()) {
+        urls.add(new File(entry).toURI().toURL());
+      }
+    }
+    return urls.toArray(new URL[urls.size()]);
+  }
+
+  static String pid() {
+    // "pid@hostname" on HotSpot and OpenJ9
+    return ManagementFactory.getRuntimeMXBean().getName().split("@")[0];
+  }
+
+  /**
+   * Loads presto.* classes itself, so that every job starts from freshly
+   * initialized static fields, and delegates everything else to the parent.
+   */
+  static class JobClassLoader extends URLClassLoader {
+    JobClassLoader(URL[] urls, ClassLoader parent) {
+      super(urls, parent);
+    }
+
+    @Override
+    protected Class<?> loadClass(String name, boolean resolve) throws ClassNotFoundException {
+      if (!name.startsWith("presto.") || name.startsWith(SERVER_CLASS)) {
+        return super.loadClass(name, resolve);
+      }
+      synchronized (getClassLoadingLock(name)) {
+        Class<?> c = findLoadedClass(name);
+        if (c == null) {
+          try {
+            c = findClass(name);
+          } catch (ClassNotFoundException e) {
+            c = super.loadClass(name, false);
+          }
+        }
+        if (resolve) {
+          resolveClass(c);
+        }
+        return c;
+      }
+    }
+  }
+}
@@ -266,7 +266,9 @@ public class Hierarchy {
 
   public static synchronized Hierarchy v() {
     if (instance == null) {
+      EventLog.phaseStart("hierarchy");
       instance = new Hierarchy();
+      EventLog.phaseEnd("hierarchy");
     }
     return instance;
   }
@@ -320,6 +322,8 @@ public class Hierarchy {
     System.out.print(" [App: " + appClasses.size());
     System.out.print(", Lib : " + scene.getLibraryClasses().size());
     System.out.println(", Phantom: " + scene.getPhantomClasses().size() + "]");
+    EventLog.emit("classes", "all", numClasses, "app", appClasses.size(),
+        "lib", scene.getLibraryClasses().size(), "phantom", scene.getPhantomClasses().size());
     if (numClasses != appClasses.size() + scene.getLibraryClasses().size()
         + scene.getPhantomClasses().size()) {
       throw new Error("[HIER] Numbers do not add up");
@@ -435,6 +439,8 @@ public class Hierarchy {
     }
     System.out.println("[HIER] Activities: " + applicationActivityClasses.size()
         + ", lib activities: " + libActivityClasses.size());
+    EventLog.emit("activities", "app", applicationActivityClasses.size(),
+        "lib", libActivityClasses.size());
   }
 
   void viewsAndMenus() {
@@ -476,6 +482,7 @@ public class Hierarchy {
     }
     System.out.println("[HIER] App views: " + numAppViews + ", Lib views: "
         + numLibViews);
+    EventLog.emit("views", "app", numAppViews, "lib", numLibViews);
   }
 
   void dialogs() {
@@ -490,6 +497,8 @@ public class Hierarchy {
     }
     System.out.println("[HIER] App Dialogs: " + applicationDialogClasses.size()
         + ", Lib Dialogs: " + libraryDialogClasses.size());
+    EventLog.emit("dialogs", "app", applicationDialogClasses.size(),
+        "lib", libraryDialogClasses.size());
   }
 
   //TODO: OPTIMIZATION
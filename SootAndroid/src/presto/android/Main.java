@@ -30,6 +30,10 @@ public class Main {
   public static void main(String[] args) {
     Debug.v().setStartTime();
     parseArgs(args);
+    if (!Configs.eventFile.isEmpty()) {
+      EventLog.open(Configs.eventFile);
+      EventLog.emit("start", "benchmark", Configs.benchmarkName, "apiLevel", Configs.apiLevel);
+    }
     checkAndPrintEnvironmentInformation(args);
     setupAndInvokeSoot();
   }
@@ -119,6 +123,10 @@ public class Main {
         Configs.manifestLocation = args[++i];
       } else if ("-resourcePath".equals(s)) {
         Configs.resourceLocation = args[++i];
+      } else if ("-eventFile".equals(s)) {
+        Configs.eventFile = args[++i];
+      } else if ("-serverMode".equals(s)) {
+        Configs.serverMode = true;
       }else {
         throw new RuntimeException("Unknown option: " + s);
       }
@@ -185,6 +193,8 @@ public class Main {
    * Invoke soot.Main.main() with proper arguments.
    */
   static void setupAndInvokeSoot() {
+    // Ends in AnalysisEntrypoint.run(), once Soot has loaded the classes
+    EventLog.phaseStart("soot");
     String classpath = computeClasspath();
     if (Configs.verbose) {
       Logger.verb("SETUP", "classpath : " + classpath);
@@ -0,0 +1,89 @@
+/*
+ * PhaseTimer.java - part of the GATOR project
+ *
+ * Copyright (c) 2014, 2015 The Ohio State University
+ *
+ * This file is distributed under the terms described in LICENSE in the
+ * root directory.
+ */
+package presto.android;
+
+import java.lang.management.ManagementFactory;
+import java.lang.management.OperatingSystemMXBean;
+import java.util.Map;
+
+import com.google.common.collect.Maps;
+
+/**
+ * Wall-clock and CPU time per analysis phase. A phase that runs several times
+ * (e.g., the CFGScheduler, once per WTG stage) accumulates its time. CPU time
+ * is that of the whole process, so parallel phases can show more CPU than
+ * wall time.
+ */
+public class PhaseTimer {
+  public static class Timing {
+    public long wallNanos;
+    public long cpuNanos;
+    public int runs;
+  }
+
+  // In the order the phases were first started
+  private static Map<String, Timing> timings = Maps.newLinkedHashMap();
+  private static Map<String, long[]> running = Maps.newHashMap();
+
+  public static synchronized void start(String phase) {
+    if (!timings.containsKey(phase)) {
+      timings.put(phase, new Timing());
+    }
+    running.put(phase, new long[] { System.nanoTime(), cpuNanos() });
+  }
+
+  /**
+   * Stop a phase and return {wallNanos, cpuNanos} of this run, or null if the
+   * phase was not started.
+   */
+  public static synchronized long[] stop(String phase) {
+    long[] started = running.remove(phase);
+    if (started == null) {
+      return null;
+    }
+    long[] elapsed = { System.nanoTime() - started[0], cpuNanos() - started[1] };
+    Timing timing = timings.get(phase);
+    timing.wallNanos += elapsed[0];
+    timing.cpuNanos += elapsed[1];
+    timing.runs++;
+    return elapsed;
+  }
+
+  /**
+   * Finished phases as a JSON object, e.g.
+   * {"soot": {"wall_ms": 5120, "cpu_ms": 9800, "runs": 1}, ...}
+   */
+  public static synchronized String toJSON(String indent) {
+    StringBuilder sb = new StringBuilder("{");
+    String sep = "\n";
+    for (Map.Entry<String, Timing> entry : timings.entrySet()) {
+      Timing timing = entry.getValue();
+      if (timing.runs == 0) {
+        continue;
+      }
+      sb.append(sep).append(indent).append("  ").append(EventLog.quote(entry.getKey()))
+          .append(": {\"wall_ms\": ").append(timing.wallNanos / 1000000)
+          .append(", \"cpu_ms\": ").append(timing.cpuNanos / 1000000)
+          .append(", \"runs\": ").append(timing.runs).append("}");
+      sep = ",\n";
+    }
+    if (sep.equals(",\n")) {
+      sb.append("\n").append(indent);
+    }
+    return sb.append("}").toString();
+  }
+
+  static long cpuNanos() {
+    OperatingSystemMXBean os = ManagementFactory.getOperatingSystemMXBean();
+    if (os instanceof com.sun.management.OperatingSystemMXBean) {
+      return ((com.sun.management.OperatingSystemMXBean) os).getProcessCpuTime();
+    }
+    return ManagementFactory.getThreadMXBean().getCurrentThreadCpuTime();
+  }
+}
@@ -37,6 +37,9 @@ import static java.util.Arrays.asList;
  * pretty efficient.
  */
 public class FixpointSolver {
+  // Rounds of viewAndListenerPropagation() until nothing changed
+  public int propagationRounds = 0;
+
   final VarExtractor parameterExtractor = new VarExtractor() {
     @Override
     public NVarNode extract(NOpNode opNode) {
@@ -1173,6 +1176,7 @@ public class FixpointSolver {
   // Now, we are done with inflation. Let's process other NOpNodes
   void viewAndListenerPropagation() {
     while (true) {
+      propagationRounds++;
       boolean changed = false;
       for (NOpNode findView1 : NOpNode.getNodes(NFindView1OpNode.class)) {
         if (processFindView1((NFindView1OpNode) findView1)) {
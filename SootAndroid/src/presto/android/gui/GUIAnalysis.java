@@ -11,6 +11,7 @@ package presto.android.gui;
 import java.util.Set;
 
 import presto.android.Configs;
+import presto.android.EventLog;
 import presto.android.Hierarchy;
 import presto.android.xml.XMLParser;
 
@@ -43,7 +44,11 @@ public class GUIAnalysis {
 
   public static synchronized GUIAnalysis v() {
     if (instance == null) {
-      instance = new GUIAnalysis(Hierarchy.v(), XMLParser.Factory.getXMLParser());
+      Hierarchy hier = Hierarchy.v();
+      EventLog.phaseStart("xml");
+      XMLParser xmlParser = XMLParser.Factory.getXMLParser();
+      EventLog.phaseEnd("xml");
+      instance = new GUIAnalysis(hier, xmlParser);
     }
     return instance;
   }
@@ -82,6 +87,8 @@ public class GUIAnalysis {
         + ", Menu Ids: " + allMenuIds.size() + ", Widget Ids: "
         + allWidgetIds.size() + ", String Ids: " + allStringIds.size());
     System.out.println("[XML] MainActivity: " + xmlParser.getMainActivity());
+    EventLog.emit("ids", "layouts", allLayoutIds.size(), "menus", allMenuIds.size(),
+        "widgets", allWidgetIds.size(), "strings", allStringIds.size());
   }
 
   public void run() {
@@ -92,13 +99,18 @@ public class GUIAnalysis {
     populateIDContainers();
 
     // 1. Build flow graph
+    EventLog.phaseStart("flowgraph");
     flowgraph = new Flowgraph(hier, allLayoutIds, allMenuIds, allWidgetIds,
         allStringIds);
     flowgraph.build();
+    EventLog.phaseEnd("flowgraph", "nodes", flowgraph.allNNodes.size(),
+        "varNodes", flowgraph.allNVarNodes.size(), "allocNodes", flowgraph.allNAllocNodes.size());
 
     // 2. Fix-point computation
+    EventLog.phaseStart("fixpoint");
     fixpointSolver = new FixpointSolver(flowgraph);
     fixpointSolver.solve();
+    EventLog.phaseEnd("fixpoint", "iterations", fixpointSolver.propagationRounds);
 
     // 3. Variable value query interface
     variableValueQueryInterface = DemandVariableValueQuery.v(flowgraph, fixpointSolver);
@@ -130,7 +142,9 @@ public class GUIAnalysis {
 
       System.out.println("[" + clientName + "] Start");
       long startTime = System.nanoTime();
+      EventLog.phaseStart("client:" + clientName);
       client.run(output);
+      EventLog.phaseEnd("client:" + clientName);
       long estimatedTime = System.nanoTime() - startTime;
       System.out.println("[" + clientName + "] End: "
           + (estimatedTime * 1.0e-09) + " sec");
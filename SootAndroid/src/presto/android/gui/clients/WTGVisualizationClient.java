@@ -2,6 +2,7 @@ package presto.android.gui.clients;
 
 import presto.android.Configs;
 import presto.android.Logger;
+import presto.android.PhaseTimer;
 import presto.android.gui.GUIAnalysisClient;
 import presto.android.gui.GUIAnalysisOutput;
 import presto.android.gui.graph.NObjectNode;
@@ -18,6 +19,9 @@ import java.io.BufferedWriter;
 import java.io.File;
 import java.io.FileWriter;
 import java.io.IOException;
+import java.nio.file.AtomicMoveNotSupportedException;
+import java.nio.file.Files;
+import java.nio.file.StandardCopyOption;
 import java.text.SimpleDateFormat;
 import java.util.Collection;
 import java.util.Date;
@@ -32,6 +36,11 @@ import java.util.Set;
  */
 public class WTGVisualizationClient implements GUIAnalysisClient {
     
+    /** Client parameter that enables the wtg.ndjson export */
+    public static final String NDJSON_PARAM = "ndjson";
+    /** Client parameter that restores the single-page wtg_viewer.html */
+    public static final String HTML_PARAM = "html";
+    
     @Override
     public void run(GUIAnalysisOutput output) {
         Logger.verb("WTG_VIZ", "=== Starting WTG Visualization ===");
@@ -57,21 +66,40 @@ public class WTGVisualizationClient implements GUIAnalysisClient {
             Logger.err("WTG_VIZ", "Failed to save JSON summary");
         }
         
+        // Line-delimited export with full handler and callback signatures (-clientParam ndjson)
+        if (Configs.clientParams.contains(NDJSON_PARAM)) {
+            Logger.verb("WTG_VIZ", "Saving NDJSON export...");
+            String ndjsonFile = generateNDJSON(wtg);
+            if (ndjsonFile != null) {
+                Logger.verb("WTG_VIZ", "NDJSON export saved: " + ndjsonFile);
+            }
+        }
+        
         // Generate DOT file
         Logger.verb("WTG_VIZ", "Generating DOT file...");
         String dotFile = generateDotFile(wtg);
         
-        // Generate HTML viewer
-        Logger.verb("WTG_VIZ", "Generating HTML viewer...");
-        String htmlFile = generateHTMLViewer(wtg, dotFile);
+        // The single-page HTML viewer inlines the whole graph and only suits small apps;
+        // wtgViewer.py builds a paged viewer from wtg.json outside the analysis JVM
+        String htmlFile = null;
+        if (Configs.clientParams.contains(HTML_PARAM)) {
+            Logger.verb("WTG_VIZ", "Generating HTML viewer...");
+            htmlFile = generateHTMLViewer(wtg, dotFile);
+        }
         
         Logger.verb("WTG_VIZ", "=== Visualization Complete ===");
         Logger.verb("WTG_VIZ", "JSON summary: " + jsonFile);
         Logger.verb("WTG_VIZ", "DOT file: " + dotFile);
-        Logger.verb("WTG_VIZ", "HTML viewer: " + htmlFile);
+        if (htmlFile != null) {
+            Logger.verb("WTG_VIZ", "HTML viewer: " + htmlFile);
+        }
         Logger.verb("WTG_VIZ", "");
         Logger.verb("WTG_VIZ", "To view the graph:");
-        Logger.verb("WTG_VIZ", "  1. Open " + htmlFile + " in a web browser");
+        if (htmlFile != null) {
+            Logger.verb("WTG_VIZ", "  1. Open " + htmlFile + " in a web browser");
+        } else {
+            Logger.verb("WTG_VIZ", "  1. Run: python AndroidBench/wtgViewer.py " + new File(jsonFile != null ? jsonFile : ".").getParent() + " --open");
+        }
         Logger.verb("WTG_VIZ", "  OR");
         Logger.verb("WTG_VIZ", "  2. Use Graphviz: dot -Tpng " + dotFile + " -o wtg.png");
         Logger.verb("WTG_VIZ", "  3. Use online viewer: https://dreampuf.github.io/GraphvizOnline/");
@@ -95,26 +123,45 @@ public class WTGVisualizationClient implements GUIAnalysisClient {
         }
     }
     
+    /**
+     * Create and return the output directory: output/app_name/ under the Gator root
+     */
+    private String getOutputDir() throws IOException {
+        String baseDir = new File(".").getCanonicalPath();
+        // Navigate to project root
+        if (baseDir.endsWith("viz-demo")) {
+            // AndroidBench/viz-demo -> Gator root
+            baseDir = new File(baseDir).getParentFile().getParentFile().getCanonicalPath();
+        } else if (baseDir.endsWith("AndroidBench")) {
+            // AndroidBench -> Gator root
+            baseDir = new File(baseDir).getParentFile().getCanonicalPath();
+        } else if (baseDir.contains("AndroidBench")) {
+            // AndroidBench/apv or other subdirs -> Gator root
+            while (!baseDir.endsWith("Gator") && new File(baseDir).getParentFile() != null) {
+                baseDir = new File(baseDir).getParentFile().getCanonicalPath();
+            }
+        }
+        String outputDir = baseDir + "/output/" + Configs.benchmarkName;
+        new File(outputDir).mkdirs();
+        return outputDir;
+    }
+    
+    /**
+     * Move a completely written temporary file over its final name
+     */
+    private void replaceFile(File tempFile, String filePath) throws IOException {
+        try {
+            Files.move(tempFile.toPath(), new File(filePath).toPath(),
+                StandardCopyOption.REPLACE_EXISTING, StandardCopyOption.ATOMIC_MOVE);
+        } catch (AtomicMoveNotSupportedException e) {
+            Files.move(tempFile.toPath(), new File(filePath).toPath(), StandardCopyOption.REPLACE_EXISTING);
+        }
+    }
+    
     private String generateDotFile(WTG wtg) {
         String dotFilePath = null;
         try {
-            // Create output directory structure: output/app_name/
-            String baseDir = new File(".").getCanonicalPath();
-            // Navigate to project root
-            if (baseDir.endsWith("viz-demo")) {
-                // AndroidBench/viz-demo -> Gator root
-                baseDir = new File(baseDir).getParentFile().getParentFile().getCanonicalPath();
-            } else if (baseDir.endsWith("AndroidBench")) {
-                // AndroidBench -> Gator root
-                baseDir = new File(baseDir).getParentFile().getCanonicalPath();
-            } else if (baseDir.contains("AndroidBench")) {
-                // AndroidBench/apv or other subdirs -> Gator root
-                while (!baseDir.endsWith("Gator") && new File(baseDir).getParentFile() != null) {
-                    baseDir = new File(baseDir).getParentFile().getCanonicalPath();
-                }
-            }
-            String outputDir = baseDir + "/output/" + Configs.benchmarkName;
-            new File(outputDir).mkdirs();
+            String outputDir = getOutputDir();
             
             dotFilePath = outputDir + "/wtg.dot";
             FileWriter output = new FileWriter(dotFilePath);
@@ -191,23 +238,7 @@ public class WTGVisualizationClient implements GUIAnalysisClient {
     private String generateHTMLViewer(WTG wtg, String dotFilePath) {
         String htmlFilePath = null;
         try {
-            // Create output directory structure: output/app_name/
-            String baseDir = new File(".").getCanonicalPath();
-            // Navigate to project root
-            if (baseDir.endsWith("viz-demo")) {
-                // AndroidBench/viz-demo -> Gator root
-                baseDir = new File(baseDir).getParentFile().getParentFile().getCanonicalPath();
-            } else if (baseDir.endsWith("AndroidBench")) {
-                // AndroidBench -> Gator root
-                baseDir = new File(baseDir).getParentFile().getCanonicalPath();
-            } else if (baseDir.contains("AndroidBench")) {
-                // AndroidBench/apv or other subdirs -> Gator root
-                while (!baseDir.endsWith("Gator") && new File(baseDir).getParentFile() != null) {
-                    baseDir = new File(baseDir).getParentFile().getCanonicalPath();
-                }
-            }
-            String outputDir = baseDir + "/output/" + Configs.benchmarkName;
-            new File(outputDir).mkdirs();
+            String outputDir = getOutputDir();
             
             htmlFilePath = outputDir + "/wtg_viewer.html";
             FileWriter output = new FileWriter(htmlFilePath);
@@ -429,26 +460,12 @@ public class WTGVisualizationClient implements GUIAnalysisClient {
     private String generateJSONSummary(WTG wtg) {
         String jsonFilePath = null;
         try {
-            // Create output directory structure: output/app_name/
-            String baseDir = new File(".").getCanonicalPath();
-            // Navigate to project root
-            if (baseDir.endsWith("viz-demo")) {
-                // AndroidBench/viz-demo -> Gator root
-                baseDir = new File(baseDir).getParentFile().getParentFile().getCanonicalPath();
-            } else if (baseDir.endsWith("AndroidBench")) {
-                // AndroidBench -> Gator root
-                baseDir = new File(baseDir).getParentFile().getCanonicalPath();
-            } else if (baseDir.contains("AndroidBench")) {
-                // AndroidBench/apv or other subdirs -> Gator root
-                while (!baseDir.endsWith("Gator") && new File(baseDir).getParentFile() != null) {
-                    baseDir = new File(baseDir).getParentFile().getCanonicalPath();
-                }
-            }
-            String outputDir = baseDir + "/output/" + Configs.benchmarkName;
-            new File(outputDir).mkdirs();
+            String outputDir = getOutputDir();
             
             jsonFilePath = outputDir + "/wtg.json";
-            FileWriter output = new FileWriter(jsonFilePath);
+            // Written to a temporary file and renamed, so readers never see a partial wtg.json
+            File tempFile = new File(jsonFilePath + ".tmp");
+            FileWriter output = new FileWriter(tempFile);
             BufferedWriter writer = new BufferedWriter(output);
             
             // Collect statistics
@@ -503,9 +520,10 @@ public class WTGVisualizationClient implements GUIAnalysisClient {
                 }
             }
             
-            // Build JSON (timing information will be added by Python code)
+            // Build JSON (the runner records its own run metadata in run.json)
             writer.write("{\n");
             writer.write("  \"application\": \"" + escapeJSON(Configs.benchmarkName) + "\",\n");
+            writer.write("  \"analysis_time\": \"" + new SimpleDateFormat("yyyy-MM-dd HH:mm:ss").format(new Date()) + "\",\n");
             writer.write("  \"summary\": {\n");
             writer.write("    \"total_nodes\": " + nodes.size() + ",\n");
             writer.write("    \"total_edges\": " + edges.size() + ",\n");
@@ -517,6 +535,9 @@ public class WTGVisualizationClient implements GUIAnalysisClient {
             writer.write("    \"total_callbacks\": " + totalCallbacks + "\n");
             writer.write("  },\n");
             
+            // Wall and CPU time of the phases finished so far
+            writer.write("  \"timings\": " + PhaseTimer.toJSON("  ") + ",\n");
+            
             // Activities
             writer.write("  \"activities\": [\n");
             int count = 0;
@@ -581,10 +602,10 @@ public class WTGVisualizationClient implements GUIAnalysisClient {
             
             writer.write("}\n");
             
-            // Ensure data is written to disk immediately
             writer.flush();
             writer.close();
             output.close();
+            replaceFile(tempFile, jsonFilePath);
             
             Logger.verb("WTG_VIZ", "UTG JSON generated: " + jsonFilePath);
             
@@ -596,6 +617,81 @@ public class WTGVisualizationClient implements GUIAnalysisClient {
         return jsonFilePath;
     }
     
+    /**
+     * Write the WTG as one JSON record per line: a header, then every node and
+     * every edge. Unlike wtg.json, edges carry the signatures of their event
+     * handlers and callbacks and their window stack operations. Records are
+     * written as they are produced, so readers can stream the file.
+     */
+    private String generateNDJSON(WTG wtg) {
+        String ndjsonFilePath = null;
+        try {
+            String outputDir = getOutputDir();
+            ndjsonFilePath = outputDir + "/wtg.ndjson";
+            File tempFile = new File(ndjsonFilePath + ".tmp");
+            BufferedWriter writer = new BufferedWriter(new FileWriter(tempFile));
+            
+            Collection<WTGNode> nodes = wtg.getNodes();
+            Collection<WTGEdge> edges = wtg.getEdges();
+            writer.write("{\"record\": \"header\", \"version\": 1"
+                + ", \"application\": \"" + escapeJSON(Configs.benchmarkName) + "\""
+                + ", \"nodes\": " + nodes.size() + ", \"edges\": " + edges.size()
+                + ", \"launcher\": " + (wtg.getLauncherNode() != null ? wtg.getLauncherNode().getId() : -1) + "}\n");
+            
+            for (WTGNode node : nodes) {
+                writer.write("{\"record\": \"node\", \"id\": " + node.getId()
+                    + ", \"type\": \"" + escapeJSON(getNodeType(node)) + "\""
+                    + ", \"window\": \"" + escapeJSON(node.getWindow().toString()) + "\""
+                    + ", \"in_edges\": " + node.getInEdges().size()
+                    + ", \"out_edges\": " + node.getOutEdges().size() + "}\n");
+            }
+            
+            int edgeId = 0;
+            for (WTGEdge edge : edges) {
+                StringBuilder sb = new StringBuilder();
+                sb.append("{\"record\": \"edge\", \"id\": ").append(edgeId++);
+                sb.append(", \"source_id\": ").append(edge.getSourceNode().getId());
+                sb.append(", \"target_id\": ").append(edge.getTargetNode().getId());
+                sb.append(", \"source\": \"").append(escapeJSON(edge.getSourceNode().getWindow().toString())).append("\"");
+                sb.append(", \"target\": \"").append(escapeJSON(edge.getTargetNode().getWindow().toString())).append("\"");
+                sb.append(", \"event_type\": \"").append(escapeJSON(edge.getEventType() != null ? edge.getEventType().toString() : "unknown")).append("\"");
+                sb.append(", \"widget\": \"").append(escapeJSON(String.valueOf(edge.getGUIWidget()))).append("\"");
+                sb.append(", \"handlers\": [");
+                int count = 0;
+                for (SootMethod handler : edge.getEventHandlers()) {
+                    if (count++ > 0) sb.append(", ");
+                    sb.append("\"").append(escapeJSON(handler.getSignature())).append("\"");
+                }
+                sb.append("], \"callbacks\": [");
+                count = 0;
+                for (EventHandler callback : edge.getCallbacks()) {
+                    if (count++ > 0) sb.append(", ");
+                    sb.append("{\"window\": \"").append(escapeJSON(String.valueOf(callback.getWindow()))).append("\"");
+                    sb.append(", \"event\": \"").append(escapeJSON(String.valueOf(callback.getEvent()))).append("\"");
+                    SootMethod method = callback.getEventHandler();
+                    sb.append(", \"method\": \"").append(escapeJSON(method != null ? method.getSignature() : "")).append("\"}");
+                }
+                sb.append("], \"stack_ops\": [");
+                count = 0;
+                for (StackOperation op : edge.getStackOps()) {
+                    if (count++ > 0) sb.append(", ");
+                    sb.append("{\"op\": \"").append(op.isPushOp() ? "push" : "pop").append("\"");
+                    sb.append(", \"window\": \"").append(escapeJSON(String.valueOf(op.getWindow()))).append("\"}");
+                }
+                sb.append("]}\n");
+                writer.write(sb.toString());
+            }
+            
+            writer.close();
+            replaceFile(tempFile, ndjsonFilePath);
+        } catch (IOException e) {
+            e.printStackTrace();
+            Logger.err("WTG_VIZ", "Failed to generate NDJSON export: " + e.getMessage());
+            return null;
+        }
+        return ndjsonFilePath;
+    }
+    
     private String getNodeType(WTGNode node) {
         String nodeName = node.getWindow().toString();
         if (nodeName.contains("LAUNCHER")) {
@@ -19,6 +19,7 @@ import com.google.common.collect.Sets;
 
 import presto.android.Configs;
 import presto.android.Debug;
+import presto.android.EventLog;
 import presto.android.Logger;
 import presto.android.gui.GUIAnalysisOutput;
 import presto.android.gui.graph.NActivityNode;
@@ -50,9 +51,11 @@ public class WTGBuilder {
   private List<Multimap<WTGEdgeSig, WTGEdge>> stageOutput;
   
   public void build(GUIAnalysisOutput output) {
+    EventLog.phaseStart("wtg");
     preBuild(output);
     building();
     postBuild();
+    EventLog.phaseEnd("wtg", "nodes", wtg.getNodes().size(), "edges", wtg.getEdges().size());
   }
 
   public WTGBuilder() {
@@ -69,21 +72,27 @@ public class WTGBuilder {
     Multimap<WTGEdgeSig, WTGEdge> stage1 = new ExplicitForwardEdgeBuilder(guiOutput, flowgraphRebuilder)
       .buildEdges(wtg);
     Logger.verb(getClass().getSimpleName(), "stage 1 finishes");
+    EventLog.emit("wtgStage", "stage", 1, "edges", stage1.size());
     Multimap<WTGEdgeSig, WTGEdge> stage2 = new LifecycleForwardEdgeBuilder(guiOutput, flowgraphRebuilder)
       .buildEdges(wtg, stage1, ownership);
     Logger.verb(getClass().getSimpleName(), "stage 2 finishes");
+    EventLog.emit("wtgStage", "stage", 2, "edges", stage2.size());
     Multimap<WTGEdgeSig, WTGEdge> stage3 = new CloseWindowEdgeBuilder(guiOutput, flowgraphRebuilder)
       .buildEdges(wtg, stage2, ownership);
     Logger.verb(getClass().getSimpleName(), "stage 3 finishes");
+    EventLog.emit("wtgStage", "stage", 3, "edges", stage3.size());
     Multimap<WTGEdgeSig, WTGEdge> stage4 = new CallbackSequenceBuilder(guiOutput, flowgraphRebuilder)
       .buildEdges(wtg, stage3, ownership);
     Logger.verb(getClass().getSimpleName(), "stage 4 finishes");
+    EventLog.emit("wtgStage", "stage", 4, "edges", stage4.size());
     Multimap<WTGEdgeSig, WTGEdge> stage5 = new BackEdgeBuilder(guiOutput, flowgraphRebuilder)
       .buildEdges(wtg, stage4, ownership);
     Logger.verb(getClass().getSimpleName(), "stage 5 finishes");
+    EventLog.emit("wtgStage", "stage", 5, "edges", stage5.size());
     Multimap<WTGEdgeSig, WTGEdge> stage6 = new LifecycleCloseEdgeBuilder(guiOutput, flowgraphRebuilder)
       .buildEdges(wtg, stage5, ownership);
     Logger.verb(getClass().getSimpleName(), "stage 6 finishes");
+    EventLog.emit("wtgStage", "stage", 6, "edges", stage6.size());
 
     // store the result for all stages
     stageOutput.add(stage1);
@@ -18,6 +18,7 @@ import com.google.common.collect.Maps;
 
 import presto.android.Configs;
 import presto.android.Logger;
+import presto.android.PhaseTimer;
 import presto.android.gui.GUIAnalysisOutput;
 import presto.android.gui.wtg.analyzer.CFGAnalyzerInput;
 import presto.android.gui.wtg.analyzer.CFGAnalyzerOutput;
@@ -46,6 +47,15 @@ public class CFGScheduler {
   }
 
   public Map<CFGAnalyzerInput, CFGAnalyzerOutput> schedule(Set<CFGAnalyzerInput> inputs) {
+    PhaseTimer.start("cfgScheduler");
+    try {
+      return scheduleAndAggregate(inputs);
+    } finally {
+      PhaseTimer.stop("cfgScheduler");
+    }
+  }
+
+  private Map<CFGAnalyzerInput, CFGAnalyzerOutput> scheduleAndAggregate(Set<CFGAnalyzerInput> inputs) {
     // the underline idea is to parallelise analyzeCallbackMethod
     // and leave the rest executed in sequence
     for (CFGAnalyzerInput input : inputs) {
@@ -1,4 +1,20 @@
 import os
+import sys
+import csv
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+DEFAULT_TASK_DIR = "bak\\task_2025-12-29_15-51-03"
+# 已解析日志的索引: 相对路径 -> (mtime, size, 解析结果)，放在任务目录下
+INDEX_FILE = ".log_analyse_index.json"
+INDEX_VERSION = 1
+COLUMNS = ['Activities', 'Lib activities', 'App Dialogs', 'Lib Dialogs', 'Total']
+
+
+def parse_pair(line):
+    """"[HIER] Activities: 11, lib activities: 2" -> (11, 2)"""
+    parts = line.split(',')
+    return int(parts[0].split(':')[1].strip()), int(parts[1].split(':')[1].strip())
 
 
 def analyse_log(log_file_path):
@@ -9,52 +25,170 @@ def analyse_log(log_file_path):
     [HIER] App views: 8, Lib views: 53
     [HIER] App Dialogs: 0, Lib Dialogs: 3
     提取Activities, lib activities, App Dialogs, Lib Dialogs 四个信息
+    [HIER] 行在层次分析阶段输出，位于日志开头，两行都读到后就不再读后面的内容
     """
     results = {}
-    with open(log_file_path, 'r', encoding='utf-8') as f:
-        total_num = 0
+    total_num = 0
+    with open(log_file_path, 'r', encoding='utf-8', errors='replace') as f:
         for line in f:
+            if not line.startswith("[HIER] "):
+                continue
             line = line.strip()
             if line.startswith("[HIER] Activities:"):
-                parts = line.split(',')
-                activities_part = parts[0].split(':')[1].strip()
-                lib_activities_part = parts[1].split(':')[1].strip()
-                results['Activities'] = int(activities_part)
-                results['Lib activities'] = int(lib_activities_part)
-                total_num += int(activities_part) + int(lib_activities_part)
+                activities, lib_activities = parse_pair(line)
+                results['Activities'] = activities
+                results['Lib activities'] = lib_activities
+                total_num += activities + lib_activities
             elif line.startswith("[HIER] App Dialogs:"):
-                parts = line.split(',')
-                app_dialogs_part = parts[0].split(':')[1].strip()
-                lib_dialogs_part = parts[1].split(':')[1].strip()
-                results['App Dialogs'] = int(app_dialogs_part)
-                results['Lib Dialogs'] = int(lib_dialogs_part)
-                total_num += int(app_dialogs_part) + int(lib_dialogs_part)
-        results['Total'] = total_num
-
+                app_dialogs, lib_dialogs = parse_pair(line)
+                results['App Dialogs'] = app_dialogs
+                results['Lib Dialogs'] = lib_dialogs
+                total_num += app_dialogs + lib_dialogs
+            if 'Activities' in results and 'App Dialogs' in results:
+                break
+    results['Total'] = total_num
     return results
 
-def analyse_dir(dir_path):
-    """分析目录下所有log文件"""
+
+def load_index(index_path):
+    try:
+        with open(index_path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if index.get('version') != INDEX_VERSION:
+        return {}
+    return index.get('logs', {})
+
+
+def save_index(index_path, logs):
+    tmp_path = index_path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'version': INDEX_VERSION, 'logs': logs}, f)
+    os.replace(tmp_path, index_path)
+
+
+def analyse_dir(dir_path, workers=None, use_index=True):
+    """分析目录下所有log文件；索引中 mtime 和大小都没变的日志直接复用上次的结果"""
+    index_path = os.path.join(dir_path, INDEX_FILE)
+    index = load_index(index_path) if use_index else {}
     all_results = {}
-    for filename in os.listdir(dir_path):
+    new_index = {}
+    pending = []
+    for filename in sorted(os.listdir(dir_path)):
         work_dir = os.path.join(dir_path, filename)
+        if not os.path.isdir(work_dir):
+            continue
         log_file_path = os.path.join(work_dir, 'log.txt')
-        if os.path.exists(log_file_path):
-            results = analyse_log(log_file_path)
-            all_results[filename] = results
-        else:
+        try:
+            stat = os.stat(log_file_path)
+        except OSError:
             print(f"日志文件不存在: {log_file_path}")
-    return all_results
+            continue
+        key = filename + "/log.txt"
+        entry = index.get(key)
+        if entry and entry['mtime'] == stat.st_mtime_ns and entry['size'] == stat.st_size:
+            all_results[filename] = entry['results']
+            new_index[key] = entry
+        else:
+            pending.append((filename, key, log_file_path, stat))
+
+    print(f"共 {len(all_results) + len(pending)} 个日志, 复用索引 {len(all_results)} 个, 需要解析 {len(pending)} 个")
+    paths = [item[2] for item in pending]
+    if workers == 1 or len(pending) <= 1:
+        parsed = list(map(analyse_log, paths))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            parsed = list(executor.map(analyse_log, paths, chunksize=16))
+    for (filename, key, log_file_path, stat), results in zip(pending, parsed):
+        all_results[filename] = results
+        new_index[key] = {'mtime': stat.st_mtime_ns, 'size': stat.st_size, 'results': results}
+    if use_index:
+        try:
+            save_index(index_path, new_index)
+        except OSError as e:
+            print(f"无法写入索引 {index_path}: {e}")
+    return dict(sorted(all_results.items()))
+
+
+def write_csv(data, csv_file_path):
+    """将数据写入CSV文件，不依赖 pandas"""
+    with open(csv_file_path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['App'] + COLUMNS)
+        for app, results in data.items():
+            writer.writerow([app] + [results.get(column, '') for column in COLUMNS])
+
+
+def write_parquet(data, parquet_file_path):
+    """将数据写入Parquet文件（需要 pyarrow）"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    table = {'App': list(data.keys())}
+    for column in COLUMNS:
+        table[column] = [results.get(column) for results in data.values()]
+    pq.write_table(pa.table(table), parquet_file_path)
+
 
 def write_excel(data, excel_file_path):
-    """将数据写入Excel文件"""
+    """将数据写入Excel文件（需要 pandas 和 openpyxl）"""
     import pandas as pd
     df = pd.DataFrame.from_dict(data, orient='index')
     df.to_excel(excel_file_path)
 
+
+WRITERS = {
+    'csv': write_csv,
+    'parquet': write_parquet,
+    'xlsx': write_excel
+}
+
+
+def print_usage():
+    print("Usage: python log_analyse.py [task_dir] [-o output] [--format csv|parquet|xlsx] [-j workers] [--no-index]")
+    print("  输出格式默认由 -o 的扩展名决定，没有 -o 时写 analysis_results.csv")
+
+
 if __name__ == "__main__":
-    task_dir = "bak\\task_2025-12-29_15-51-03"
-    results = analyse_dir(task_dir)
-    excel_file_path = 'analysis_results.xlsx'
-    write_excel(results, excel_file_path)
-    print(f"分析结果已写入: {excel_file_path}")
\ No newline at end of file
+    task_dir = DEFAULT_TASK_DIR
+    output_path = ""
+    output_format = ""
+    workers = None
+    use_index = True
+    i = 1
+    while i < len(sys.argv):
+        val = sys.argv[i]
+        if val == '-o':
+            i += 1
+            output_path = sys.argv[i]
+        elif val == '--format':
+            i += 1
+            output_format = sys.argv[i]
+        elif val == '-j':
+            i += 1
+            workers = int(sys.argv[i])
+        elif val == '--no-index':
+            use_index = False
+        elif val in ('-h', '--help'):
+            print_usage()
+            sys.exit(0)
+        else:
+            task_dir = val
+        i += 1
+    if output_format == "":
+        extension = os.path.splitext(output_path)[1].lstrip('.').lower()
+        output_format = extension if extension in WRITERS else 'csv'
+    if output_format not in WRITERS:
+        print(f"不支持的输出格式: {output_format}")
+        print_usage()
+        sys.exit(1)
+    if output_path == "":
+        output_path = 'analysis_results.' + output_format
+
+    results = analyse_dir(task_dir, workers, use_index)
+    try:
+        WRITERS[output_format](results, output_path)
+    except ImportError as e:
+        print(f"写入 {output_format} 需要额外的依赖: {e}")
+        sys.exit(1)
+    print(f"分析结果已写入: {output_path}")